@@ -0,0 +1,98 @@
+"""목표가 매칭과 수익 계산 (UI 없이 배치 작업/워커에서도 사용)"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from matching import match_target_prices, match_ohlc_target_prices, best_prices, trade_columns, sweep_frames, cell_totals, profit_rows, SweepCancelled, TradeProfit
+from rate_store import RateStore, as_rate_store
+
+
+def analyze_target_prices(filtered_df, trade_df, start_date, end_date, buy_price_adjustment, sell_price_adjustment, date_window, lazy=False):
+    # 날짜 필터링 (RateStore 는 거래별 구간 탐색이 이미 기간 안으로 한정됨)
+    if not isinstance(filtered_df, RateStore):
+        filtered_df = filtered_df[(filtered_df['createdAt'] >= start_date) & 
+                                 (filtered_df['createdAt'] <= end_date + timedelta(days=date_window))]
+    trade_df = trade_df[(trade_df['executedAt'] >= start_date) & 
+                        (trade_df['executedAt'] <= end_date)]
+    
+    # 통화별로 정렬된 환율 틱에 대해 모든 거래를 일괄 매칭
+    # lazy=True 면 matched_rates 는 필요할 때 펼치는 MatchedRates
+    return match_target_prices(filtered_df, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, lazy=lazy)
+
+# 수익 계산 함수
+def calculate_profit(results_df, adjustment, start_date, end_date, date_window, kernel=None):
+    """기간 안에서 목표가에 도달한 거래의 매수/매도 수익 (같은 통화, 시간, 금액의 거래는 한 번만)
+
+    kernel 은 같은 거래로 만든 results 에 재사용할 수 있는 TradeProfit (없으면 results_df 로 새로 만듦).
+    kernel 의 거래와 results_df 의 행이 맞지 않으면 ValueError.
+    """
+    if kernel is None:
+        kernel = TradeProfit.from_results(results_df)
+    elif not kernel.aligned_with(results_df):
+        raise ValueError('kernel 이 results_df 와 다른 거래로 만들어졌습니다 (같은 거래, 같은 행 순서의 results 에만 재사용 가능)')
+    executed_at = results_df['executedAt']
+    found = ((executed_at >= pd.to_datetime(start_date)) &
+             (executed_at <= pd.to_datetime(end_date) + timedelta(days=date_window)) &
+             (results_df['found'] == True)).to_numpy()
+    # 🔹 중복 제거 (같은 시간, 통화, 금액이 중복된 거래 제거) 는 키 인덱스로 도달 거래 중 첫 거래만 남김
+    found = kernel.first_hits(found[:, None])[:, 0]
+    _, total_buy_amo, total_buy_pro, total_sell_amo, total_sell_pro = kernel.totals(found[:, None], adjustment)[0]
+
+    buy_profit_df = results_df[found & kernel.is_buy]
+    sell_profit_df = results_df[found & ~kernel.is_buy]
+    buy_profit_df = buy_profit_df.assign(profit=buy_profit_df['amount'] * adjustment)
+    sell_profit_df = sell_profit_df.assign(profit=sell_profit_df['amount'] * adjustment)
+    return (buy_profit_df, total_buy_amo, total_buy_pro), (sell_profit_df, total_sell_amo, total_sell_pro)
+
+# 목표가 도달까지 걸린 시간 (매칭 시 기록한 first_hit_at 사용, matched_rates 를 펼치지 않음)
+def time_to_fill(results_df):
+    """거래별 체결(executedAt) 부터 첫 목표가 도달(first_hit_at) 까지 걸린 시간 (미도달은 NaT)"""
+    return results_df['first_hit_at'] - results_df['executedAt']
+
+
+def fill_time_stats(results_df, quantiles=(0.5, 0.75, 0.9, 0.95)):
+    """통화/주문 구분별 목표가 도달까지 걸린 시간(시간 단위) 의 도달 거래 수, 평균, 분위수"""
+    columns = ['currency', 'order_type', 'filled', 'mean_hours'] + [f'p{round(q * 100)}_hours' for q in quantiles]
+    filled = results_df[results_df['found'] == True] if len(results_df) else results_df
+    if len(filled) == 0:
+        return pd.DataFrame(columns=columns)
+    hours = time_to_fill(filled) / pd.Timedelta(hours=1)
+    grouped = hours.groupby([filled['currency'], filled['order_type']], observed=True, sort=True)
+    stats = grouped.quantile(list(quantiles)).unstack()
+    stats.columns = columns[4:]
+    stats.insert(0, 'mean_hours', grouped.mean())
+    stats.insert(0, 'filled', grouped.size())
+    return stats.reset_index().round(2)
+
+# 모든 (date_window, adjustment) 조합 수익 계산 함수
+def simulate_profit(filtered_df, trade_df, start_date, end_date, date_windows, adjustments, on_window=None, cancel=None,
+                    swept=False):
+    """조합마다 analyze_target_prices + calculate_profit 을 다시 돌리는 대신
+    거래별 구간 최저가/최고가를 한 번에 구해 모든 조합의 profit_df 를 만드는 함수
+
+    on_window(i, totals) 는 date_windows[i] 의 조정값별 집계 ((조정값 수, 5) 배열) 가 끝날 때마다 호출되고,
+    cancel (threading.Event 등) 이 설정되면 다음 date_window 를 시작하기 전에 SweepCancelled 를 던진다.
+    swept=True 면 filtered_df, trade_df 가 이미 같은 조건의 sweep_frames 결과인 것으로 보고 다시 거르지 않는다."""
+    date_windows = list(date_windows)
+    adjustments = list(adjustments)
+    if not swept:
+        filtered_df, trade_df = sweep_frames(filtered_df, trade_df, start_date, end_date, max(date_windows, default=0))
+
+    _, is_buy, price, amount, _ = trade_columns(trade_df)
+    store = as_rate_store(filtered_df)  # 구간 인덱스를 date_window 마다 다시 만들지 않도록 한 번만 변환
+    totals = np.zeros((len(date_windows), len(adjustments), 5))
+    for i, date_window in enumerate(date_windows):
+        if cancel is not None and cancel.is_set():
+            raise SweepCancelled(f'{i}/{len(date_windows)} date_window 에서 취소됨')
+        best = best_prices(store, trade_df, [date_window])[:, 0]
+        totals[i] = cell_totals(best, is_buy, price, amount, adjustments)
+        if on_window is not None:
+            on_window(i, totals[i])
+    return profit_rows(date_windows, adjustments, totals, len(trade_df))
+
+
+# 야후 OHLC 목표가 분석 함수 (목표가가 일봉 저가~고가 안에 들어오면 매칭)
+def analyze_ohlc_target_prices(filtered_df, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, lazy=False):
+    # 통화별로 Date 정렬된 일봉에 대해 모든 거래를 일괄 매칭 (lazy=True 면 matched_rates 는 페이지 단위로 펼치는 MatchedBars)
+    return match_ohlc_target_prices(filtered_df, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, lazy=lazy)
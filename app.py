@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
-from data import load_data, filter_trade_data, load_final_data, load_trade_data
-import itertools
-from profit import analyze_target_prices, calculate_profit, display_metrics, plot_matching_success
+from data import load_data, filter_trade_data, load_dataset, load_job_manager, load_rate_chart_series, load_result_cache
+from matching import TradeProfit
+from analysis import calculate_profit, fill_time_stats  # 결과는 조건별 캐시에서 오므로 DataFrame 해시 캐시 없이 바로 계산
+from profit import display_metrics, plot_matching_success, plot_profit_over_time
 import matplotlib.pyplot as plt
 import matplotlib as rc
 import seaborn as sns
 import logging
+import os
+from instrument import StageTimer
 
 # 로깅 설정
 logging.basicConfig(
@@ -22,10 +25,22 @@ logging.basicConfig(
 # 한글 깨짐 방지
 rc.rcParams['font.family'] = 'AppleGothic'
 
+# 단계별 실행 시간 기록 (체크하면 이번 실행을 cProfile 로 측정)
+profile_run = st.sidebar.checkbox('이번 실행 cProfile 측정', value=False)
+timer = StageTimer('app', profile=profile_run)
+ran = False  # 분석/시뮬레이션 버튼으로 실행했는지
+
 # 데이터 로드
-final_df = load_final_data()
-trade_df = load_trade_data()
+with timer.stage('load') as record:
+    # 통화별 정렬 배열 (세션 간 공유), 거래 데이터, 결과 캐시 키에 쓰는 데이터 버전을 같은 시점으로 로드
+    rate_store, trade_df, data_version = load_dataset()
+    record['rows_out'] = len(trade_df)
+    record['ticks'] = rate_store.tick_count()
 # final_df, trade_df = load_data()
+# 분석 결과 캐시: 데이터 버전 + 분석 조건으로 재사용
+result_cache = load_result_cache()
+# 조합 시뮬레이션 백그라운드 작업 (세션 간 공유, 완료 결과는 디스크에 보관)
+job_manager = load_job_manager()
 
 # Streamlit 앱 메인
 st.title('환율 목표가 분석')
@@ -35,7 +50,7 @@ tab1, tab2 = st.tabs(['analysis', 'simulation'])
 # 사이드 바 설정
 st.sidebar.header('분석 설정')
 # 날짜 범위 선택
-max_date = max(final_df['createdAt'].max(), trade_df['executedAt'].max())
+max_date = max(rate_store.max_time(), trade_df['executedAt'].max())
 
 # 가장 최근 날짜 기준 일주일 전 계산
 one_week_ago = max_date - timedelta(days=7)
@@ -48,6 +63,16 @@ end_date = st.sidebar.date_input('종료일', max_date)
 available_currencies = ['USD', 'JPY']
 selected_currencies = st.sidebar.multiselect('통화 선택', available_currencies, default=available_currencies)
 
+# 환율 데이터 메모리 사용량
+rate_memory = rate_store.memory_usage().sum()
+st.sidebar.caption(f"환율 데이터 메모리: {rate_store.nbytes / 2**20:.1f} MB (틱 {rate_memory['ticks'] / 2**20:.1f} MB, "
+                   f"구간 인덱스 {rate_memory['window_index'] / 2**20:.1f} MB, 봉 {rate_memory['bars'] / 2**20:.1f} MB / "
+                   f"DataFrame {rate_store.frame_nbytes / 2**20:.1f} MB)")
+# 결과 캐시 적중 현황
+cache_stats = result_cache.stats()
+st.sidebar.caption(f"결과 캐시: 적중 {cache_stats['hits']} / 부분 적중 {cache_stats['partial_hits']} / 미스 {cache_stats['misses']} "
+                   f"(디스크 {cache_stats['disk_hits']}), {cache_stats['entries']}개 {cache_stats['bytes'] / 2**20:.1f} MB")
+
 with tab1 : 
     # 분석 기간 설정
     date_window = st.slider('환율 분석 기간(일)', 1, 30, 1)
@@ -59,17 +84,27 @@ with tab1 :
     # 분석 실행 버튼
     if st.button('분석 실행'):
         logging.info("분석 실행 버튼 클릭됨")
+        ran = True
 
         # 통화 선택 후 데이터 필터링
-        filtered_trade_df = filter_trade_data(trade_df, selected_currencies)
-        filtered_df = final_df[final_df['currencyCode'].isin(selected_currencies)]
-        logging.info("데이터 필터링 완료")
+        with timer.stage('filter', rows_in=len(trade_df)) as record:
+            filtered_trade_df = filter_trade_data(trade_df, selected_currencies)
+            filtered_df = rate_store  # 통화는 거래 쪽에서 걸러지므로 환율은 복사 없이 그대로 사용
+            record['rows_out'] = len(filtered_trade_df)
         # 분석 실행
         start_datetime = datetime.combine(start_date, datetime.min.time())
         end_datetime = datetime.combine(end_date, datetime.max.time())
         st.markdown(f"{start_datetime}부터 {end_datetime}까지의 자료를 분석합니다...")
-        results_df, matched_rates_df = analyze_target_prices(filtered_df, filtered_trade_df, start_datetime, end_datetime, buy_price_adjustment, sell_price_adjustment, date_window)
-        logging.info("분석 실행 완료")
+        with timer.stage('match', rows_in=len(filtered_trade_df)) as record:
+            results_df, matched_rates_df = result_cache.analyze(filtered_df, filtered_trade_df, start_datetime, end_datetime, buy_price_adjustment, sell_price_adjustment, date_window,
+                                                                version=data_version, tag=selected_currencies)
+            record['rows_out'] = len(matched_rates_df)
+        # 페이지 이동 등으로 다시 실행돼도 결과를 유지
+        st.session_state['analysis'] = (results_df, matched_rates_df, filtered_trade_df)
+
+    if 'analysis' in st.session_state:
+        results_df, matched_rates_df, filtered_trade_df = st.session_state['analysis']
+        render = timer.begin('render', rows_in=len(results_df))
         # 결과 표시
         st.header('분석 결과')
         # 전체 통계
@@ -114,17 +149,36 @@ with tab1 :
                         labels={'목표가 도달': '목표가 도달 거래 수', 'currency': '통화'})
         st.plotly_chart(fig_bar)
 
+        # 목표가 도달까지 걸린 시간 (매칭할 때 기록한 첫 도달 시각으로 계산, 매칭 행을 펼치지 않음)
+        st.subheader('목표가 도달까지 걸린 시간')
+        st.dataframe(fill_time_stats(results_df), hide_index=True)
+        st.caption('체결 시각부터 처음 목표가에 도달한 틱까지의 시간 (단위: 시간, pXX 는 분위수)')
+
+        # 환율 시계열 (화면 폭에 맞게 축약, 구간을 좁히면 원본 틱까지 확대)
+        st.subheader('환율 시계열')
+        chart_start = datetime.combine(start_date, datetime.min.time())
+        chart_end = datetime.combine(end_date, datetime.max.time()).replace(microsecond=0) + timedelta(days=date_window)
+        zoom_start, zoom_end = st.slider('확대 구간', min_value=chart_start, max_value=chart_end, value=(chart_start, chart_end),
+                                         step=timedelta(minutes=1), format='MM/DD HH:mm')
+        chart_df = load_rate_chart_series().frame(selected_currencies, zoom_start, zoom_end, n_points=1500)
+        st.plotly_chart(px.line(chart_df, x='createdAt', y='basePrice', color='currencyCode',
+                                title='통화별 매매기준율', labels={'basePrice': '매매기준율', 'createdAt': '시각'}))
+        st.caption(f'{len(chart_df):,}개 점 표시 (구간을 좁히면 더 촘촘하게 표시)')
+
         # 거래 데이터 표시
         st.subheader('거래 데이터')
         st.dataframe(filtered_trade_df)
 
-        # 목표가 도달 데이터 표시
+        # 목표가 도달 데이터 표시 (한 페이지씩만 행으로 펼침)
         if not matched_rates_df.empty:
             st.subheader('목표가 도달 데이터')
-            matched_rates_df['time_diff'] = matched_rates_df['createdAt'] - matched_rates_df['trade_executedAt']
-            # 시간순으로 정렬
-            matched_rates_df = matched_rates_df.sort_values(['currency', 'createdAt'])
-            st.dataframe(matched_rates_df)
+            page_size = 1000
+            page_count = (len(matched_rates_df) - 1) // page_size + 1
+            page = st.number_input(f'페이지 (전체 {len(matched_rates_df):,}행, {page_count}페이지, 통화/시각 순)', min_value=1, max_value=page_count, value=1, key='matched_page')
+            # 전체 행을 통화, 시간순으로 정렬한 뒤 현재 페이지만 펼침
+            matched_page_df = matched_rates_df.page((page - 1) * page_size, page * page_size, sort_by_time=True)
+            matched_page_df['time_diff'] = matched_page_df['createdAt'] - matched_page_df['trade_executedAt']
+            st.dataframe(matched_page_df)
         else:
             st.warning('선택한 기간 동안 목표가에 도달한 데이터가 없습니다.')
 
@@ -137,36 +191,136 @@ with tab1 :
             st.dataframe(not_matched_df)
         else:
             st.warning('목표가 도달 못한 거래 데이터가 없습니다.')
+        timer.end(render, rows_out=len(results_df))
+
+# 조합 시뮬레이션 결과 시각화
+def plot_sweep_results(profit_df):
+    # 피벗 테이블 생성
+    heatmap_data1 = profit_df.pivot_table(index="date_window", columns="adjustment", values=["total_buy_pro", "total_sell_pro"])
+    # 열지도 그리기
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(heatmap_data1, annot=True, fmt=".0f", cmap="YlGnBu", annot_kws={"size": 8})  # 텍스트 크기 조정
+    plt.title('profit heatmap')
+    plt.xlabel('adjustment')
+    plt.ylabel('date')
+    st.pyplot(plt)
+
+    heatmap_data2 = profit_df.pivot_table(index="date_window", columns="adjustment", values=["total_success_rate"])
+    # 열지도 그리기
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(heatmap_data2, annot=True, fmt=".1f", cmap="YlGnBu")
+    plt.title('total_success_rate heatmap')
+    plt.xlabel('adjustment')
+    plt.ylabel('date')
+    st.pyplot(plt)
+
+    # 매수 거래량 바 그래프 시각화
+    buy_volume_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_buy_amo")
+    fig_buy_volume = px.line(buy_volume_data, 
+                              title='매수 거래금액(amount) 바 그래프', 
+                              labels={'value': '거래량', 'date_window': '날짜 범위'})
+    st.plotly_chart(fig_buy_volume)
+
+    # 매도 거래량 바 그래프 시각화
+    sell_volume_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_sell_amo")
+    fig_sell_volume = px.line(sell_volume_data, 
+                               title='매도 거래금액(amount) 바 그래프', 
+                               labels={'value': '거래량', 'date_window': '날짜 범위'})
+    st.plotly_chart(fig_sell_volume)
+
+    # 매수 수익 바 그래프 시각화
+    buy_profit_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_buy_pro")
+    fig_buy_profit = px.line(buy_profit_data, 
+                              title='매수 수익 바 그래프', 
+                              labels={'value': '수익', 'date_window': '날짜 범위'})
+    st.plotly_chart(fig_buy_profit)
+
+    # 매도 수익 바 그래프 시각화
+    sell_profit_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_sell_pro")
+    fig_sell_profit = px.line(sell_profit_data, 
+                               title='매도 수익 바 그래프', 
+                               labels={'value': '수익', 'date_window': '날짜 범위'})
+    st.plotly_chart(fig_sell_profit)
+
+
+
+# 진행 중인 조합 시뮬레이션: 이 부분만 1초마다 다시 그리고, 끝나면 전체를 다시 실행해 최종 결과를 표시
+@st.fragment(run_every=1.0)
+def show_sweep_progress(job_id):
+    job = job_manager.get(job_id)
+    if job.finished:
+        st.rerun()
+    profit_df = job.profit_df()
+    st.subheader(f'조합 시뮬레이션 ({job.job_id})')
+    st.progress(job.progress, text=f'실행 중: {job.cells_done}/{job.cells_total} 조합')
+    if st.button('시뮬레이션 취소', key=f'cancel_{job.job_id}'):
+        job.cancel()
+    if len(profit_df):
+        # 끝난 date_window 부터 열지도에 채워 넣음
+        partial = profit_df.assign(total_pro=profit_df['total_buy_pro'] + profit_df['total_sell_pro'])
+        heatmap = partial.pivot_table(index='date_window', columns='adjustment', values='total_pro')
+        st.plotly_chart(px.imshow(heatmap.reindex(job.date_windows), text_auto='.0f', aspect='auto',
+                                  color_continuous_scale='YlGnBu', title='profit heatmap (진행 중)'))
+
+
+# 끝난 조합 시뮬레이션 결과 (다시 실행해도 작업에 저장된 결과를 그대로 사용)
+def show_sweep_result(job):
+    profit_df = job.profit_df()
+    st.subheader(f'조합 시뮬레이션 ({job.job_id})')
+    if job.status == 'failed':
+        st.error(f'시뮬레이션 실패: {job.error}')
+        return
+    if job.status == 'cancelled':
+        st.warning(f'시뮬레이션이 취소되었습니다. 끝난 {job.cells_done}/{job.cells_total} 조합만 표시합니다.')
+    if profit_df.empty:
+        return
+    render = timer.begin('render', rows_in=len(profit_df))
+    plot_sweep_results(profit_df)
+    timer.end(render, rows_out=len(profit_df))
+    if job.status == 'done' and st.session_state.get('saved_sweep_job') != job.job_id:
+        profit_df.to_csv('./test.csv')
+        st.session_state['saved_sweep_job'] = job.job_id
+        logging.info(f"시뮬레이션 결과 csv 파일 저장: {job.job_id}")
 
 with tab2 :
     # 사용자 입력 받기
     date_window = st.number_input('환율 분석 기간(일)', min_value=1, max_value=30, value=1)
     adjustment = st.number_input('목표가 조정값', min_value=0, max_value=10, value=1, step=1)
     n_adjustment = st.number_input('현재 조정값', min_value=0, max_value=10, value=1, step=1)
+    n_workers = st.number_input('병렬 워커 수 (1 = 순차 실행)', min_value=1, max_value=os.cpu_count() or 1, value=1, step=1)
     # 버튼 클릭 시 여러 시뮬레이션 실행
     if st.button('모든 조합 시뮬레이션 실행'):
         logging.info("시뮬레이션 버튼 클릭")
+        ran = True
         # 결과 저장용 리스트
         buy_results = []  # 매수 결과 저장
         sell_results = []  # 매도 결과 저장
 
         # 통화 선택 후 데이터 필터링
-        filtered_trade_df = filter_trade_data(trade_df, selected_currencies)
-        filtered_df = final_df[final_df['currencyCode'].isin(selected_currencies)]
-        logging.info("데이터 필터링 완료")
+        with timer.stage('filter', rows_in=len(trade_df)) as record:
+            filtered_trade_df = filter_trade_data(trade_df, selected_currencies)
+            filtered_df = rate_store  # 통화는 거래 쪽에서 걸러지므로 환율은 복사 없이 그대로 사용
+            record['rows_out'] = len(filtered_trade_df)
         # 분석 실행
         start_datetime = datetime.combine(start_date, datetime.min.time())
         end_datetime = datetime.combine(end_date, datetime.max.time())
         st.markdown(f"{start_datetime}부터 {end_datetime}까지의 자료를 분석합니다...")
-        n_results_df, matched_rates_df = analyze_target_prices(filtered_df, filtered_trade_df, start_datetime, end_datetime, n_adjustment, n_adjustment, date_window)
+        with timer.stage('match', rows_in=len(filtered_trade_df)) as record:
+            n_results_df, _ = result_cache.analyze(filtered_df, filtered_trade_df, start_datetime, end_datetime, n_adjustment, n_adjustment, date_window,
+                                                   version=data_version, tag=selected_currencies)
+            record['rows_out'] = len(n_results_df)
         st.success("모든 조합 시뮬레이션이 완료되었습니다.")
         st.markdown(f"---")
-        (buy_profit_df, total_buy_amo, total_buy_pro), (sell_profit_df, total_sell_amo, total_sell_pro) = calculate_profit(n_results_df, n_adjustment, start_date, end_date, date_window)
+        with timer.stage('profit', rows_in=len(n_results_df)) as record:
+            # 두 조정값의 results 는 같은 거래에서 나오므로 중복 제거 키 인덱스를 한 번만 만들어 함께 사용
+            profit_kernel = TradeProfit.from_results(n_results_df)
+            (buy_profit_df, total_buy_amo, total_buy_pro), (sell_profit_df, total_sell_amo, total_sell_pro) = calculate_profit(n_results_df, n_adjustment, start_date, end_date, date_window, profit_kernel)
+            record['rows_out'] = len(buy_profit_df) + len(sell_profit_df)
         # n_success_rate = (n_results_df['found'].sum() / len(n_results_df)) * 100
          # 전체 통계
         display_metrics(n_results_df, buy_profit_df, sell_profit_df, n_adjustment, total_buy_amo, total_buy_pro, total_sell_amo, total_sell_pro)   
         logging.info(f"조합 분석 실행중 ... {len(n_results_df)}")
-        n_results_df = n_results_df.drop_duplicates(subset=['currency', 'executedAt', 'amount'])
+        n_results_df = profit_kernel.unique(n_results_df)
         logging.info(f"조합 중복 제거... {len(n_results_df)}")
 
         st.markdown(f"---")        
@@ -175,13 +329,18 @@ with tab2 :
 
         # st.markdown(f"---")
         st.subheader("profit")
-        results_df, matched_rates_df = analyze_target_prices(filtered_df, filtered_trade_df, start_datetime, end_datetime, adjustment, adjustment, date_window)
-        (pre_buy_profit_df, pre_total_buy_amo, pre_total_buy_pro), (pre_sell_profit_df, pre_total_sell_amo, pre_total_sell_pro) = calculate_profit(results_df, adjustment, start_date, end_date, date_window)
+        with timer.stage('match', rows_in=len(filtered_trade_df)) as record:
+            results_df, _ = result_cache.analyze(filtered_df, filtered_trade_df, start_datetime, end_datetime, adjustment, adjustment, date_window,
+                                                 version=data_version, tag=selected_currencies)
+            record['rows_out'] = len(results_df)
+        with timer.stage('profit', rows_in=len(results_df)) as record:
+            (pre_buy_profit_df, pre_total_buy_amo, pre_total_buy_pro), (pre_sell_profit_df, pre_total_sell_amo, pre_total_sell_pro) = calculate_profit(results_df, adjustment, start_date, end_date, date_window, profit_kernel)
+            record['rows_out'] = len(pre_buy_profit_df) + len(pre_sell_profit_df)
         
         # success_rate = (results_df['found'].sum() / len(results_df)) * 100
         display_metrics(results_df, pre_buy_profit_df, pre_sell_profit_df, adjustment, pre_total_buy_amo, pre_total_buy_pro, pre_total_sell_amo, pre_total_sell_pro)   
         logging.info(f"조합 분석 실행중 ... {len(results_df)}")
-        results_df = results_df.drop_duplicates(subset=['currency', 'executedAt', 'amount'])
+        results_df = profit_kernel.unique(results_df)
         logging.info(f"조합 중복 제거... {len(results_df)}")        
         st.markdown(f"---")        
         pre_profit_df = pd.concat([pre_buy_profit_df, pre_sell_profit_df])
@@ -192,111 +351,42 @@ with tab2 :
         plot_matching_success(n_results_df, "Matching Success for N Adjustment")
         plot_matching_success(results_df, "Matching Success for Pre Adjustment")
 
+        # 수익을 체결일이 아닌 실제 목표가 도달일로 나눠 표시
+        if not n_profit_df.empty:
+            st.header("Profit by Fill Date")
+            plot_profit_over_time(n_profit_df, "Profit by Fill Date for N Adjustment", date_column='first_hit_at')
+
         # 가능한 모든 조합 생성
         date_windows = range(1, date_window + 1) 
         adjustments = [i * 1.0 for i in range(1, adjustment + 1)]  # 목표가
 
-        # 수익 기록을 위한 리스트
-        profit_results = []
-
-        # 모든 조합 생성
-        all_combinations = itertools.product(date_windows, adjustments)
-
-        # 각 조합에 대해 분석 실행
-        for i, j in all_combinations:
-            # 분석 실행 (각 조정값별로)
-            results_df, _ = analyze_target_prices(
-                filtered_df, 
-                filtered_trade_df, 
-                start_datetime, 
-                end_datetime, 
-                j,  # 목표가 설정 (매도)
-                j,  # 목표가 설정 (매수)
-                i   # date_window
-            )
-            logging.info(f"{i, j}조합 분석 실행중 ... {len(results_df)}")
-            results_df = results_df.drop_duplicates(subset=['currency', 'executedAt', 'amount'])
-            logging.info(f"{i, j}조합 중복 제거... {len(results_df)}")
-            logging.info(f"{results_df.head(10)}")
-            total_found = results_df['found'].sum()
-            total_success_rate = (total_found / len(results_df)) * 100 if len(results_df) > 0 else 0
-            # calculate_profit 함수 호출하여 수익 계산
-            (buy_profit_df, total_buy_amo, total_buy_pro), (sell_profit_df, total_sell_amo, total_sell_pro) = calculate_profit(
-                results_df, 
-                j,  # 조정값
-                start_datetime, 
-                end_datetime,
-                i   # date_window                
-            )
-
-            # 결과 조합 정보 추가
-            profit_results.append({
-                'date_window': i,
-                'adjustment': j,
-                'total_buy_amo': total_buy_amo,
-                'total_buy_pro': total_buy_pro,
-                'total_sell_amo': total_sell_amo,
-                'total_sell_pro': total_sell_pro,
-                'total_success_rate': total_success_rate.round(2),
-            })
-
-            # 결과 출력 (각 조건별로 변동되는 수익과 거래량을 확인)
-            logging.info(f"조건: (date_window: {i}, adjustment: {j})")
-            logging.info(f"매수 거래량: {total_buy_amo}, 매도 거래량: {total_sell_amo}")
-            logging.info(f"매수 수익: {total_buy_pro}, 매도 수익: {total_sell_pro}")
-
-        # 결과를 DataFrame으로 변환
-        profit_df = pd.DataFrame(profit_results)
-        logging.info(f"시뮬레이션 실행 완료")
-        logging.info(f"{profit_df.head(10)}")
-        # 피벗 테이블 생성
-        heatmap_data1 = profit_df.pivot_table(index="date_window", columns="adjustment", values=["total_buy_pro", "total_sell_pro"])
-        # 열지도 그리기
-        plt.figure(figsize=(12, 8))
-        sns.heatmap(heatmap_data1, annot=True, fmt=".0f", cmap="YlGnBu", annot_kws={"size": 8})  # 텍스트 크기 조정
-        plt.title('profit heatmap')
-        plt.xlabel('adjustment')
-        plt.ylabel('date')
-        st.pyplot(plt)
-        
-        heatmap_data2 = profit_df.pivot_table(index="date_window", columns="adjustment", values=["total_success_rate"])
-        # 열지도 그리기
-        plt.figure(figsize=(12, 8))
-        sns.heatmap(heatmap_data2, annot=True, fmt=".1f", cmap="YlGnBu")
-        plt.title('total_success_rate heatmap')
-        plt.xlabel('adjustment')
-        plt.ylabel('date')
-        st.pyplot(plt)
-
-        # 매수 거래량 바 그래프 시각화
-        buy_volume_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_buy_amo")
-        fig_buy_volume = px.line(buy_volume_data, 
-                                  title='매수 거래금액(amount) 바 그래프', 
-                                  labels={'value': '거래량', 'date_window': '날짜 범위'})
-        st.plotly_chart(fig_buy_volume)
-
-        # 매도 거래량 바 그래프 시각화
-        sell_volume_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_sell_amo")
-        fig_sell_volume = px.line(sell_volume_data, 
-                                   title='매도 거래금액(amount) 바 그래프', 
-                                   labels={'value': '거래량', 'date_window': '날짜 범위'})
-        st.plotly_chart(fig_sell_volume)
-
-        # 매수 수익 바 그래프 시각화
-        buy_profit_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_buy_pro")
-        fig_buy_profit = px.line(buy_profit_data, 
-                                  title='매수 수익 바 그래프', 
-                                  labels={'value': '수익', 'date_window': '날짜 범위'})
-        st.plotly_chart(fig_buy_profit)
-
-        # 매도 수익 바 그래프 시각화
-        sell_profit_data = profit_df.pivot_table(index="date_window", columns="adjustment", values="total_sell_pro")
-        fig_sell_profit = px.line(sell_profit_data, 
-                                   title='매도 수익 바 그래프', 
-                                   labels={'value': '수익', 'date_window': '날짜 범위'})
-        st.plotly_chart(fig_sell_profit)
+        # 모든 조합은 백그라운드 작업으로 계산 (워커 수가 2 이상이면 작업 안에서 프로세스 풀 사용)
+        # 같은 조건으로 다시 누르면 진행 중이거나 끝난 작업을 그대로 이어서 보여줌
+        job = job_manager.submit(filtered_df, filtered_trade_df, start_datetime, end_datetime, date_windows, adjustments,
+                                 workers=n_workers, version=data_version, tag=selected_currencies)
+        st.session_state['sweep_job'] = job.job_id
+        logging.info(f"시뮬레이션 작업 제출: {job.job_id} ({job.cells_total}개 조합)")
 
         profit_results_df = pd.DataFrame(results_df)
         profit_results_df.to_csv('./result.csv')
-        profit_df.to_csv('./test.csv')
-        logging.info("분석 실행 완료 및 csv 파일 저장")
\ No newline at end of file
+
+    # 작업 진행률/부분 결과 (버튼을 누르지 않은 다시 실행에서도 유지)
+    sweep_job = job_manager.get(st.session_state['sweep_job']) if 'sweep_job' in st.session_state else None
+    if sweep_job is not None and not sweep_job.finished:
+        show_sweep_progress(sweep_job.job_id)
+    elif sweep_job is not None:
+        show_sweep_result(sweep_job)
+
+# 버튼으로 실행한 경우에만 단계별 기록을 JSON lines 로 남기고 사이드바에 표시
+if ran:
+    timer.write_jsonl('./metrics.jsonl')
+    st.session_state['stage_metrics'] = timer.to_frame()
+    st.session_state['profile_stats'] = timer.profile_stats(limit=25)
+    timer.dump_profile(f'./profiles/{timer.run_id}.prof')
+if 'stage_metrics' in st.session_state:
+    with st.sidebar.expander('마지막 실행 단계별 시간', expanded=True):
+        stage_df = st.session_state['stage_metrics']
+        st.dataframe(stage_df, hide_index=True)
+        st.caption(f"합계 {stage_df['seconds'].sum():.3f}s")
+        if st.session_state.get('profile_stats'):
+            st.code(st.session_state['profile_stats'], language=None)
@@ -0,0 +1,111 @@
+"""통화별 다중 해상도 (예: 1일, 1시간) 최저/최고가 봉
+
+거래 대부분은 구간 초반에 목표가를 크게 넘기거나 (봉 전체가 도달) 아예 근처에도 오지 않는다 (봉 전체가 미도달).
+매칭 커널은 구간을 큰 봉부터 훑으며 봉의 최저/최고가만으로 판정하고, 목표가가 봉의 최저가와 최고가 사이에
+걸친 봉과 구간 양 끝의 잘린 봉만 다음 (더 작은) 해상도로, 마지막에는 원본 틱으로 내려가 비교한다.
+
+    bars = store.bar_index()          # BarIndex, numba 커널을 쓸 때 로더가 미리 만들어 둠 (아니면 처음 쓸 때)
+    bars['USD'].levels[0].low         # 1일 봉 최저가
+    bars.stats()                      # 매칭 커널이 판정한 봉 수 / 비교한 원본 틱 수
+"""
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = ('1D', '1h')
+
+
+class BarLevel:
+    """한 해상도의 봉 배열 (빈 봉은 만들지 않음, 봉 경계는 1970-01-01 기준 resolution 배수)
+
+    starts/ends 는 봉에 속한 틱의 인덱스 범위 [start, end), valid 는 NaN 이 아닌 틱 수,
+    first_valid 는 봉 안 첫 번째 NaN 이 아닌 틱 인덱스 (없으면 -1). low/high 는 NaN 을 무시한다.
+    """
+
+    def __init__(self, resolution, created_at, prices):
+        self.resolution = pd.Timedelta(resolution)
+        bar_id = created_at.view('int64') // self.resolution.value
+        is_valid = ~np.isnan(prices)
+        if len(bar_id):
+            self.starts = np.flatnonzero(np.r_[True, bar_id[1:] != bar_id[:-1]]).astype('int64')
+            self.low = np.fmin.reduceat(prices, self.starts)
+            self.high = np.fmax.reduceat(prices, self.starts)
+            self.valid = np.add.reduceat(is_valid.astype('int64'), self.starts)
+        else:
+            self.starts = np.empty(0, dtype='int64')
+            self.low = self.high = np.empty(0)
+            self.valid = np.empty(0, dtype='int64')
+        self.ends = np.r_[self.starts[1:], len(bar_id)][:len(self.starts)].astype('int64')
+        valid_idx = np.flatnonzero(is_valid)
+        self.first_valid = np.full(len(self.starts), -1, dtype='int64')
+        has_valid = self.valid > 0
+        self.first_valid[has_valid] = valid_idx[np.searchsorted(valid_idx, self.starts[has_valid])]
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.starts, self.ends, self.low, self.high, self.valid, self.first_valid))
+
+
+class CurrencyBars:
+    """한 통화의 해상도별 BarLevel (큰 봉부터)"""
+
+    def __init__(self, created_at, prices, resolutions=RESOLUTIONS):
+        prices = np.asarray(prices, dtype='float64')
+        resolutions = sorted((pd.Timedelta(r) for r in resolutions), reverse=True)
+        self.levels = [BarLevel(resolution, created_at, prices) for resolution in resolutions]
+        self.bars_touched = 0   # 매칭 커널이 봉 최저/최고가로 판정한 봉 수
+        self.ticks_touched = 0  # 매칭 커널이 원본 틱과 비교한 횟수
+        self._kernel_arrays = None
+
+    @property
+    def nbytes(self):
+        """해상도별 봉 + (만들었으면) 매칭 커널용으로 이어 붙인 배열"""
+        kernel = sum(array.nbytes for array in self._kernel_arrays) if self._kernel_arrays is not None else 0
+        return sum(level.nbytes for level in self.levels) + kernel
+
+    def kernel_arrays(self):
+        """매칭 커널용으로 해상도를 이어 붙인 배열 (starts, ends, low, high, valid, first_valid, level_offsets)
+
+        해상도 L 의 봉은 [level_offsets[L], level_offsets[L + 1]) 위치에 있다.
+        """
+        if self._kernel_arrays is None:
+            columns = ('starts', 'ends', 'low', 'high', 'valid', 'first_valid')
+            arrays = [np.concatenate([getattr(level, column) for level in self.levels]) if self.levels
+                      else np.empty(0, dtype='float64' if column in ('low', 'high') else 'int64') for column in columns]
+            level_offsets = np.r_[0, np.cumsum([len(level) for level in self.levels])].astype('int64')
+            self._kernel_arrays = (*arrays, level_offsets)
+        return self._kernel_arrays
+
+
+class BarIndex:
+    """데이터셋마다 한 번 만드는 통화별 다중 해상도 봉 (RateStore.bar_index())"""
+
+    def __init__(self, currencies, resolutions=RESOLUTIONS):
+        self.currencies = currencies  # {통화: CurrencyBars}
+        self.resolutions = tuple(resolutions)
+
+    @classmethod
+    def from_rate_store(cls, store, resolutions=RESOLUTIONS):
+        return cls({currency: CurrencyBars(ticks.created_at, ticks.prices, resolutions)
+                    for currency, ticks in store.items()}, resolutions)
+
+    def __contains__(self, currency):
+        return currency in self.currencies
+
+    def __getitem__(self, currency):
+        return self.currencies[currency]
+
+    @property
+    def nbytes(self):
+        return sum(bars.nbytes for bars in self.currencies.values())
+
+    def stats(self):
+        """지금까지 매칭 커널이 판정한 봉 수와 비교한 원본 틱 수 (모든 통화 합)"""
+        return {'bars_touched': sum(bars.bars_touched for bars in self.currencies.values()),
+                'ticks_touched': sum(bars.ticks_touched for bars in self.currencies.values())}
+
+    def reset_stats(self):
+        for bars in self.currencies.values():
+            bars.bars_touched = bars.ticks_touched = 0
@@ -0,0 +1,237 @@
+"""Streamlit 없이 목표가 분석 / 전체 조합 시뮬레이션을 실행하는 배치 CLI
+
+streamlit, plotly, matplotlib, seaborn 을 import 하지 않으므로 야간 배치나 화면 없는 서버에서 바로 실행된다.
+
+    python batch.py analyze --start 2025-02-10 --end 2025-02-25 --currencies USD,JPY \\
+        --buy-adj 1 --sell-adj 1 --window 1 --output results.parquet --matched-output matched.parquet
+    python batch.py sweep --windows 1-30 --adjustments 1-10 --workers 4 --output profit.csv
+
+--start / --end 를 생략하면 앱과 같이 마지막 데이터 날짜 기준 최근 일주일을 분석한다.
+출력 형식은 확장자(.parquet / .csv)로 정한다.
+FX_DB_* 환경 변수로 DB 가 설정되어 있으면 CSV 대신 DB 에서 통화/기간 조건을 SQL 로 걸어 읽는다 (db.py).
+analyze 에 --chunk-rows 를 주면 환율 데이터를 전부 메모리에 올리지 않고 청크 단위로 분석한다 (chunked.py).
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from analysis import analyze_target_prices, simulate_profit
+from chunked import analyze_chunked
+from db import source_from_env
+from instrument import StageTimer
+from loading import (filter_trade_data, iter_final_chunks, load_snapshot_data, read_cached, read_rate_store,
+                     read_trade_csv)
+from rate_store import RateStore
+from sweep import simulate_profit_parallel
+
+logger = logging.getLogger(__name__)
+
+
+def load_inputs(rates_path, trades_path, snapshot_path=None, cache=True, source=None, currencies=None, bounds=None):
+    """환율 저장소와 거래 데이터를 로드 (snapshot_path 가 있으면 매매기준율 스냅샷 파일 사용)
+
+    source(db.SqlSource) 가 있으면 DB 에서 읽고, 통화와 bounds=(시작, 종료, 환율 종료) 조건을 SQL 로 보낸다.
+    """
+    if source is not None and not snapshot_path:
+        start, end, rates_end = bounds or (None, None, None)
+        return RateStore.from_frame(source.read_rates(start, rates_end, currencies)), source.read_trades(start, end, currencies)
+    store = RateStore.from_frame(load_snapshot_data(snapshot_path)) if snapshot_path else read_rate_store(rates_path, cache)
+    trade_df = read_cached(trades_path, read_trade_csv) if cache else read_trade_csv(trades_path)
+    return store, trade_df
+
+
+def date_range(store, trade_df, start=None, end=None):
+    """앱과 같은 분석 구간: 시작일 00:00:00 ~ 종료일 23:59:59.999999 (기본은 최근 일주일)
+
+    store 가 None 이면 (청크 모드) 거래 데이터의 마지막 날짜 기준.
+    """
+    if not (start and end):
+        max_date = trade_df['executedAt'].max() if store is None else max(store.max_time(), trade_df['executedAt'].max())
+    start_date = pd.Timestamp(start).date() if start else (max_date - timedelta(days=7)).date()
+    end_date = pd.Timestamp(end).date() if end else max_date.date()
+    return datetime.combine(start_date, datetime.min.time()), datetime.combine(end_date, datetime.max.time())
+
+
+def write_frame(df, path):
+    """확장자에 따라 Parquet 또는 CSV 로 저장"""
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    elif path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f'지원하지 않는 출력 형식입니다: {path} (.parquet / .csv)')
+
+
+def write_matched_rates(matched_rates, path, page_size=100_000):
+    """MatchedRates 를 페이지 단위로 저장 (전체 행을 한 번에 메모리에 올리지 않음)"""
+    if path.endswith('.csv'):
+        matched_rates.to_csv(path, page_size=page_size)
+    elif path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for page in matched_rates.iter_pages(page_size):
+                table = pa.Table.from_pandas(page, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            matched_rates.to_frame().to_parquet(path, index=False)
+    else:
+        raise ValueError(f'지원하지 않는 출력 형식입니다: {path} (.parquet / .csv)')
+
+
+def parse_range(value, cast=int):
+    """'1-5' (정수 구간, 양 끝 포함) 또는 '1,3,5' 형식의 목록"""
+    if ',' not in value and '-' in value:
+        first, last = value.split('-')
+        return [cast(v) for v in range(int(first), int(last) + 1)]
+    return [cast(v) for v in value.split(',')]
+
+
+def filter_stage(timer, trade_df, currencies):
+    with timer.stage('filter', rows_in=len(trade_df)) as record:
+        filtered_trade_df = filter_trade_data(trade_df, currencies)
+        record['rows_out'] = len(filtered_trade_df)
+    return filtered_trade_df
+
+
+def run_analyze(args, timer, store, trade_df, start_datetime, end_datetime):
+    filtered_trade_df = filter_stage(timer, trade_df, args.currencies)
+    with timer.stage('match', rows_in=len(filtered_trade_df)) as record:
+        results_df, matched_rates = analyze_target_prices(store, filtered_trade_df, start_datetime, end_datetime,
+                                                          args.buy_adj, args.sell_adj, args.window, lazy=True)
+        record['rows_out'] = len(matched_rates)
+    with timer.stage('write', rows_in=len(results_df) + len(matched_rates)):
+        write_frame(results_df, args.output)
+        if args.matched_output:
+            write_matched_rates(matched_rates, args.matched_output)
+    found = int(results_df['found'].sum()) if len(results_df) else 0
+    logger.info(f'분석 완료: 거래 {len(results_df)}건, 목표가 도달 {found}건, 매칭 {len(matched_rates)}건 -> {args.output}')
+
+
+def run_analyze_chunked(args, timer, trade_df, start_datetime, end_datetime):
+    if args.matched_output and not args.matched_output.endswith('.csv'):
+        raise ValueError(f'청크 모드의 매칭 결과는 CSV 로만 저장합니다: {args.matched_output}')
+    filtered_trade_df = filter_stage(timer, trade_df, args.currencies)
+    # 청크 모드는 환율 읽기와 매칭이 한 단계
+    with timer.stage('match', rows_in=len(filtered_trade_df), chunk_rows=args.chunk_rows) as record:
+        chunks = iter_final_chunks(args.rates, args.chunk_rows, cache=not args.no_cache)
+        results_df, _ = analyze_chunked(chunks, filtered_trade_df, start_datetime, end_datetime, args.buy_adj, args.sell_adj,
+                                        args.window, matched_path=args.matched_output,
+                                        collect_matches=bool(args.matched_output))
+        record['rows_out'] = len(results_df)
+    with timer.stage('write', rows_in=len(results_df)):
+        write_frame(results_df, args.output)
+    found = int(results_df['found'].sum()) if len(results_df) else 0
+    logger.info(f'청크 분석 완료: 거래 {len(results_df)}건, 목표가 도달 {found}건 -> {args.output}')
+
+
+def run_sweep(args, timer, store, trade_df, start_datetime, end_datetime):
+    filtered_trade_df = filter_stage(timer, trade_df, args.currencies)
+    with timer.stage('sweep', rows_in=len(filtered_trade_df), workers=args.workers) as record:
+        if args.workers > 1:
+            profit_df = simulate_profit_parallel(store, filtered_trade_df, start_datetime, end_datetime,
+                                                 args.windows, args.adjustments, max_workers=args.workers)
+        else:
+            profit_df = simulate_profit(store, filtered_trade_df, start_datetime, end_datetime, args.windows, args.adjustments)
+        record['rows_out'] = len(profit_df)
+    with timer.stage('write', rows_in=len(profit_df)):
+        write_frame(profit_df, args.output)
+    logger.info(f'시뮬레이션 완료: {len(args.windows)} x {len(args.adjustments)} 조합 -> {args.output}')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='환율 목표가 분석 배치 실행')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--rates', default='./final.csv', help='환율 데이터 CSV (final.csv 형식)')
+    common.add_argument('--snapshot', help='매매기준율 스냅샷 파일 (mama.csv 형식, --rates 대신 사용)')
+    common.add_argument('--trades', default='./trade.csv', help='거래 데이터 CSV')
+    common.add_argument('--no-cache', action='store_true', help='Feather 캐시를 쓰지 않고 CSV 를 직접 읽음')
+    common.add_argument('--no-db', action='store_true', help='DB 설정(FX_DB_*)이 있어도 CSV 를 읽음')
+    common.add_argument('--start', help='시작일 (YYYY-MM-DD, 기본: 마지막 날짜 7일 전)')
+    common.add_argument('--end', help='종료일 (YYYY-MM-DD, 기본: 마지막 날짜)')
+    common.add_argument('--currencies', type=lambda v: v.split(','), default=['USD', 'JPY'], help='통화 (쉼표 구분)')
+    common.add_argument('--output', required=True, help='결과 파일 (.parquet / .csv)')
+    common.add_argument('--metrics', help='단계별 시간/행 수/메모리 변화를 추가할 JSON lines 파일')
+    common.add_argument('--profile', help='cProfile 결과를 저장할 .prof 파일 (지정하면 프로파일링)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze = subparsers.add_parser('analyze', parents=[common], help='한 가지 조건으로 목표가 분석')
+    analyze.add_argument('--buy-adj', type=float, default=1.0, help='매수 목표가 조정값')
+    analyze.add_argument('--sell-adj', type=float, default=1.0, help='매도 목표가 조정값')
+    analyze.add_argument('--window', type=int, default=1, help='환율 분석 기간(일)')
+    analyze.add_argument('--matched-output', help='목표가 도달 환율 데이터 파일 (.parquet / .csv)')
+    analyze.add_argument('--chunk-rows', type=int, help='환율 데이터를 이 행 수씩 나눠 읽는 청크 모드 (--rates 만 지원)')
+
+    sweep = subparsers.add_parser('sweep', parents=[common], help='date_window x 조정값 전체 조합 시뮬레이션')
+    sweep.add_argument('--windows', type=parse_range, default=[1], help="date_window 목록 (예: 1-30 또는 1,3,5)")
+    sweep.add_argument('--adjustments', type=lambda v: parse_range(v, float), default=[1.0], help="조정값 목록 (예: 1-10 또는 0.5,1.5)")
+    sweep.add_argument('--workers', type=int, default=1, help='병렬 워커 수 (1 = 순차 실행)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    timer = StageTimer(f'batch-{args.command}', profile=bool(args.profile))
+    started = time.perf_counter()
+    run(args, timer)
+    if args.metrics:
+        timer.write_jsonl(args.metrics)
+    if args.profile:
+        timer.dump_profile(args.profile)
+    for stage, metrics in timer.metrics().items():
+        logger.info(f"{stage:<8} {metrics['seconds']:>9.3f}s  rows {metrics['rows_in']} -> {metrics['rows_out']}  "
+                    f"mem {metrics['mem_delta_mb']:+.1f} MB")
+    logger.info(f'총 실행 시간 {time.perf_counter() - started:.2f}s')
+    return 0
+
+
+def run(args, timer):
+    if args.command == 'analyze' and args.chunk_rows:
+        if args.snapshot:
+            raise SystemExit('--chunk-rows 는 --snapshot 과 함께 쓸 수 없습니다')
+        with timer.stage('load') as record:
+            trade_df = read_cached(args.trades, read_trade_csv) if not args.no_cache else read_trade_csv(args.trades)
+            record['rows_out'] = len(trade_df)
+        start_datetime, end_datetime = date_range(None, trade_df, args.start, args.end)
+        logger.info(f'{start_datetime}부터 {end_datetime}까지의 자료를 {args.chunk_rows}행 청크로 분석합니다...')
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        run_analyze_chunked(args, timer, trade_df, start_datetime, end_datetime)
+        return
+
+    source = None if args.no_db else source_from_env()
+    bounds = None
+    if args.start and args.end:
+        # 기간이 정해져 있으면 DB 에서 그 기간 (환율은 최대 date_window 만큼 더) 만 읽음
+        start_datetime, end_datetime = date_range(None, None, args.start, args.end)
+        max_window = args.window if args.command == 'analyze' else max(args.windows)
+        bounds = (start_datetime, end_datetime, end_datetime + timedelta(days=max_window))
+    with timer.stage('load', source='db' if source is not None else 'csv') as record:
+        store, trade_df = load_inputs(args.rates, args.trades, args.snapshot, cache=not args.no_cache, source=source,
+                                      currencies=args.currencies, bounds=bounds)
+        record['rows_out'] = len(trade_df)
+        record['ticks'] = store.tick_count()
+    start_datetime, end_datetime = date_range(store, trade_df, args.start, args.end)
+    logger.info(f'{start_datetime}부터 {end_datetime}까지의 자료를 분석합니다...')
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    if args.command == 'analyze':
+        run_analyze(args, timer, store, trade_df, start_datetime, end_datetime)
+    else:
+        run_sweep(args, timer, store, trade_df, start_datetime, end_datetime)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,577 @@
+"""매칭/수익 계산 경로 벤치마크
+
+final.csv, trade.csv, 야후 OHLC 와 같은 스키마의 합성 데이터를 원하는 크기로 만들어
+단계별 실행 시간과 최대 메모리를 측정하고 결과를 JSON 으로 저장한다.
+--check 는 작은 합성 데이터로 현재 엔진과 기존 iterrows 구현(reference_*)의 결과가 같은지 확인한다.
+
+    python benchmark.py --ticks 1000000 --trades 100000 --output bench.json
+    python benchmark.py --check
+    python benchmark.py --imports
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_ohlc_target_prices, analyze_target_prices, calculate_profit, simulate_profit
+from bars import BarIndex
+from chunked import analyze_chunked
+from loading import iter_final_chunks, load_snapshot_data, read_final_csv, read_trade_csv
+from match_kernel import numba_available, sweep_matches, two_pointer_sweep
+from matching import match_target_prices, normalize_trades, trade_columns
+from rate_store import RateStore
+from window_index import WindowIndex
+
+# 통화별 시작 기준율과 호가 단위
+BASE_PRICES = {'USD': (1450.0, 0.1), 'JPY': (940.0, 0.01), 'CAD': (1010.0, 0.05), 'CNY': (198.0, 0.01), 'EUR': (1510.0, 0.1)}
+
+
+# ---------------------------------------------------------------------------
+# 합성 데이터
+# ---------------------------------------------------------------------------
+def generate_ticks(n_ticks, currencies=('USD', 'JPY', 'CAD'), start='2025-02-01 09:00:00', interval_seconds=120, seed=0):
+    """final_df 형식 (currencyCode, basePrice, createdAt) 의 합성 환율 틱
+
+    스냅샷마다 모든 통화가 한 줄씩 들어가고, 가격은 호가 단위로 반올림한 랜덤 워크.
+    """
+    rng = np.random.default_rng(seed)
+    n_snapshots = max(n_ticks // len(currencies), 1)
+    jitter = rng.integers(0, 3, n_snapshots)  # 실제 데이터처럼 몇 초씩 밀림
+    created_at = pd.Timestamp(start) + pd.to_timedelta(np.arange(n_snapshots) * interval_seconds + jitter, unit='s')
+
+    prices = np.empty((n_snapshots, len(currencies)))
+    for j, currency in enumerate(currencies):
+        base, tick = BASE_PRICES.get(currency, (1000.0, 0.1))
+        walk = base + np.cumsum(rng.normal(0, base * 2e-4, n_snapshots))
+        prices[:, j] = np.round(walk / tick) * tick
+    return pd.DataFrame({
+        'currencyCode': pd.Categorical(np.tile(currencies, n_snapshots)),
+        'basePrice': np.round(prices.ravel(), 2),
+        'createdAt': np.repeat(created_at.to_numpy(), len(currencies)),
+    })
+
+
+def generate_trades(n_trades, final_df, seed=1):
+    """trade_df 형식의 합성 거래 (로드 후 정규화된 형태)
+
+    체결 시각은 틱 구간 안에서 무작위, 체결가는 그 시각 기준율 근처로 잡아 일부는 목표가에 도달한다.
+    매도는 원화(KRW) -> 외화 코드 변환이 필요한 형태로 만든다.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(final_df), n_trades)
+    currency = final_df['currencyCode'].to_numpy(dtype=object)[rows]
+    base_price = final_df['basePrice'].to_numpy()[rows]
+    executed_at = final_df['createdAt'].to_numpy()[rows] + rng.integers(0, 120, n_trades).astype('timedelta64[s]')
+
+    is_buy = rng.integers(0, 2, n_trades)
+    amount = np.where(currency == 'JPY', rng.integers(10, 500, n_trades) * 1000.0, rng.integers(1, 50, n_trades) * 100.0)
+    trade_df = pd.DataFrame({
+        'isBuyOrder': is_buy,
+        'currencyCode': pd.Categorical(np.where(is_buy == 1, currency, 'KRW')),
+        'amount': amount,
+        'price': np.round(base_price + rng.normal(0, 0.5, n_trades), 2),
+        'executedAt': pd.to_datetime(executed_at).floor('s'),
+        'currencyCode0': pd.Categorical(currency),
+    })
+    return normalize_trades(trade_df.sort_values('executedAt', kind='stable').reset_index(drop=True))
+
+
+def generate_ohlc(final_df):
+    """야후 데이터 형식 (Date, currencyCode, open, high, low, close) 의 일봉"""
+    grouped = final_df.groupby(['currencyCode', final_df['createdAt'].dt.floor('D')], observed=True)['basePrice']
+    ohlc = grouped.agg(open='first', high='max', low='min', close='last').reset_index()
+    return ohlc.rename(columns={'createdAt': 'Date'})[['Date', 'currencyCode', 'open', 'high', 'low', 'close']]
+
+
+def build_tables(index):
+    """WindowIndex 의 통화별 low/high 표를 모두 만들어 둠 (측정용)"""
+    for currency_index in index.currencies.values():
+        currency_index.low, currency_index.high
+    return index
+
+
+def write_final_csv(final_df, path):
+    # read_final_csv 가 읽는 원본 형식 (UTC)
+    raw = final_df.assign(createdAt=(final_df['createdAt'] - pd.Timedelta(hours=9)).dt.strftime('%Y-%m-%d %H:%M:%S'))
+    raw.to_csv(path)
+
+
+def write_trade_csv(trade_df, path):
+    # read_trade_csv 가 읽는 원본 형식 (UTC)
+    raw = trade_df[['isBuyOrder', 'currencyCode', 'amount', 'price', 'executedAt', 'currencyCode0']]
+    raw = raw.assign(executedAt=(raw['executedAt'] - pd.Timedelta(hours=9)).dt.strftime('%Y-%m-%d %H:%M:%S'))
+    raw.to_csv(path, index=False, float_format='%.2f')
+
+
+def write_snapshot_csv(final_df, path):
+    # load_snapshot_data 가 읽는 매매기준율 스냅샷 형식 (createdAt,"{"result":[...]}")
+    created = (final_df['createdAt'] - pd.Timedelta(hours=9)).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    items = [f'{{"currencyCode":"{code}","basePrice":{price!r},"provider":"x"}}'
+             for code, price in zip(final_df['currencyCode'].to_numpy(dtype=object).tolist(), final_df['basePrice'].tolist())]
+    # 같은 createdAt 의 틱을 한 스냅샷 줄로 묶음
+    starts = np.concatenate([[0], np.flatnonzero(created[1:] != created[:-1]) + 1, [len(created)]])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('createdAt,data\n')
+        for start, end in zip(starts[:-1], starts[1:]):
+            f.write(f'{created[start]},"{{"result":[{",".join(items[start:end])}]}}"\n')
+
+
+# ---------------------------------------------------------------------------
+# 기준 구현 (최적화 이전 profit.py / yahoo.py 의 iterrows 루프 그대로)
+# ---------------------------------------------------------------------------
+def reference_analyze_target_prices(filtered_df, trade_df, start_date, end_date, buy_price_adjustment, sell_price_adjustment, date_window):
+    filtered_df = filtered_df[(filtered_df['createdAt'] >= start_date) &
+                              (filtered_df['createdAt'] <= end_date + timedelta(days=date_window))]
+    trade_df = trade_df[(trade_df['executedAt'] >= start_date) &
+                        (trade_df['executedAt'] <= end_date)]
+
+    results = []
+    matched_rates = []
+
+    for idx, trade_row in trade_df.iterrows():
+        currency = trade_row['currencyCode0'] if trade_row['currencyCode'] == 'KRW' else trade_row['currencyCode']
+        trade_date = trade_row['executedAt']
+        if trade_row['isBuyOrder'] == 1:  # 매수
+            target_price = trade_row['price'] - buy_price_adjustment
+            matching_rates = filtered_df[
+                (filtered_df['currencyCode'] == currency) &
+                (filtered_df['basePrice'] <= target_price) &
+                (filtered_df['createdAt'].between(trade_date, trade_date + timedelta(days=date_window)))
+            ]
+        else:  # 매도
+            target_price = trade_row['price'] + sell_price_adjustment
+            matching_rates = filtered_df[
+                (filtered_df['currencyCode'] == currency) &
+                (filtered_df['basePrice'] >= target_price) &
+                (filtered_df['createdAt'].between(trade_date, trade_date + timedelta(days=date_window)))
+            ]
+
+        matches = matching_rates.shape[0]
+        if currency == 'JPY':
+            trade_row['amount'] = trade_row['amount'] // 100
+        if matches > 0:
+            for _, rate_row in matching_rates.iterrows():
+                matched_rates.append({
+                    'currency': currency,
+                    'basePrice': rate_row['basePrice'],
+                    'createdAt': rate_row['createdAt'],
+                    'trade_executedAt': trade_row['executedAt'],
+                    'trade_price': trade_row['price'],
+                    'amount': trade_row['amount'],
+                    'order_type': '매수' if trade_row['isBuyOrder'] == 1 else '매도'
+                })
+
+        results.append({
+            'currency': currency,
+            'order_type': '매수' if trade_row['isBuyOrder'] == 1 else '매도',
+            'original_price': trade_row['price'],
+            'target_price': target_price,
+            'found': matches > 0,
+            'match_count': matches,
+            'amount': trade_row['amount'],
+            'executedAt': trade_row['executedAt']
+        })
+
+    return pd.DataFrame(results), pd.DataFrame(matched_rates)
+
+
+def reference_analyze_ohlc_target_prices(filtered_df, trade_df, buy_price_adjustment, sell_price_adjustment, date_window):
+    results, matched_rates = [], []
+
+    for _, trade_row in trade_df.iterrows():
+        currency = trade_row['currencyCode0'] if trade_row['currencyCode'] == 'KRW' else trade_row['currencyCode']
+
+        trade_date, is_buy_order, trade_price = trade_row['executedAt'], trade_row['isBuyOrder'], trade_row['price']
+        # 매수/매도 목표 가격 설정
+        target_price = trade_price - buy_price_adjustment if is_buy_order else trade_price + sell_price_adjustment
+
+        # 매칭 조건
+        # 1. 통화코드 일치
+        # 2. 저가 보다 높거나 같음
+        # 3. 고가 보다 작거나 같음
+        # 4. 환율 데이터 날짜는 거래 날짜부터 date_window까지
+
+        matching_rates = filtered_df[(filtered_df['currencyCode'] == currency) &
+                                     (filtered_df['low'] <= target_price) &
+                                     (filtered_df['high'] >= target_price) &
+                                     (filtered_df['Date'].between(trade_date, trade_date + timedelta(days=date_window)))]
+
+        matches = len(matching_rates)
+        # 거래 성사 df 생성
+        for _, rate_row in matching_rates.iterrows():
+            matched_rates.append({
+                'currency': currency,
+                'order_type': '매수' if is_buy_order else '매도',
+                'trade_price': trade_price,
+                'highPrice': rate_row['high'],
+                'LowPrice': rate_row['low'],
+                'basePrice': rate_row['close'],
+                'trade_executedAt': trade_date,
+                'createdAt': rate_row['Date'],
+            })
+        # 결과 df 생성
+        results.append({
+            'currency': currency,
+            'order_type': '매수' if is_buy_order else '매도',
+            'original_price': trade_price,
+            'target_price': target_price,
+            'found': matches > 0,
+            'match_count': matches,
+            'executedAt': trade_date,
+        })
+
+    return pd.DataFrame(results), pd.DataFrame(matched_rates)
+
+
+def reference_fill_columns(filtered_df, trade_df, start_date, end_date, buy_price_adjustment, sell_price_adjustment, date_window,
+                           ohlc=False):
+    # 거래별 구간 최유리가 (매수 최저 / 매도 최고) 와 첫 목표가 도달 시각을 기준 루프와 같은 조건으로 iterrows 로 계산
+    # ohlc=True 면 야후 일봉 (Date, low, high, 목표가가 저가~고가 안이면 도달, 기간 필터 없음)
+    time_column, low_column, high_column = ('Date', 'low', 'high') if ohlc else ('createdAt', 'basePrice', 'basePrice')
+    if not ohlc:
+        filtered_df = filtered_df[(filtered_df['createdAt'] >= start_date) &
+                                  (filtered_df['createdAt'] <= end_date + timedelta(days=date_window))]
+        trade_df = trade_df[(trade_df['executedAt'] >= start_date) &
+                            (trade_df['executedAt'] <= end_date)]
+    rows = []
+    for _, trade_row in trade_df.iterrows():
+        currency = trade_row['currencyCode0'] if trade_row['currencyCode'] == 'KRW' else trade_row['currencyCode']
+        trade_date = trade_row['executedAt']
+        window_rates = filtered_df[(filtered_df['currencyCode'] == currency) &
+                                   (filtered_df[time_column].between(trade_date, trade_date + timedelta(days=date_window)))]
+        if trade_row['isBuyOrder'] == 1:
+            target_price = trade_row['price'] - buy_price_adjustment
+            best_price = window_rates[low_column].min()
+            hit = window_rates[low_column] <= target_price
+        else:
+            target_price = trade_row['price'] + sell_price_adjustment
+            best_price = window_rates[high_column].max()
+            hit = window_rates[high_column] >= target_price
+        if ohlc:
+            hit = (window_rates['low'] <= target_price) & (window_rates['high'] >= target_price)
+        rows.append({'best_price': best_price, 'first_hit_at': window_rates.loc[hit, time_column].min()})
+    fill = pd.DataFrame(rows, columns=['best_price', 'first_hit_at'])
+    fill['best_price'] = fill['best_price'].astype('float64')
+    fill['first_hit_at'] = fill['first_hit_at'].astype(filtered_df[time_column].dtype)
+    return fill
+
+
+def reference_simulate_profit(filtered_df, trade_df, start_date, end_date, date_windows, adjustments):
+    # app.py tab2 의 기존 조합 루프 (조합마다 분석 + 수익 계산)
+    profit_data = []
+    for date_window in date_windows:
+        for adjustment in adjustments:
+            results_df, _ = reference_analyze_target_prices(filtered_df, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            results_df = results_df.drop_duplicates(subset=['currency', 'executedAt', 'amount'])
+            total_found = results_df['found'].sum()
+            success_rate = (total_found / len(results_df)) * 100 if len(results_df) > 0 else 0
+            (_, total_buy_amo, total_buy_pro), (_, total_sell_amo, total_sell_pro) = calculate_profit(results_df, adjustment, start_date, end_date, date_window)
+            profit_data.append({
+                'date_window': date_window,
+                'adjustment': adjustment,
+                'total_buy_amo': total_buy_amo,
+                'total_buy_pro': total_buy_pro,
+                'total_sell_amo': total_sell_amo,
+                'total_sell_pro': total_sell_pro,
+                'total_success_rate': success_rate.round(2),
+            })
+    return pd.DataFrame(profit_data)
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+def _rows(result):
+    if isinstance(result, tuple):
+        return [rows for rows in map(_rows, result) if rows is not None]
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def measure(name, func, *args, repeat=1, memory=True, **kwargs):
+    """func 실행 시간 (repeat 회 중 최소) 과 최대 메모리를 측정해 (결과, 기록) 을 반환
+
+    tracemalloc 은 실행을 느리게 하므로 메모리는 시간 측정과 별도로 한 번 더 실행해 잰다.
+    """
+    seconds = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds.append(time.perf_counter() - start)
+    record = {'stage': name, 'seconds': min(seconds), 'rows': _rows(result)}
+    if memory:
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            record['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    print(f"{name:<24} {record['seconds']:>10.4f}s  rows={record['rows']}" +
+          (f"  peak={record['peak_mb']:.1f}MB" if memory else ''))
+    return result, record
+
+
+def run_benchmark(n_ticks, n_trades, currencies, date_windows, adjustments, repeat=1, memory=True, skip=(), seed=0):
+    """합성 데이터로 로드 -> 저장소/인덱스 생성 -> 분석 -> 수익 계산 -> 조합 시뮬레이션 단계를 측정"""
+    stages = []
+
+    def stage(name, func, *args, **kwargs):
+        if name in skip:
+            return None
+        result, record = measure(name, func, *args, repeat=repeat, memory=memory, **kwargs)
+        stages.append(record)
+        return result
+
+    final_df, _ = measure('generate_ticks', generate_ticks, n_ticks, currencies, seed=seed, memory=False)
+    trade_df, _ = measure('generate_trades', generate_trades, n_trades, final_df, seed=seed + 1, memory=False)
+    start_date = final_df['createdAt'].min().floor('D')
+    end_date = trade_df['executedAt'].max().ceil('D') - pd.Timedelta(seconds=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if 'load_snapshot' not in skip:
+            write_snapshot_csv(final_df, os.path.join(tmp, 'mama.csv'))
+        if 'read_final_csv' not in skip:
+            write_final_csv(final_df, os.path.join(tmp, 'final.csv'))
+        if 'read_trade_csv' not in skip:
+            write_trade_csv(trade_df, os.path.join(tmp, 'trade.csv'))
+        stage('load_snapshot', load_snapshot_data, os.path.join(tmp, 'mama.csv'))
+        stage('read_final_csv', read_final_csv, os.path.join(tmp, 'final.csv'))
+        stage('read_trade_csv', read_trade_csv, os.path.join(tmp, 'trade.csv'))
+        if 'read_final_csv' not in skip:
+            # 청크마다 CSV 를 새로 읽는 out-of-core 분석 (최대 메모리는 청크 크기에 비례)
+            chunk_rows = max(len(final_df) // 10, 10_000)
+            stage('analyze_chunked', lambda: analyze_chunked(
+                iter_final_chunks(os.path.join(tmp, 'final.csv'), chunk_rows, cache=False), trade_df, start_date, end_date,
+                adjustments[0], adjustments[0], date_windows[0], collect_matches=False))
+
+    store = stage('rate_store', RateStore.from_frame, final_df) or RateStore.from_frame(final_df)
+    # 인덱스의 표는 처음 쓰일 때 만들어지므로 low/high 표를 모두 만드는 시간까지 측정
+    stage('window_index', lambda: build_tables(WindowIndex.from_rate_store(store)))
+    stage('bar_index', BarIndex.from_rate_store, store)
+    ohlc_df = generate_ohlc(final_df)
+    stage('window_index_ohlc', lambda: build_tables(WindowIndex.from_ohlc(ohlc_df)))
+
+    buy_adj = sell_adj = adjustments[0]
+    date_window = date_windows[0]
+    stage('analyze_lazy', analyze_target_prices, store, trade_df, start_date, end_date, buy_adj, sell_adj, date_window, lazy=True)
+    analyzed = stage('analyze_frame', analyze_target_prices, final_df, trade_df, start_date, end_date, buy_adj, sell_adj, date_window)
+    # 매칭 커널 비교 (numba 는 설치돼 있을 때만, 첫 호출의 컴파일 시간은 빼고 측정)
+    for kernel in ('numpy', 'numba'):
+        if kernel == 'numba' and not numba_available():
+            print(f"{'match_kernel_numba':<24} 건너뜀 (numba 미설치)")
+            continue
+        if kernel == 'numba':
+            match_target_prices(store, trade_df.iloc[:10], buy_adj, sell_adj, date_window, lazy=True, kernel=kernel)
+            stage('match_kernel_numba_ticks', match_target_prices, store, trade_df, buy_adj, sell_adj, date_window,
+                  lazy=True, kernel=kernel, use_bars=False)
+        stage(f'match_kernel_{kernel}', match_target_prices, store, trade_df, buy_adj, sell_adj, date_window, lazy=True, kernel=kernel)
+    pruning = {date_window: bar_pruning(store, trade_df, buy_adj, date_window) for date_window in date_windows}
+    if analyzed is not None:
+        stage('calculate_profit', calculate_profit, analyzed[0], buy_adj, start_date, end_date, date_window)
+    stage('simulate_profit', simulate_profit, store, trade_df, start_date, end_date, date_windows, adjustments)
+    stage('analyze_ohlc', analyze_ohlc_target_prices, ohlc_df, trade_df, buy_adj, sell_adj, date_window)
+
+    return {
+        'params': {'ticks': len(final_df), 'trades': len(trade_df), 'currencies': list(currencies),
+                   'date_windows': list(date_windows), 'adjustments': list(adjustments), 'repeat': repeat, 'seed': seed},
+        'stages': stages,
+        'bar_pruning': pruning,
+    }
+
+
+def bar_pruning(store, trade_df, adjustment, date_window, sample=500, seed=0):
+    """두 포인터 커널이 봉으로 건너뛰어 실제로 비교한 틱 수 (구간 전체 틱 수 대비)
+
+    numba 가 없으면 파이썬으로 실행하므로 거래 sample 개만 뽑아 잰다.
+    """
+    sweep = None if numba_available() else two_pointer_sweep
+    if sweep is not None and len(trade_df) > sample:
+        trade_df = trade_df.sample(sample, random_state=seed)
+    currency, is_buy, price, _, _ = trade_columns(trade_df)
+    trade_dates = trade_df['executedAt'].to_numpy(dtype='datetime64[ns]')
+    targets = np.where(is_buy, price - adjustment, price + adjustment)
+    bars = BarIndex.from_rate_store(store)
+    window_ticks = 0
+    for code, ticks in store.items():
+        mask = currency == code
+        lo, hi, _, _, _ = sweep_matches(ticks, trade_dates[mask], targets[mask], is_buy[mask], date_window, 'numba',
+                                        bars=bars[code], sweep=sweep)
+        window_ticks += int((hi - lo).sum())
+    record = {'trades': len(trade_df), 'window_ticks': window_ticks, **bars.stats()}
+    print(f"{f'bar_pruning[w={date_window}]':<24} 틱 {window_ticks:,} -> {record['ticks_touched']:,} "
+          f"(+ 봉 {record['bars_touched']:,}), 거래 {len(trade_df):,}개")
+    return record
+
+
+def run_check(n_ticks=20000, n_trades=300, currencies=('USD', 'JPY', 'CAD'), date_windows=(1, 3), adjustments=(0.5, 2.0), seed=0):
+    """작은 합성 데이터에서 현재 엔진과 기준 구현의 결과가 같은지 확인 (이름 -> 통과 여부)"""
+    final_df = generate_ticks(n_ticks, currencies, seed=seed)
+    trade_df = generate_trades(n_trades, final_df, seed=seed + 1)
+    start_date = final_df['createdAt'].min().floor('D')
+    end_date = trade_df['executedAt'].max().ceil('D') - pd.Timedelta(seconds=1)
+    store = RateStore.from_frame(final_df)
+
+    checks = {}
+
+    def check(name, expected, actual):
+        try:
+            pd.testing.assert_frame_equal(expected, actual)
+            checks[name] = True
+        except AssertionError as e:
+            checks[name] = False
+            print(f'{name}: {e}')
+
+    # 매칭 시 함께 기록하는 거래별 컬럼은 기준 루프에 없으므로 따로 비교
+    fill_columns = ['best_price', 'first_hit_at']
+
+    def check_results(name, expected, expected_fill, results_df):
+        check(name, expected, results_df.drop(columns=fill_columns))
+        check(f'{name}.fill', expected_fill, results_df[fill_columns])
+
+    for date_window in date_windows:
+        for adjustment in adjustments:
+            expected = reference_analyze_target_prices(final_df, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            expected_fill = reference_fill_columns(final_df, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            results_df, matched_rates = analyze_target_prices(final_df, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            check_results(f'analyze[w={date_window},adj={adjustment}].results', expected[0], expected_fill, results_df)
+            check(f'analyze[w={date_window},adj={adjustment}].matched_rates', expected[1], matched_rates)
+            results_df, _ = analyze_target_prices(store, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            check_results(f'analyze_store[w={date_window},adj={adjustment}].results', expected[0], expected_fill, results_df)
+            chunks = (final_df.iloc[i:i + 1000] for i in range(0, len(final_df), 1000))
+            results_df, matched_rates = analyze_chunked(chunks, trade_df, start_date, end_date, adjustment, adjustment, date_window)
+            check_results(f'analyze_chunked[w={date_window},adj={adjustment}].results', expected[0], expected_fill, results_df)
+            check(f'analyze_chunked[w={date_window},adj={adjustment}].matched_rates', expected[1], matched_rates)
+
+    ohlc_df = generate_ohlc(final_df)
+    for date_window in date_windows:
+        for adjustment in adjustments:
+            expected = reference_analyze_ohlc_target_prices(ohlc_df, trade_df, adjustment, adjustment, date_window)
+            expected_fill = reference_fill_columns(ohlc_df, trade_df, None, None, adjustment, adjustment, date_window, ohlc=True)
+            results_df, matched_rates = analyze_ohlc_target_prices(ohlc_df, trade_df, adjustment, adjustment, date_window)
+            check_results(f'analyze_ohlc[w={date_window},adj={adjustment}].results', expected[0], expected_fill, results_df)
+            check(f'analyze_ohlc[w={date_window},adj={adjustment}].matched_rates', expected[1], matched_rates)
+
+    # 두 포인터 스윕 커널 (numba 가 없으면 같은 본문을 파이썬으로 실행) 과 numpy 커널의 거래별 결과 비교
+    sweep = None if numba_available() else two_pointer_sweep
+    currency, is_buy, price, _, _ = trade_columns(trade_df)
+    trade_dates = trade_df['executedAt'].to_numpy(dtype='datetime64[ns]')
+    index = store.window_index()
+    bars = store.bar_index()
+    kernel_columns = ['lo', 'hi', 'best_price', 'match_count', 'first_hit']
+    for date_window in date_windows:
+        for adjustment in adjustments:
+            targets = np.where(is_buy, price - adjustment, price + adjustment)
+            for code, ticks in store.items():
+                mask = currency == code
+                args = (ticks, trade_dates[mask], targets[mask], is_buy[mask], date_window)
+                expected = pd.DataFrame(dict(zip(kernel_columns, sweep_matches(*args, 'numpy', index[code]))))
+                actual = pd.DataFrame(dict(zip(kernel_columns, sweep_matches(*args, 'numba', sweep=sweep))))
+                check(f'match_kernel[{code},w={date_window},adj={adjustment}]', expected, actual)
+                actual = pd.DataFrame(dict(zip(kernel_columns, sweep_matches(*args, 'numba', bars=bars[code], sweep=sweep))))
+                check(f'match_kernel_bars[{code},w={date_window},adj={adjustment}]', expected, actual)
+
+    expected = reference_simulate_profit(final_df, trade_df, start_date, end_date, date_windows, adjustments)
+    check('simulate_profit', expected, simulate_profit(store, trade_df, start_date, end_date, date_windows, adjustments))
+
+    for name, ok in checks.items():
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+    return checks
+
+
+# 계산 코어 import 에 끌려오면 안 되는 UI 모듈
+UI_MODULES = ('streamlit', 'plotly', 'matplotlib', 'seaborn')
+
+
+def measure_imports(modules=('matching', 'analysis', 'loading', 'sweep', 'batch', 'data', 'profit'), repeat=3):
+    """새 인터프리터에서 모듈 import 시간과 UI 모듈이 함께 로드되는지 측정"""
+    code = ('import sys, time; t = time.perf_counter(); import {module}; '
+            'print(time.perf_counter() - t, ",".join(m for m in {ui!r} if m in sys.modules))')
+    records = []
+    for module in modules:
+        seconds, ui = [], ''
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', code.format(module=module, ui=UI_MODULES)], capture_output=True,
+                                 text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+            seconds.append(float(out[0]))
+            ui = out[1] if len(out) > 1 else ''
+        records.append({'module': module, 'seconds': min(seconds), 'ui_modules': ui.split(',') if ui else []})
+        print(f"import {module:<18} {min(seconds):>8.4f}s  ui={ui or '-'}")
+    return records
+
+
+def measure_worker_spawn(modules=('sweep', 'profit'), workers=2):
+    """spawn 방식 워커 풀이 모듈을 import 하고 첫 작업을 끝낼 때까지 걸리는 시간"""
+    records = []
+    for module in modules:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=importlib.import_module, initargs=(module,)) as executor:
+            for future in [executor.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+        records.append({'module': module, 'workers': workers, 'seconds': time.perf_counter() - start})
+        print(f"spawn {module:<19} {records[-1]['seconds']:>8.4f}s  workers={workers}")
+    return records
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='매칭/수익 계산 경로 벤치마크')
+    parser.add_argument('--ticks', type=int, default=100_000, help='환율 틱 수 (10k ~ 10M)')
+    parser.add_argument('--trades', type=int, default=10_000, help='거래 수 (1k ~ 1M)')
+    parser.add_argument('--currencies', default='USD,JPY,CAD')
+    parser.add_argument('--windows', type=_int_list, default=[1, 2, 3, 4, 5], help='date_window 목록 (예: 1,3,5)')
+    parser.add_argument('--adjustments', type=_float_list, default=[1.0, 2.0, 3.0, 4.0, 5.0], help='조정값 목록')
+    parser.add_argument('--repeat', type=int, default=1, help='단계별 반복 횟수 (최소 시간 기록)')
+    parser.add_argument('--no-memory', action='store_true', help='최대 메모리 측정 생략')
+    parser.add_argument('--skip', default='', help='건너뛸 단계 (쉼표 구분, 예: load_snapshot,analyze_frame)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help='기준 구현과 결과 비교만 실행')
+    parser.add_argument('--imports', action='store_true', help='모듈 import 시간과 워커 생성 비용만 측정')
+    parser.add_argument('--output', help='결과 JSON 경로')
+    args = parser.parse_args(argv)
+
+    currencies = tuple(args.currencies.split(','))
+    report = {'environment': environment(), 'timestamp': pd.Timestamp.now().isoformat()}
+    if args.check:
+        report['checks'] = run_check(currencies=currencies, seed=args.seed)
+    elif args.imports:
+        report['imports'] = measure_imports()
+        report['worker_spawn'] = measure_worker_spawn()
+    else:
+        report.update(run_benchmark(args.ticks, args.trades, currencies, args.windows, args.adjustments,
+                                    repeat=args.repeat, memory=not args.no_memory,
+                                    skip=set(filter(None, args.skip.split(','))), seed=args.seed))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return 0 if all(report.get('checks', {}).values()) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
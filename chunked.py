@@ -0,0 +1,148 @@
+"""환율 틱을 시간순 청크로 흘려 보내며 목표가를 분석하는 out-of-core 모드
+
+메모리에는 현재 청크와 창이 아직 열려 있는 거래의 상태만 두므로
+최대 메모리는 전체 기간이 아니라 청크 크기와 date_window 길이에 비례한다.
+
+    chunks = iter_final_chunks('./final.csv', chunk_rows=500_000)
+    results_df, matched_rates_df = analyze_chunked(chunks, trade_df, start, end, 1.0, 1.0, date_window=3)
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from matching import match_target_prices
+from rate_store import RateStore
+
+
+def iter_chunked_analysis(rate_chunks, trade_df, buy_price_adjustment, sell_price_adjustment, date_window,
+                          collect_matches=True):
+    """청크마다 창이 닫힌 거래의 (results, matched_rates) 를 내보내는 제너레이터
+
+    rate_chunks 는 createdAt 기준 시간순 (청크 사이에서 시각이 거꾸로 가지 않는) final_df 조각들.
+    results 와 matched_rates 에는 원래 거래 위치 'trade_position' 열이 붙고, matched_rates 는 거래 순서 -> 틱 순서.
+    창 [executedAt, executedAt + date_window] 의 끝이 지금까지 본 마지막 틱 시각보다 이전이면
+    이후 청크에서 더 매칭될 수 없으므로 그 거래의 결과를 확정해 내보낸다.
+    """
+    if len(trade_df) == 0:
+        return
+    window = pd.Timedelta(days=date_window)
+    executed_at = trade_df['executedAt']
+    window_end = (executed_at + window).to_numpy()
+    executed_at = executed_at.to_numpy()
+
+    # 환율 없이 매칭하면 거래별 고정 컬럼(통화, 목표가 등)만 채워진 results 가 나옴
+    results, _ = match_target_prices(RateStore({}), trade_df, buy_price_adjustment, sell_price_adjustment, date_window)
+    match_count = np.zeros(len(trade_df), dtype='int64')
+    is_buy = results['order_type'].to_numpy(dtype=object) == '매수'
+    best_price = np.full(len(trade_df), np.nan)
+    first_hit_at = np.full(len(trade_df), np.datetime64('NaT', 'ns'))
+    time_dtype = results['first_hit_at'].dtype
+    closed = np.zeros(len(trade_df), dtype=bool)
+    buffered = []  # 아직 열린 거래의 매칭 행: (거래 위치 배열, DataFrame)
+    last_time = None
+
+    def emit(closing):
+        nonlocal buffered
+        positions = np.flatnonzero(closing)
+        closed[positions] = True
+        out = results.iloc[positions].copy()
+        out['match_count'] = match_count[positions]
+        out['found'] = match_count[positions] > 0
+        out['best_price'] = best_price[positions]
+        out['first_hit_at'] = first_hit_at[positions].astype(time_dtype)
+        out['trade_position'] = positions
+
+        matched = pd.DataFrame([])
+        if buffered:
+            trade_pos = np.concatenate([pos for pos, _ in buffered])
+            frame = pd.concat([frame for _, frame in buffered], ignore_index=True)
+            done = closing[trade_pos]
+            order = np.flatnonzero(done)[np.argsort(trade_pos[done], kind='stable')]
+            matched = frame.iloc[order].reset_index(drop=True)
+            matched['trade_position'] = trade_pos[order]
+            keep = np.flatnonzero(~done)
+            buffered = [(trade_pos[keep], frame.iloc[keep].reset_index(drop=True))] if len(keep) else []
+        return out, matched
+
+    for chunk in rate_chunks:
+        if len(chunk) == 0:
+            continue
+        created_at = chunk['createdAt']
+        chunk_min, chunk_max = created_at.min().to_datetime64(), created_at.max().to_datetime64()
+        if last_time is not None and chunk_min < last_time:
+            raise ValueError('환율 청크가 시간순이 아닙니다 (out-of-core 모드는 createdAt 순으로 정렬된 데이터가 필요)')
+        last_time = chunk_max
+
+        # 창이 이 청크와 겹치는 열린 거래만 매칭
+        positions = np.flatnonzero(~closed & (executed_at <= chunk_max) & (window_end >= chunk_min))
+        if len(positions):
+            store = RateStore.from_frame(chunk, keep_positions=True)
+            chunk_results, chunk_matched = match_target_prices(store, trade_df.iloc[positions], buy_price_adjustment,
+                                                               sell_price_adjustment, date_window, lazy=True)
+            counts = chunk_results['match_count'].to_numpy()
+            match_count[positions] += counts
+            # 청크 사이 최저가/최고가는 누적, 첫 도달 시각은 시간순이므로 처음 도달한 청크의 값
+            chunk_best = chunk_results['best_price'].to_numpy()
+            best_price[positions] = np.where(is_buy[positions], np.fmin(best_price[positions], chunk_best),
+                                             np.fmax(best_price[positions], chunk_best))
+            chunk_first = chunk_results['first_hit_at'].to_numpy(dtype='datetime64[ns]')
+            first_hit_at[positions] = np.where(np.isnat(first_hit_at[positions]), chunk_first, first_hit_at[positions])
+            time_dtype = chunk_results['first_hit_at'].dtype
+            if collect_matches and len(chunk_matched):
+                buffered.append((np.repeat(positions, counts), chunk_matched.to_frame()))
+
+        closing = ~closed & (window_end < chunk_max)
+        if closing.any():
+            yield emit(closing)
+
+    if not closed.all():
+        yield emit(~closed)
+
+
+def analyze_chunked(rate_chunks, trade_df, start_date, end_date, buy_price_adjustment, sell_price_adjustment, date_window,
+                    matched_path=None, collect_matches=True):
+    """analyze_target_prices 와 같은 (results, matched_rates) 를 청크 단위로 계산하는 함수
+
+    matched_path 를 주면 매칭 행은 메모리에 모으지 않고 거래 창이 닫히는 순서대로 CSV 에 이어 쓰고
+    matched_rates 자리에 None 을 반환한다 (이때 행 순서는 창이 닫히는 순서).
+    collect_matches=False 면 매칭 행을 모으지 않고 results 만 계산한다.
+    """
+    trade_df = trade_df[(trade_df['executedAt'] >= start_date) &
+                        (trade_df['executedAt'] <= end_date)]
+    if len(trade_df) == 0:
+        return pd.DataFrame([]), (pd.DataFrame([]) if matched_path is None else None)
+
+    def in_range(chunks):
+        # 분석 기간 밖의 틱은 버리고, 기간이 끝난 뒤의 청크는 읽지 않음
+        last = pd.Timestamp(end_date) + timedelta(days=date_window)
+        for chunk in chunks:
+            created_at = chunk['createdAt']
+            yield chunk[(created_at >= start_date) & (created_at <= last)]
+            if len(chunk) and created_at.max() > last:
+                break
+
+    results, matched = [], []
+    header = True
+    for closed_results, closed_matched in iter_chunked_analysis(in_range(rate_chunks), trade_df, buy_price_adjustment,
+                                                                sell_price_adjustment, date_window, collect_matches):
+        results.append(closed_results)
+        if len(closed_matched) == 0:
+            continue
+        if matched_path is None:
+            matched.append(closed_matched)
+        else:
+            closed_matched.drop(columns='trade_position').to_csv(matched_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+    if matched_path is not None and header:
+        pd.DataFrame([]).to_csv(matched_path, index=False)
+
+    # 거래 순서로 정렬해 in-memory 분석과 같은 행 순서로 맞춤 (같은 거래의 틱 순서는 유지)
+    results_df = pd.concat(results).sort_values('trade_position', kind='stable')
+    results_df = results_df.drop(columns='trade_position').reset_index(drop=True)
+    if matched_path is not None:
+        return results_df, None
+    if not matched:
+        return results_df, pd.DataFrame([])
+    matched_rates = pd.concat(matched, ignore_index=True).sort_values('trade_position', kind='stable')
+    return results_df, matched_rates.drop(columns='trade_position').reset_index(drop=True)
@@ -1,44 +1,21 @@
 import streamlit as st
 import pandas as pd
-import json
-from datetime import datetime
-import plotly.express as px
+# 계산/로드 로직은 UI 없는 loading 모듈에 있고 여기서는 Streamlit 캐시만 적용
+# filter_trade_data 는 app.py / yahoo.py / live_app.py 가 data 에서 가져다 씀
+from loading import (file_fingerprint, filter_trade_data, load_snapshot_data, prepare_bars, read_final_csv, read_trade_csv,
+                     read_yh_csv, set_yh_close_time)
+from rate_store import RateStore
+from db import load_rates, load_trades, source_from_env
+from downsample import ChartSeries
+from jobs import JobManager
+from ingest import IncrementalAnalysis, IncrementalSource
+from result_cache import ResultCache
 
 # 데이터 로드 함수
 @st.cache_data # 함수가 실행되고 결과 캐시 저장
 def load_data():
-    # 매매기준율 데이터 로드 및 전처리 코드
-    df = pd.read_csv('../mama.csv', sep='\t', dtype=str)
-    df.columns = ['createdAt,data']
-    df = df['createdAt,data'].str.split(',', n=1, expand=True)
-    df.columns = ['createdAt', 'data']
-    
-    # JSON 파싱 함수
-    def parse_json(json_str, created_at=None):
-        try:
-            # 앞부분 따옴표 제거
-            json_str = json_str.replace('"{"result":', '{"result":')
-            # 뒷부분 따옴표 제거
-            if json_str.endswith('}]}"'): # '}]}"'로 끝나는지 확인
-                json_str = json_str[:-1]
-            data = json.loads(json_str)
-            result_df = pd.DataFrame(data['result'])
-            # 시간 추가
-            if created_at is not None:
-                result_df['createdAt'] = created_at
-            return result_df
-        except Exception as e:
-            return None
-
-    # 전체 데이터 처리
-    parsed_data = []
-    for _, row in df.iterrows(): # 각 행 순회
-        result = parse_json(row['data'], row['createdAt'])
-        if result is not None:
-            result['createdAt'] = pd.to_datetime(result['createdAt'], format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
-            parsed_data.append(result)
-    
-    final_df = pd.concat(parsed_data, ignore_index=True)
+    # 매매기준율 데이터 로드 및 전처리 코드 (청크 단위 스트리밍 파싱)
+    final_df = load_snapshot_data('../mama.csv')
     
     # 거래 데이터 로드
     trade_df = pd.read_csv('../trade.csv')
@@ -47,35 +24,91 @@ def load_data():
     return final_df, trade_df
 
 # 데이터 로드 함수
-@st.cache_data # 함수가 실행되고 결과 캐시 저장
 def load_trade_data():
-    # 거래 데이터 로드
-    trade_df = pd.read_csv('./trade.csv')
-    trade_df['executedAt'] = pd.to_datetime(trade_df['executedAt'], format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
-    
-    return trade_df
+    # 거래 데이터 로드 (DB 가 설정되어 있으면 DB, 아니면 CSV 에 추가된 줄만 읽어 반영)
+    return load_dataset()[1]
+
+@st.cache_data # 함수가 실행되고 결과 캐시 저장
+def _load_db_trade_data():
+    return load_trades(load_database(), './trade.csv')
 
 # 데이터 로드 함수
 @st.cache_data # 함수가 실행되고 결과 캐시 저장
 def load_final_data():
-    # 데이터 로드
-    final_df = pd.read_csv('./final.csv')
-    final_df['createdAt'] = pd.to_datetime(final_df['createdAt'], format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
-    
-    return final_df
-def load_yh_data():
-    # 야후 데이터 로드 
-    final_df = pd.read_csv('../yh.csv')
-    final_df['Date'] = pd.to_datetime(final_df['Date'], format='%Y-%m-%d') + pd.Timedelta(hours=9) # UTC -> KST
+    # 데이터 로드 (DB 가 설정되어 있으면 DB, 아니면 CSV 컬럼형 캐시)
+    return load_rates(load_database(), './final.csv')
+
+# 환율 저장소 로드 함수
+def load_rate_store():
+    # 통화별 정렬 배열 (CSV 면 추가된 틱을 배열 끝에 이어 붙인 저장소)
+    return load_dataset()[0]
 
-    return final_df
+# 환율 저장소, 거래 데이터, 데이터 버전을 같은 시점으로 한 번에 로드
+def load_dataset():
+    if load_database() is None:
+        return load_incremental_analysis().update()
+    return _load_db_rate_store(), _load_db_trade_data(), _load_db_version()
 
+# CSV 증분 로더 (세션 간 공유): 재실행마다 파일 끝에 추가된 줄만 읽고, 결과 캐시는 창이 열린 거래만 다시 계산
+@st.cache_resource
+def load_incremental_analysis():
+    return IncrementalAnalysis(IncrementalSource('./final.csv', read_final_csv, 'createdAt'),
+                               IncrementalSource('./trade.csv', read_trade_csv, 'executedAt'),
+                               load_result_cache())
 
-def filter_trade_data(trade_df, selected_currencies):
-    """주어진 통화에 따라 거래 데이터를 필터링하는 함수"""
-    return trade_df[
-        trade_df.apply(lambda x: 
-            (x['currencyCode0'] if x['currencyCode'] == 'KRW' else x['currencyCode']) in selected_currencies, 
-            axis=1
-        )
-    ]
\ No newline at end of file
+@st.cache_resource # 세션 간에 복사 없이 하나의 객체를 공유
+def _load_db_rate_store():
+    # 통화별 정렬 배열로 변환하고 원본 DataFrame 은 버림
+    final_df = load_database().read_rates()
+    store = RateStore.from_frame(final_df)
+    store.frame_nbytes = int(final_df.memory_usage(deep=True).sum())
+    return prepare_bars(store)
+
+# 조합 시뮬레이션 작업 관리자 (세션 간 공유, 완료 결과는 디스크에 보관)
+@st.cache_resource
+def load_job_manager():
+    return JobManager(max_jobs=2, store_dir='./.jobs')
+
+# DB 연결 풀 (FX_DB_* 환경 변수가 없으면 None -> CSV 사용)
+@st.cache_resource
+def load_database():
+    return source_from_env()
+
+# 분석 결과 캐시 키에 쓰는 데이터 버전 (CSV 에 줄이 추가되면 바뀜)
+def load_data_version():
+    return load_dataset()[2]
+
+@st.cache_resource
+def _load_db_version():
+    return load_database().version()
+
+# 차트용 환율 시계열 (구간/해상도별 축약 결과를 세션 간 공유, 데이터 버전이 바뀌면 다시 만듦)
+def load_rate_chart_series():
+    store, _, version = load_dataset()
+    return _load_rate_chart_series(store, version)
+
+@st.cache_resource(max_entries=1)
+def _load_rate_chart_series(_store, version):
+    return ChartSeries.from_rate_store(_store)
+
+# 야후 일봉 차트용 시계열 (고가-저가, 고가-시가, 시가-저가 변동폭 포함)
+def load_yh_chart_series(path='../yh.csv'):
+    # DataFrame 대신 파일 경로와 (크기, 수정 시각) 으로 캐시해 재실행마다 DataFrame 을 해시하지 않음
+    return _load_yh_chart_series(path, tuple(file_fingerprint(path).values()))
+
+@st.cache_resource
+def _load_yh_chart_series(path, fingerprint):
+    final_df = set_yh_close_time(read_yh_csv(path))
+    final_df = final_df.assign(high_low_diff=final_df['high'] - final_df['low'],
+                               high_to_open=final_df['high'] - final_df['open'],
+                               open_to_low=final_df['open'] - final_df['low'])
+    return ChartSeries.from_frame(final_df, 'Date', ['open', 'high', 'low', 'close', 'high_low_diff', 'high_to_open', 'open_to_low'])
+
+# 분석 결과 캐시 (세션 간 공유, 넘치면 디스크로)
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(max_entries=32, max_bytes=256 * 2**20, spill_dir='./.result_cache')
+
+def load_yh_data():
+    # 야후 데이터 로드 
+    return read_yh_csv('../yh.csv')
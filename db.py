@@ -0,0 +1,309 @@
+"""MySQL (또는 로컬 SQLite) 에서 환율/거래 데이터를 읽는 데이터 소스
+
+통화와 createdAt / executedAt 구간 조건을 SQL WHERE 로 보내 필요한 행만 가져오고,
+결과는 fetchmany 로 큰 묶음씩 받아 바로 타입 있는 NumPy 컬럼으로 쌓는다.
+반환하는 DataFrame 은 loading.read_final_csv / read_trade_csv 와 같은 형식 (시각은 KST).
+
+DB 설정은 환경 변수로 한다 (없으면 source_from_env() 가 None 을 반환하고 CSV 로더를 사용).
+
+    FX_DB_HOST, FX_DB_PORT(3306), FX_DB_USER, FX_DB_PASSWORD, FX_DB_NAME, FX_DB_POOL_SIZE(4)
+    FX_DB_SQLITE=./fx.sqlite3    # MySQL 대신 로컬 SQLite 파일 (테스트/개발용)
+
+CSV 덤프를 DB 로 옮기려면:
+
+    python db.py import --rates ./final.csv --trades ./trade.csv
+"""
+import argparse
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from loading import _normalize_final, _normalize_trade, filter_trade_data, read_cached, read_final_csv, read_trade_csv
+
+logger = logging.getLogger(__name__)
+
+# DB 에는 CSV 와 같이 UTC 로 저장되어 있음
+KST_OFFSET = pd.Timedelta(hours=9)
+
+# 테이블별 (컬럼, 타입): 'datetime' / 'category' 외에는 NumPy dtype
+RATE_COLUMNS = (('currencyCode', 'category'), ('basePrice', 'float64'), ('createdAt', 'datetime'))
+TRADE_COLUMNS = (('isBuyOrder', 'int64'), ('currencyCode', 'category'), ('amount', 'float64'), ('price', 'float64'),
+                 ('executedAt', 'datetime'), ('currencyCode0', 'category'))
+
+_SCHEMA = {
+    'mysql': (
+        "CREATE TABLE IF NOT EXISTS {rates} (id BIGINT AUTO_INCREMENT PRIMARY KEY, currencyCode VARCHAR(8) NOT NULL, "
+        "basePrice DOUBLE NOT NULL, createdAt DATETIME NOT NULL, INDEX idx_{rates}_time (createdAt, currencyCode))",
+        "CREATE TABLE IF NOT EXISTS {trades} (id BIGINT AUTO_INCREMENT PRIMARY KEY, isBuyOrder TINYINT NOT NULL, "
+        "currencyCode VARCHAR(8) NOT NULL, amount DOUBLE NOT NULL, price DOUBLE NOT NULL, executedAt DATETIME NOT NULL, "
+        "currencyCode0 VARCHAR(8), INDEX idx_{trades}_time (executedAt))",
+    ),
+    'sqlite': (
+        "CREATE TABLE IF NOT EXISTS {rates} (id INTEGER PRIMARY KEY AUTOINCREMENT, currencyCode TEXT NOT NULL, "
+        "basePrice REAL NOT NULL, createdAt TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_{rates}_time ON {rates} (createdAt, currencyCode)",
+        "CREATE TABLE IF NOT EXISTS {trades} (id INTEGER PRIMARY KEY AUTOINCREMENT, isBuyOrder INTEGER NOT NULL, "
+        "currencyCode TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, executedAt TEXT NOT NULL, currencyCode0 TEXT)",
+        "CREATE INDEX IF NOT EXISTS idx_{trades}_time ON {trades} (executedAt)",
+    ),
+}
+
+
+class _SqlitePool:
+    """SQLite 연결을 재사용하는 작은 풀 (MySQLConnectionPool 과 같은 get_connection / close 사용법)"""
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def get_connection(self):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+        return _PooledConnection(connection, self._idle)
+
+
+class _PooledConnection:
+    # close() 하면 실제로 닫지 않고 풀에 돌려줌 (풀이 가득 차 있으면 닫음)
+    def __init__(self, connection, idle):
+        self._connection = connection
+        self._idle = idle
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        try:
+            self._idle.put_nowait(self._connection)
+        except queue.Full:
+            self._connection.close()
+
+
+class SqlSource:
+    """연결 풀에서 연결을 빌려 환율/거래 테이블을 읽는 데이터 소스
+
+    pool 은 get_connection() 으로 연결을 주고 연결의 close() 로 돌려받는 객체
+    (mysql.connector.pooling.MySQLConnectionPool 또는 _SqlitePool).
+    """
+
+    def __init__(self, pool, dialect, rates_table='rates', trades_table='trades', batch_size=100_000):
+        self.pool = pool
+        self.dialect = dialect
+        self.placeholder = '%s' if dialect == 'mysql' else '?'
+        self.rates_table = rates_table
+        self.trades_table = trades_table
+        self.batch_size = batch_size
+
+    @classmethod
+    def mysql(cls, host, user, password, database, port=3306, pool_size=4, **kwargs):
+        from mysql.connector import pooling
+
+        pool = pooling.MySQLConnectionPool(pool_name=f'fx_{database}', pool_size=pool_size, host=host, port=port,
+                                           user=user, password=password, database=database)
+        return cls(pool, 'mysql', **kwargs)
+
+    @classmethod
+    def sqlite(cls, path, pool_size=4, **kwargs):
+        return cls(_SqlitePool(path, pool_size), 'sqlite', **kwargs)
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = self.pool.get_connection()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def create_tables(self):
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            for statement in _SCHEMA[self.dialect]:
+                cursor.execute(statement.format(rates=self.rates_table, trades=self.trades_table))
+            connection.commit()
+
+    def version(self):
+        """테이블 행 수 / 마지막 id 로 만든 데이터 버전 문자열 (분석 결과 캐시 키용)"""
+        parts = []
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            for table in (self.rates_table, self.trades_table):
+                cursor.execute(f'SELECT COUNT(*), MAX(id) FROM {table}')
+                parts.append('{}:{}:{}'.format(table, *cursor.fetchone()))
+        return f'{self.dialect}|' + '|'.join(parts)
+
+    def read_rates(self, start=None, end=None, currencies=None):
+        """[start, end] (KST) 구간, 주어진 통화의 환율을 read_final_csv 형식으로 읽는 함수"""
+        where, params = self._where('createdAt', start, end)
+        if currencies is not None:
+            where.append(f'currencyCode IN ({self._placeholders(currencies)})')
+            params.extend(currencies)
+        frame = self._fetch(self.rates_table, RATE_COLUMNS, where, params, 'createdAt')
+        return _normalize_final(frame)
+
+    def read_trades(self, start=None, end=None, currencies=None):
+        """[start, end] (KST) 구간 거래를 read_trade_csv 형식으로 읽는 함수
+
+        실제 환전 통화는 currencyCode / currencyCode0 중 하나이므로 SQL 에서는 둘 중 하나가 맞는 행을 가져오고
+        정확한 통화 필터는 가져온 뒤 적용한다.
+        """
+        where, params = self._where('executedAt', start, end)
+        if currencies is not None:
+            marks = self._placeholders(currencies)
+            where.append(f'(currencyCode IN ({marks}) OR currencyCode0 IN ({marks}))')
+            params.extend(currencies)
+            params.extend(currencies)
+        trade_df = _normalize_trade(self._fetch(self.trades_table, TRADE_COLUMNS, where, params, 'executedAt'))
+        if currencies is not None:
+            trade_df = filter_trade_data(trade_df, currencies).reset_index(drop=True)
+        return trade_df
+
+    def insert_frame(self, table, columns, frame):
+        """DataFrame 의 columns 를 table 에 executemany 로 추가 (시각 컬럼은 UTC 문자열 그대로)"""
+        marks = self._placeholders(columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})"
+        values = frame[list(columns)]
+        rows = values.astype(object).where(values.notna(), None).itertuples(index=False, name=None)
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.executemany(sql, list(rows))
+            connection.commit()
+
+    def _placeholders(self, values):
+        return ', '.join([self.placeholder] * len(values))
+
+    def _where(self, column, start, end):
+        # KST 로 받은 구간을 DB 의 UTC 문자열로 바꿔 인덱스 범위 조건으로 사용
+        where, params = [], []
+        if start is not None:
+            where.append(f'{column} >= {self.placeholder}')
+            params.append(_utc_text(start))
+        if end is not None:
+            where.append(f'{column} <= {self.placeholder}')
+            params.append(_utc_text(end))
+        return where, params
+
+    def _fetch(self, table, columns, where, params, time_column):
+        names = [name for name, _ in columns]
+        sql = f"SELECT {', '.join(names)} FROM {table}"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {time_column}, id'
+
+        batches = {name: [] for name in names}
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                # 행 튜플 묶음을 컬럼별 타입 배열로 바로 변환
+                for (name, kind), values in zip(columns, zip(*rows)):
+                    batches[name].append(_column_array(values, kind))
+            cursor.close()
+
+        data = {}
+        for name, kind in columns:
+            parts = batches[name]
+            values = np.concatenate(parts) if parts else _column_array((), kind)
+            data[name] = pd.Categorical(values) if kind == 'category' else values
+        return pd.DataFrame(data)
+
+
+def _utc_text(value):
+    # 초 단위면 소수점 없이 (SQLite 는 문자열로 비교하므로 '...:00' 과 '...:00.000000' 이 다름)
+    value = pd.Timestamp(value) - KST_OFFSET
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f' if value.microsecond else '%Y-%m-%d %H:%M:%S')
+
+
+def _column_array(values, kind):
+    if kind == 'datetime':
+        # MySQL 은 datetime 객체, SQLite 는 'YYYY-MM-DD HH:MM:SS' 문자열
+        return np.array(values, dtype='datetime64[us]')
+    if kind == 'category':
+        return np.array(values, dtype=object)
+    return np.fromiter(values, dtype=kind, count=len(values))
+
+
+def source_from_env(environ=os.environ):
+    """환경 변수에 DB 설정이 있으면 SqlSource, 없으면 None"""
+    options = {'rates_table': environ.get('FX_DB_RATES_TABLE', 'rates'),
+               'trades_table': environ.get('FX_DB_TRADES_TABLE', 'trades')}
+    pool_size = int(environ.get('FX_DB_POOL_SIZE', 4))
+    if environ.get('FX_DB_SQLITE'):
+        return SqlSource.sqlite(environ['FX_DB_SQLITE'], pool_size=pool_size, **options)
+    if environ.get('FX_DB_HOST'):
+        return SqlSource.mysql(environ['FX_DB_HOST'], environ.get('FX_DB_USER'), environ.get('FX_DB_PASSWORD'),
+                               environ.get('FX_DB_NAME'), port=int(environ.get('FX_DB_PORT', 3306)),
+                               pool_size=pool_size, **options)
+    return None
+
+
+def load_rates(source=None, csv_path='./final.csv', start=None, end=None, currencies=None, cache=True):
+    """DB 가 설정되어 있으면 DB 에서, 아니면 CSV (컬럼형 캐시) 에서 환율 데이터를 같은 조건으로 읽는 함수"""
+    if source is not None:
+        return source.read_rates(start, end, currencies)
+    final_df = read_cached(csv_path, read_final_csv) if cache else read_final_csv(csv_path)
+    mask = np.ones(len(final_df), dtype=bool)
+    if start is not None:
+        mask &= (final_df['createdAt'] >= start).to_numpy()
+    if end is not None:
+        mask &= (final_df['createdAt'] <= end).to_numpy()
+    if currencies is not None:
+        mask &= final_df['currencyCode'].isin(currencies).to_numpy()
+    return final_df if mask.all() else final_df[mask]
+
+
+def load_trades(source=None, csv_path='./trade.csv', start=None, end=None, currencies=None, cache=True):
+    """DB 가 설정되어 있으면 DB 에서, 아니면 CSV (컬럼형 캐시) 에서 거래 데이터를 같은 조건으로 읽는 함수"""
+    if source is not None:
+        return source.read_trades(start, end, currencies)
+    trade_df = read_cached(csv_path, read_trade_csv) if cache else read_trade_csv(csv_path)
+    if start is not None:
+        trade_df = trade_df[trade_df['executedAt'] >= start]
+    if end is not None:
+        trade_df = trade_df[trade_df['executedAt'] <= end]
+    if currencies is not None:
+        trade_df = filter_trade_data(trade_df, currencies)
+    return trade_df
+
+
+def import_csv(source, rates_path=None, trades_path=None, chunk_rows=200_000):
+    """CSV 덤프를 청크 단위로 읽어 DB 테이블에 추가 (시각은 CSV 와 같은 UTC 로 저장)"""
+    source.create_tables()
+    for path, table, columns in ((rates_path, source.rates_table, RATE_COLUMNS),
+                                 (trades_path, source.trades_table, TRADE_COLUMNS)):
+        if path is None:
+            continue
+        names = [name for name, _ in columns]
+        total = 0
+        for chunk in pd.read_csv(path, usecols=names, chunksize=chunk_rows):
+            source.insert_frame(table, names, chunk)
+            total += len(chunk)
+        logger.info(f'{path} -> {table}: {total}행')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='환율/거래 DB 관리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='CSV 덤프를 DB 로 옮김 (FX_DB_* 환경 변수 사용)')
+    import_parser.add_argument('--rates', help='환율 데이터 CSV (final.csv 형식)')
+    import_parser.add_argument('--trades', help='거래 데이터 CSV')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    source = source_from_env()
+    if source is None:
+        raise SystemExit('DB 설정이 없습니다 (FX_DB_HOST 또는 FX_DB_SQLITE 환경 변수)')
+    import_csv(source, args.rates, args.trades)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
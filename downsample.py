@@ -0,0 +1,153 @@
+"""차트용 시계열 축약 (버킷별 최소/최대, LTTB) 과 (통화, 구간, 해상도) 별 결과 캐시
+
+분 단위 틱 몇 달치를 그대로 Plotly 로 보내는 대신 화면 폭에 맞는 점 수로 줄여서 보낸다.
+구간을 좁히면 (확대) 같은 점 수 안에서 더 촘촘한 원본 점을 보여주고,
+구간 안의 점이 n_points 이하이면 원본을 그대로 반환한다.
+
+    series = ChartSeries.from_rate_store(rate_store)
+    chart_df = series.frame(['USD', 'JPY'], t0, t1, n_points=1500)   # currencyCode, createdAt, basePrice
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def minmax_indices(x, y, n_points):
+    """x 구간을 n_points // 2 개 버킷으로 나눠 버킷마다 최소/최대 점의 인덱스 (시간순)
+
+    선 차트의 위/아래 끝(스파이크)이 보존되고 양 끝 점은 항상 포함된다. NaN 은 건너뛴다.
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_points:
+        return valid
+    x, y = x[valid], y[valid]
+    n_buckets = max(n_points // 2, 1)
+    span = x[-1] - x[0]
+    # 시간축 기준 같은 폭의 버킷 (틱이 몰린 구간도 화면 폭만큼만 점을 씀)
+    bucket = ((x - x[0]).astype('float64') * n_buckets // max(span, 1)).astype('int64').clip(0, n_buckets - 1)
+    order = np.lexsort((y, bucket))  # 버킷별로 y 오름차순
+    sorted_bucket = bucket[order]
+    first = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    last = np.r_[first[1:] - 1, len(order) - 1]
+    keep = np.unique(np.concatenate([order[first], order[last], [0, len(x) - 1]]))
+    return valid[keep]
+
+
+def lttb_indices(x, y, n_points):
+    """Largest-Triangle-Three-Buckets 로 고른 n_points 개 점의 인덱스 (시간순)
+
+    모양을 잘 보존하는 대신 버킷 수만큼 파이썬 루프를 돈다 (각 버킷 안은 벡터 연산).
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_points or n_points < 3:
+        return valid
+    x = x[valid].astype('float64')
+    y = y[valid]
+    edges = np.linspace(1, len(x) - 1, n_points - 1).astype('int64')  # 양 끝 점을 뺀 n_points - 2 개 버킷
+    keep = np.empty(n_points, dtype='int64')
+    keep[0], keep[-1] = 0, len(x) - 1
+    a = 0
+    for i in range(n_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else len(x)
+        # 다음 버킷 평균 점과 이전에 고른 점으로 만든 삼각형 넓이가 가장 큰 점
+        avg_x = x[hi:next_hi].mean() if next_hi > hi else x[-1]
+        avg_y = y[hi:next_hi].mean() if next_hi > hi else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return valid[keep]
+
+
+_METHODS = {'minmax': minmax_indices, 'lttb': lttb_indices}
+
+
+class ChartSeries:
+    """그룹(통화)별 시간순 배열에서 구간/해상도별 축약 결과를 만들고 LRU 로 캐시하는 객체
+
+    series 는 {그룹: (시각 datetime64[ns] 배열, {컬럼: float64 배열})}.
+    Streamlit 에서는 st.cache_resource 로 하나를 공유해 같은 (통화, 구간, 해상도) 요청은 다시 계산하지 않는다.
+    """
+
+    def __init__(self, series, time_column='createdAt', group_column='currencyCode', max_cache=128):
+        self.series = series
+        self.time_column = time_column
+        self.group_column = group_column
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def from_frame(cls, df, time_column, value_columns, group_column='currencyCode', **kwargs):
+        series = {}
+        for group, group_df in df.groupby(group_column, observed=True, sort=True):
+            group_df = group_df.sort_values(time_column, kind='stable')
+            times = group_df[time_column].to_numpy(dtype='datetime64[ns]')
+            series[group] = (times, {column: group_df[column].to_numpy(dtype='float64') for column in value_columns})
+        return cls(series, time_column, group_column, **kwargs)
+
+    @classmethod
+    def from_rate_store(cls, store, **kwargs):
+        # RateStore 의 통화별 배열을 복사 없이 사용
+        series = {currency: (ticks.created_at, {'basePrice': ticks.prices.astype('float64', copy=False)})
+                  for currency, ticks in store.items()}
+        return cls(series, 'createdAt', 'currencyCode', **kwargs)
+
+    @property
+    def groups(self):
+        return list(self.series)
+
+    def time_range(self, groups=None):
+        """선택한 그룹 전체의 (첫 시각, 마지막 시각)"""
+        times = [self.series[group][0] for group in (groups or self.groups) if group in self.series]
+        times = [t for t in times if len(t)]
+        if not times:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(min(t[0] for t in times)), pd.Timestamp(max(t[-1] for t in times))
+
+    def window(self, group, t0=None, t1=None, n_points=1500, method='minmax', columns=None):
+        """[t0, t1] 구간을 n_points 안팎으로 줄인 DataFrame (시각 + 값 컬럼), 같은 요청은 캐시에서 반환"""
+        columns = tuple(columns) if columns is not None else None
+        key = (group, _key_time(t0), _key_time(t1), int(n_points), method, columns)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        result = self._window(group, t0, t1, n_points, method, columns)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = result
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return result
+
+    def frame(self, groups, t0=None, t1=None, n_points=1500, method='minmax', columns=None):
+        """여러 그룹의 window() 를 그룹 컬럼과 함께 이어 붙인 DataFrame (px.line(color=그룹) 용)"""
+        frames = [self.window(group, t0, t1, n_points, method, columns).assign(**{self.group_column: group})
+                  for group in groups if group in self.series]
+        if not frames:
+            return pd.DataFrame(columns=[self.group_column, self.time_column])
+        return pd.concat(frames, ignore_index=True)
+
+    def _window(self, group, t0, t1, n_points, method, columns):
+        if group not in self.series:
+            # 데이터가 없는 그룹은 빈 차트
+            return pd.DataFrame(columns=[self.time_column, *(columns or ())])
+        times, values = self.series[group]
+        columns = columns or tuple(values)
+        lo = 0 if t0 is None else np.searchsorted(times, np.datetime64(pd.Timestamp(t0), 'ns'), side='left')
+        hi = len(times) if t1 is None else np.searchsorted(times, np.datetime64(pd.Timestamp(t1), 'ns'), side='right')
+        x = times[lo:hi].view('int64')
+        # 컬럼이 여러 개면 점 예산을 나눠 각 컬럼의 최소/최대 (또는 LTTB) 점을 합침
+        budget = max(n_points // len(columns), 3)
+        keep = np.unique(np.concatenate([_METHODS[method](x, values[column][lo:hi], budget) for column in columns]))
+        return pd.DataFrame({self.time_column: times[lo:hi][keep],
+                             **{column: values[column][lo:hi][keep] for column in columns}})
+
+
+def _key_time(value):
+    return None if value is None else pd.Timestamp(value)
@@ -0,0 +1,220 @@
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from loading import _ColumnBuffer, append_cache, file_fingerprint, prepare_bars, read_cached, write_cache
+from rate_store import RateStore
+
+
+class _FrameBuffer:
+    """컬럼별 _ColumnBuffer 에 행을 이어 붙이고 버퍼 view 로 DataFrame 을 만드는 버퍼
+
+    category 컬럼은 코드만 보관하고, 새 값이 나오면 기존 코드는 새 배열로 다시 매핑한다
+    (이미 만든 DataFrame 이 보는 배열은 바꾸지 않음).
+    """
+
+    def __init__(self, frame):
+        self.dtypes = frame.dtypes
+        self.buffers = {column: _ColumnBuffer() for column in frame.columns}
+        self.categories = {}
+        self.size = 0
+        self.append(frame)
+
+    def append(self, frame):
+        for column, buffer in self.buffers.items():
+            if isinstance(self.dtypes[column], pd.CategoricalDtype):
+                values = self._codes(column, frame[column])
+            else:
+                values = frame[column].to_numpy()
+            buffer.append(values, self.size)
+        self.size += len(frame)
+
+    def _codes(self, column, values):
+        values = values.astype('category') if not isinstance(values.dtype, pd.CategoricalDtype) else values
+        new_categories = values.cat.categories
+        known = self.categories.get(column)
+        if known is None:
+            self.categories[column] = new_categories
+            return values.cat.codes.to_numpy()
+        extra = new_categories[~new_categories.isin(known)]
+        if len(extra):
+            # 처음 읽을 때처럼 정렬된 category 면 정렬을 유지 (기존 코드는 새 배열로 다시 매핑)
+            categories = known.append(extra)
+            if known.is_monotonic_increasing:
+                categories = categories.sort_values()
+                buffer = self.buffers[column]
+                remapped = np.empty(len(buffer.values), dtype=_code_dtype(categories))
+                remapped[:buffer.size] = _recode(buffer.values[:buffer.size], known, categories)
+                buffer.values = remapped
+            self.categories[column] = known = categories
+        return _recode(values.cat.codes.to_numpy(), new_categories, known).astype(_code_dtype(known))
+
+    def frame(self):
+        data = {}
+        for column, buffer in self.buffers.items():
+            values = buffer.to_array(self.size)
+            dtype = self.dtypes[column]
+            if isinstance(dtype, pd.CategoricalDtype):
+                values = pd.Categorical.from_codes(values, categories=self.categories[column], ordered=dtype.ordered,
+                                                   validate=False)
+            elif not isinstance(dtype, np.dtype):
+                values = pd.array(values, dtype=dtype)
+            data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+
+def _recode(codes, categories, new_categories):
+    # categories 기준 코드를 new_categories 기준 코드로 (결측 -1 은 그대로)
+    return np.append(new_categories.get_indexer(categories), -1)[codes]
+
+
+def _code_dtype(categories):
+    return np.result_type(np.min_scalar_type(-len(categories)), np.int8)
+
+
+class IncrementalSource:
+    """CSV 끝에 새로 추가된 줄만 읽어 메모리 버퍼와 컬럼형 캐시에 이어 붙이는 데이터 소스
+
+    reader 는 loading.read_final_csv, loading.read_trade_csv, loading.load_snapshot_data 처럼
+    경로나 (헤더 포함) 텍스트 버퍼를 받아 정규화된 DataFrame 을 반환하는 함수.
+    새 행은 컬럼 버퍼에 이어 쓰고 캐시에는 segment 파일로 덧붙이므로 (loading.append_cache)
+    refresh 비용은 전체 행 수가 아니라 새 행 수에 비례한다.
+    """
+
+    def __init__(self, path, reader, time_column, cache=True):
+        self.path = path
+        self.reader = reader
+        self.time_column = time_column
+        self.cache = cache
+        self.generation = 0  # 파일을 처음부터 다시 읽을 때마다 증가
+        self._lock = threading.Lock()
+        self._load_all()
+
+    def _load_all(self):
+        # 읽는 도중 파일이 바뀌면 다시 읽음
+        while True:
+            before = file_fingerprint(self.path)
+            frame = read_cached(self.path, self.reader) if self.cache else self.reader(self.path)
+            if file_fingerprint(self.path) == before:
+                break
+        with open(self.path, 'rb') as f:
+            self.header = f.readline()
+        self.offset = before['size']  # 마지막으로 읽은 바이트 위치
+        self._buffer = _FrameBuffer(frame)
+        self._frame = frame
+        self._last_time = frame[self.time_column].max() if len(frame) else pd.NaT
+        self._cache_fingerprint = before  # 컬럼형 캐시에 기록된 원본 상태
+        self._cache_rows = len(frame)      # 컬럼형 캐시에 들어 있는 행 수
+
+    @property
+    def frame(self):
+        """지금까지 읽은 전체 프레임 (버퍼 view, 새 행이 추가될 때만 다시 만듦)"""
+        if self._frame is None:
+            self._frame = self._buffer.frame()
+        return self._frame
+
+    @property
+    def last_time(self):
+        """지금까지 읽은 데이터의 마지막 시각 (createdAt / executedAt)"""
+        return self._last_time
+
+    @property
+    def version(self):
+        """읽은 내용을 나타내는 문자열 (파일 경로, 다시 읽은 횟수, 읽은 바이트 위치)"""
+        return f'{os.path.abspath(self.path)}:{self.generation}:{self.offset}'
+
+    def refresh(self):
+        """추가된 줄을 읽어 (새 행, 전체 재적재 여부) 를 반환하는 함수
+
+        파일이 줄어들었으면 (교체/초기화) 전체를 다시 읽고 전체 프레임을 새 행으로 반환한다.
+        """
+        with self._lock:
+            size = os.path.getsize(self.path)
+            if size < self.offset:
+                self.generation += 1
+                self._load_all()
+                return self.frame, True
+            if size == self.offset:
+                return self.frame.iloc[0:0], False
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                tail = f.read(size - self.offset)
+            # 아직 쓰는 중인 마지막 줄은 다음 refresh 에서 읽음
+            end = tail.rfind(b'\n') + 1
+            if end == 0:
+                return self.frame.iloc[0:0], False
+
+            new_rows = self.reader(io.StringIO((self.header + tail[:end]).decode('utf-8')))
+            self.offset += end
+            self._buffer.append(new_rows)
+            self._frame = None
+            if len(new_rows):
+                self._last_time = new_rows[self.time_column].max() if pd.isna(self._last_time) \
+                    else max(self._last_time, new_rows[self.time_column].max())
+            if self.cache:
+                self._append_cache()
+            return new_rows, False
+
+    def _append_cache(self):
+        # 원본을 읽은 위치까지의 행만 캐시에 덧붙임 (그 사이 파일이 더 자랐으면 다음 refresh 때 함께 씀)
+        fingerprint = file_fingerprint(self.path)
+        if fingerprint['size'] != self.offset:
+            return
+        new_rows = self.frame.iloc[self._cache_rows:]
+        if not append_cache(self.path, new_rows, self._cache_fingerprint, fingerprint):
+            write_cache(self.path, self.frame, fingerprint)
+        self._cache_fingerprint = fingerprint
+        self._cache_rows = len(self.frame)
+
+
+class IncrementalAnalysis:
+    """환율/거래 IncrementalSource 를 공유 RateStore 와 ResultCache 에 이어 주는 증분 분석기
+
+    update() 는 두 소스에 추가된 줄만 읽어 저장소 끝에 틱을 이어 붙이고 데이터 버전을 올린다.
+    executedAt + date_window 창이 이전 데이터의 마지막 틱 이후까지 열려 있던 거래만 dirty 로 보고
+    나머지 거래의 결과는 ResultCache.carry_over 로 새 버전에 옮기므로, 다음 analyze 는 dirty 거래와
+    새로 추가된 거래만 match_target_prices 로 다시 계산한다.
+    """
+
+    def __init__(self, rates, trades, result_cache):
+        self.rates = rates
+        self.trades = trades
+        self.result_cache = result_cache
+        self._lock = threading.Lock()
+        self.store = prepare_bars(self._build_store())
+        self.version = self._version()
+
+    def update(self):
+        """소스에 추가된 줄을 반영하고 (환율 저장소, 거래 데이터, 데이터 버전) 을 반환"""
+        with self._lock:
+            last_time = self.store.max_time()
+            new_ticks, rates_reset = self.rates.refresh()
+            new_trades, trades_reset = self.trades.refresh()
+            if rates_reset or trades_reset or len(new_ticks) or len(new_trades):
+                store = None if rates_reset else self.store.extended(new_ticks)
+                appended = store is not None and not trades_reset
+                if store is None:
+                    store = self._build_store()
+                store.frame_nbytes = self._frame_nbytes()
+                version = self._version()
+                if appended:
+                    # 틱이 추가되지 않았으면 열려 있던 거래의 결과도 그대로 유효
+                    self.result_cache.carry_over(self.version, version, last_time if len(new_ticks) else None)
+                self.store, self.version = prepare_bars(store), version
+            return self.store, self.trades.frame, self.version
+
+    def _build_store(self):
+        store = RateStore.from_frame(self.rates.frame)
+        store.frame_nbytes = self._frame_nbytes()
+        return store
+
+    def _frame_nbytes(self):
+        return int(self.rates.frame.memory_usage(deep=True).sum())
+
+    def _version(self):
+        return hashlib.sha1(f'{self.rates.version}|{self.trades.version}'.encode()).hexdigest()[:16]
@@ -0,0 +1,128 @@
+"""단계별(로드 / 필터 / 매칭 / 수익 / 렌더) 실행 시간, 행 수, 메모리 변화 기록
+
+    timer = StageTimer('analysis', profile=False)
+    with timer.stage('filter', rows_in=len(trade_df)) as record:
+        filtered = filter_trade_data(trade_df, currencies)
+        record['rows_out'] = len(filtered)
+    timer.write_jsonl('./metrics.jsonl')   # 단계마다 JSON 한 줄
+    timer.metrics()                         # {단계: {seconds, rows_in, rows_out, mem_delta_mb}}
+
+profile=True 면 단계 안에서 실행된 코드만 cProfile 로 측정하고 profile_stats() / dump_profile() 로 결과를 본다.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """현재 프로세스 메모리 (Linux 는 현재 RSS, 그 외에는 최대 RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024  # macOS 는 bytes, Linux 는 KB
+
+
+class StageTimer:
+    """실행 한 번의 단계별 기록 (records 는 단계가 끝난 순서의 dict 목록)"""
+
+    def __init__(self, name='run', profile=False):
+        self.run_id = f'{name}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}'
+        self.records = []
+        self.profiler = cProfile.Profile() if profile else None
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None, **extra):
+        """with 블록 하나를 한 단계로 기록 (yield 한 dict 에 rows_out 등을 채움)"""
+        record = self.begin(name, rows_in, **extra)
+        try:
+            yield record
+        finally:
+            self.end(record)
+
+    def begin(self, name, rows_in=None, **extra):
+        """with 로 감싸기 어려운 구간의 시작 (end(record) 로 끝냄)"""
+        record = {'run': self.run_id, 'stage': name, 'started_at': datetime.now().isoformat(timespec='milliseconds'),
+                  'rows_in': rows_in, 'rows_out': None, **extra}
+        record['_rss'] = rss_bytes()
+        # 단계가 중첩되면 바깥 단계에서만 프로파일러를 켜고 끔
+        if self.profiler is not None and self._depth == 0:
+            self.profiler.enable()
+        self._depth += 1
+        record['_started'] = time.perf_counter()
+        return record
+
+    def end(self, record, rows_out=None):
+        seconds = time.perf_counter() - record.pop('_started')
+        self._depth -= 1
+        if self.profiler is not None and self._depth == 0:
+            self.profiler.disable()
+        if rows_out is not None:
+            record['rows_out'] = rows_out
+        record['seconds'] = round(seconds, 6)
+        record['mem_delta_mb'] = round((rss_bytes() - record.pop('_rss')) / 2**20, 3)
+        self.records.append(record)
+        logger.debug(json.dumps(record, ensure_ascii=False, default=str))
+        return record
+
+    def metrics(self):
+        """단계 이름별 합계: 같은 이름이 여러 번이면 시간/메모리는 더하고 행 수는 마지막 값"""
+        metrics = {}
+        for record in self.records:
+            entry = metrics.setdefault(record['stage'], {'seconds': 0.0, 'mem_delta_mb': 0.0, 'calls': 0})
+            entry['seconds'] += record['seconds']
+            entry['mem_delta_mb'] += record['mem_delta_mb']
+            entry['calls'] += 1
+            entry['rows_in'] = record['rows_in']
+            entry['rows_out'] = record['rows_out']
+        return metrics
+
+    def to_frame(self):
+        """표시용 단계별 표 (stage, seconds, rows_in, rows_out, mem_delta_mb)"""
+        return pd.DataFrame(self.records, columns=['stage', 'seconds', 'rows_in', 'rows_out', 'mem_delta_mb'])
+
+    def write_jsonl(self, path):
+        """기록을 JSON lines 로 파일 끝에 추가"""
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def profile_stats(self, limit=30, sort='cumulative'):
+        """cProfile 결과 상위 limit 개 함수 (profile=False 면 빈 문자열)"""
+        if self.profiler is None:
+            return ''
+        out = io.StringIO()
+        try:
+            pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        except TypeError:  # 아직 측정한 단계가 없음
+            return ''
+        return out.getvalue()
+
+    def dump_profile(self, path):
+        """snakeviz / pstats 로 열 수 있는 .prof 파일로 저장"""
+        if self.profiler is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.profiler.dump_stats(path)
@@ -0,0 +1,191 @@
+"""조합 시뮬레이션을 백그라운드 스레드에서 실행하는 작업 관리자
+
+Streamlit 스크립트는 작업을 제출하고 바로 돌아가며, 화면은 job_id 로 작업을 찾아
+진행률과 지금까지 끝난 date_window 의 부분 결과를 그린다. 위젯을 조작해 스크립트가 다시 실행돼도
+작업은 계속되고, 같은 조건으로 다시 제출하면 기존 작업(진행 중 또는 완료)을 그대로 돌려준다.
+완료된 작업의 결과는 store_dir 에 저장해 앱을 재시작해도 다시 계산하지 않는다.
+끝난 작업은 최근 max_finished 개만 메모리와 store_dir 에 남기고 오래된 것부터 지운다.
+
+    manager = JobManager(store_dir='./.jobs')
+    job = manager.submit(store, trade_df, start, end, range(1, 31), [1.0, 2.0], version=data_version)
+    job.progress, job.profit_df()   # 부분 결과
+    job.cancel()
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis import simulate_profit
+from matching import SweepCancelled, profit_rows, sweep_frames
+from sweep import simulate_profit_parallel
+
+logger = logging.getLogger(__name__)
+
+
+class SweepJob:
+    """(date_window x 조정값) 조합 시뮬레이션 작업 하나의 상태와 부분 결과"""
+
+    def __init__(self, job_id, date_windows, adjustments, params):
+        self.job_id = job_id
+        self.date_windows = list(date_windows)
+        self.adjustments = list(adjustments)
+        self.params = params
+        self.status = 'pending'  # pending -> running -> done / cancelled / failed
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.trade_count = 0
+        self._totals = np.zeros((len(self.date_windows), len(self.adjustments), 5))
+        self._done = np.zeros(len(self.date_windows), dtype=bool)
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'cancelled', 'failed')
+
+    @property
+    def progress(self):
+        """끝난 date_window 비율 (0.0 ~ 1.0)"""
+        return float(self._done.mean()) if len(self._done) else 1.0
+
+    @property
+    def cells_done(self):
+        return int(self._done.sum()) * len(self.adjustments)
+
+    @property
+    def cells_total(self):
+        return len(self.date_windows) * len(self.adjustments)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def profit_df(self):
+        """지금까지 끝난 date_window 의 profit_df (simulate_profit 과 같은 형식, 완료되면 전체)"""
+        with self._lock:
+            rows = np.flatnonzero(self._done)
+            return profit_rows([self.date_windows[i] for i in rows], self.adjustments, self._totals[rows],
+                               self.trade_count)
+
+    def _on_window(self, i, totals):
+        with self._lock:
+            self._totals[i] = totals
+            self._done[i] = True
+
+
+class JobManager:
+    """SweepJob 들을 스레드 풀에서 실행하고 job_id 로 찾게 해 주는 관리자 (st.cache_resource 로 공유)"""
+
+    def __init__(self, max_jobs=2, store_dir=None, max_finished=20):
+        self.store_dir = store_dir
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='sweep-job')
+        if store_dir:
+            self._load_finished()
+            self._prune()
+
+    def submit(self, rates, trade_df, start_date, end_date, date_windows, adjustments, workers=1, version=None, tag=()):
+        """작업을 제출하고 SweepJob 을 반환 (같은 조건의 진행 중/완료 작업이 있으면 그 작업)"""
+        date_windows, adjustments = list(date_windows), [float(j) for j in adjustments]
+        params = {'version': version, 'tag': list(tag), 'start': str(pd.Timestamp(start_date)),
+                  'end': str(pd.Timestamp(end_date)), 'date_windows': date_windows, 'adjustments': adjustments}
+        job_id = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()[:12]
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in ('cancelled', 'failed'):
+                return job
+            job = SweepJob(job_id, date_windows, adjustments, params)
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job, rates, trade_df, start_date, end_date, workers)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """최근 제출 순 작업 목록"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def _run(self, job, rates, trade_df, start_date, end_date, workers):
+        job.status = 'running'
+        try:
+            # 성공률 분모 (중복 제거 후 거래 수) 를 부분 결과에서도 쓰도록 먼저 거르고, 거른 결과를 그대로 넘김
+            rates, trade_df = sweep_frames(rates, trade_df, start_date, end_date, max(job.date_windows, default=0))
+            job.trade_count = len(trade_df)
+            if workers > 1:
+                simulate_profit_parallel(rates, trade_df, start_date, end_date, job.date_windows, job.adjustments,
+                                         max_workers=workers, on_window=job._on_window, cancel=job._cancel, swept=True)
+            else:
+                simulate_profit(rates, trade_df, start_date, end_date, job.date_windows, job.adjustments,
+                                on_window=job._on_window, cancel=job._cancel, swept=True)
+            job.status = 'done'
+        except SweepCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.exception(f'시뮬레이션 작업 {job.job_id} 실패')
+            job.error = repr(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+        logger.info(f'시뮬레이션 작업 {job.job_id} {job.status}: {job.cells_done}/{job.cells_total} 조합, '
+                    f'{job.finished_at - job.created_at:.2f}s')
+        if job.status == 'done' and self.store_dir:
+            self._save(job)
+        self._prune()
+
+    def _prune(self):
+        # 끝난 작업은 최근 max_finished 개만 유지 (진행 중 작업은 건드리지 않음)
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.finished),
+                              key=lambda job: job.finished_at or job.created_at, reverse=True)
+            stale = finished[self.max_finished:]
+            for job in stale:
+                del self._jobs[job.job_id]
+        for job in stale:
+            if self.store_dir:
+                with contextlib.suppress(OSError):
+                    os.remove(self._path(job.job_id))
+
+    def _path(self, job_id):
+        return os.path.join(self.store_dir, f'{job_id}.pkl')
+
+    def _save(self, job):
+        # 완료된 작업만 저장 (부분 결과는 저장하지 않음)
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(job.job_id)
+        tmp_path = path + '.tmp'
+        state = {key: value for key, value in job.__dict__.items() if key not in ('_cancel', '_lock')}
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+    def _load_finished(self):
+        if not os.path.isdir(self.store_dir):
+            return
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                with open(os.path.join(self.store_dir, name), 'rb') as f:
+                    state = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError, AttributeError):
+                continue
+            job = SweepJob(state['job_id'], state['date_windows'], state['adjustments'], state['params'])
+            job.__dict__.update(state)
+            self._jobs[job.job_id] = job
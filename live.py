@@ -0,0 +1,415 @@
+"""실시간 목표가 모니터: 환율 틱 스트림을 asyncio 로 받아 열린 거래의 목표가 도달을 바로 기록
+
+배치 분석처럼 전체 기간을 다시 돌리지 않고, 통화마다 열린 거래를 목표가 기준 힙 두 개
+(매수: 목표가가 높은 순, 매도: 낮은 순) 로 들고 있다가 틱이 오면 힙 맨 위부터 도달한 거래만 꺼낸다.
+체결 전 거래는 executedAt 순 대기 힙에, 열린 거래는 executedAt + date_window 순 만료 힙에 두므로
+거래마다 힙에 넣고 빼는 횟수가 상수이고 틱당 비용은 O(log 열린 거래 수) 이다.
+도달 판정은 배치 분석과 같다 (구간 [executedAt, executedAt + date_window] 양 끝 포함, 매수 <= 목표가, 매도 >= 목표가).
+틱은 통화별로 시간순으로 들어온다고 가정한다.
+
+    monitor = LiveMonitor(trade_df, buy_price_adjustment=1.0, sell_price_adjustment=1.0, date_window=1)
+    asyncio.run(monitor.run(tail_csv('./final.csv')))
+    monitor.stats(), monitor.hits_frame(), monitor.open_frame()
+
+    python live.py watch --rates ./final.csv --trades ./trade.csv --window 1
+    python live.py replay --rates ./final.csv --port 9100 --speed 200   # 소켓 피드 대용: CSV 를 TCP 로 한 줄씩 보냄
+    python live.py watch --connect 127.0.0.1:9100 --trades ./trade.csv
+"""
+import argparse
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from loading import read_cached, read_trade_csv
+from matching import trade_columns
+
+logger = logging.getLogger(__name__)
+
+# final.csv 의 createdAt 은 UTC (loading._normalize_final 과 같이 KST 로 바꿈)
+KST_OFFSET = pd.Timedelta(hours=9).value
+
+PENDING, OPEN, HIT, EXPIRED = range(4)
+STATUS_NAMES = {PENDING: '체결 전', OPEN: '대기 중', HIT: '도달', EXPIRED: '만료'}
+
+
+class _CurrencyBook:
+    # 한 통화의 힙들: 모두 (키, 거래 번호), 상태가 바뀐 거래는 꺼낼 때 건너뜀 (지연 삭제)
+    __slots__ = ('pending', 'buy', 'sell', 'expiry', 'last_price', 'last_time')
+
+    def __init__(self):
+        self.pending = []  # (executedAt ns, i)
+        self.buy = []      # (-목표가, i): 목표가가 가장 높은 매수 거래가 맨 위
+        self.sell = []     # (목표가, i): 목표가가 가장 낮은 매도 거래가 맨 위
+        self.expiry = []   # (executedAt + date_window ns, i)
+        self.last_price = np.nan
+        self.last_time = None
+
+
+class LiveMonitor:
+    """열린 거래의 목표가를 통화별 힙으로 유지하며 틱마다 도달/만료를 처리하는 객체
+
+    on_tick 은 스레드 안전하다 (Streamlit 화면은 다른 스레드에서 stats / hits_frame 을 읽음).
+    on_hit(hit_dict) 를 주면 도달할 때마다 호출한다.
+    """
+
+    def __init__(self, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, max_hits=1000, on_hit=None):
+        self.buy_price_adjustment = buy_price_adjustment
+        self.sell_price_adjustment = sell_price_adjustment
+        self.date_window = date_window
+        self.window = pd.Timedelta(days=date_window).value
+        self.on_hit = on_hit
+        self.books = {}
+        self.hits = deque(maxlen=max_hits)  # 최근 도달 (오래된 것부터 밀려남)
+        self.counts = {PENDING: 0, OPEN: 0, HIT: 0, EXPIRED: 0}
+        self.tick_count = 0
+        self.started_at = time.time()
+        # 거래별 속성 (거래 번호 = 추가된 순서)
+        self._currency, self._is_buy, self._price, self._target, self._amount = [], [], [], [], []
+        self._executed_at, self._expire_at, self._status, self._hit_price, self._hit_at = [], [], [], [], []
+        self._lock = threading.Lock()
+        self.add_trades(trade_df)
+
+    def add_trades(self, trade_df):
+        """거래를 추가 (체결 시각 전이면 대기, 이미 구간이 지난 거래는 다음 틱에서 만료)"""
+        if len(trade_df) == 0:
+            return
+        currency, is_buy, price, amount, _ = trade_columns(trade_df)
+        target = np.where(is_buy, price - self.buy_price_adjustment, price + self.sell_price_adjustment)
+        executed_at = trade_df['executedAt'].to_numpy(dtype='datetime64[ns]').view('int64')
+        with self._lock:
+            first = len(self._status)
+            self._currency.extend(currency.tolist())
+            self._is_buy.extend(is_buy.tolist())
+            self._price.extend(price.tolist())
+            self._target.extend(target.tolist())
+            self._amount.extend(amount.tolist())
+            self._executed_at.extend(executed_at.tolist())
+            self._expire_at.extend((executed_at + self.window).tolist())
+            self._status.extend([PENDING] * len(trade_df))
+            self._hit_price.extend([np.nan] * len(trade_df))
+            self._hit_at.extend([None] * len(trade_df))
+            self.counts[PENDING] += len(trade_df)
+            for i in range(first, len(self._status)):
+                self._book(self._currency[i]).pending.append((self._executed_at[i], i))
+            for book in self.books.values():
+                heapq.heapify(book.pending)
+
+    def _book(self, currency):
+        book = self.books.get(currency)
+        if book is None:
+            book = self.books[currency] = _CurrencyBook()
+        return book
+
+    def _set_status(self, i, status):
+        self.counts[self._status[i]] -= 1
+        self.counts[status] += 1
+        self._status[i] = status
+
+    def on_tick(self, currency, price, created_at):
+        """틱 하나 처리 (created_at 은 KST int64 ns), 이번 틱에서 도달한 거래 번호 목록을 반환"""
+        with self._lock:
+            self.tick_count += 1
+            book = self._book(currency)
+            book.last_price, book.last_time = price, created_at
+            status = self._status
+
+            # 1. 체결 시각이 된 거래를 목표가 힙에 넣음 (구간이 이미 지났으면 바로 만료)
+            while book.pending and book.pending[0][0] <= created_at:
+                _, i = heapq.heappop(book.pending)
+                if status[i] != PENDING:
+                    continue
+                if self._expire_at[i] < created_at:
+                    self._set_status(i, EXPIRED)
+                    continue
+                self._set_status(i, OPEN)
+                if self._is_buy[i]:
+                    heapq.heappush(book.buy, (-self._target[i], i))
+                else:
+                    heapq.heappush(book.sell, (self._target[i], i))
+                heapq.heappush(book.expiry, (self._expire_at[i], i))
+
+            # 2. executedAt + date_window 가 지난 거래 만료
+            while book.expiry and book.expiry[0][0] < created_at:
+                _, i = heapq.heappop(book.expiry)
+                if status[i] == OPEN:
+                    self._set_status(i, EXPIRED)
+
+            # 3. 힙 맨 위부터 도달한 거래만 꺼냄 (만료된 거래는 여기서 정리)
+            hits = []
+            while book.buy and (status[book.buy[0][1]] != OPEN or price <= -book.buy[0][0]):
+                _, i = heapq.heappop(book.buy)
+                if status[i] == OPEN:
+                    hits.append(i)
+            while book.sell and (status[book.sell[0][1]] != OPEN or price >= book.sell[0][0]):
+                _, i = heapq.heappop(book.sell)
+                if status[i] == OPEN:
+                    hits.append(i)
+            for i in hits:
+                self._set_status(i, HIT)
+                self._hit_price[i], self._hit_at[i] = price, created_at
+                self.hits.append(self._record(i))
+        if self.on_hit is not None:
+            for i in hits:
+                self.on_hit(self._record(i))
+        return hits
+
+    def _record(self, i):
+        executed_at = pd.Timestamp(self._executed_at[i])
+        hit_at = pd.Timestamp(self._hit_at[i]) if self._hit_at[i] is not None else pd.NaT
+        return {
+            'trade': i,
+            'currency': self._currency[i],
+            'order_type': '매수' if self._is_buy[i] else '매도',
+            'original_price': self._price[i],
+            'target_price': self._target[i],
+            'hit_price': self._hit_price[i],
+            'amount': self._amount[i],
+            'executedAt': executed_at,
+            'hit_at': hit_at,
+            'time_to_fill': hit_at - executed_at,
+        }
+
+    async def run(self, source, stop=None):
+        """source (틱 (통화, 가격, 시각 ns) 을 내보내는 async iterator) 가 끝나거나 stop 이 설정될 때까지 처리"""
+        async for currency, price, created_at in source:
+            self.on_tick(currency, price, created_at)
+            if stop is not None and stop.is_set():
+                break
+
+    def stats(self):
+        """전체 집계 (처리한 틱 수, 상태별 거래 수, 초당 틱 수)"""
+        with self._lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            return {'ticks': self.tick_count, 'ticks_per_sec': self.tick_count / elapsed,
+                    **{STATUS_NAMES[status]: count for status, count in self.counts.items()}}
+
+    def currency_frame(self):
+        """통화별 마지막 틱과 열린 거래 수, 가장 가까운 매수/매도 목표가"""
+        with self._lock:
+            rows = []
+            for currency, book in sorted(self.books.items()):
+                open_buy = [(-key, i) for key, i in book.buy if self._status[i] == OPEN]
+                open_sell = [(key, i) for key, i in book.sell if self._status[i] == OPEN]
+                rows.append({
+                    'currency': currency,
+                    'last_price': book.last_price,
+                    'last_time': pd.Timestamp(book.last_time) if book.last_time is not None else pd.NaT,
+                    'open_buy': len(open_buy),
+                    'open_sell': len(open_sell),
+                    'next_buy_target': max(open_buy)[0] if open_buy else np.nan,
+                    'next_sell_target': min(open_sell)[0] if open_sell else np.nan,
+                    'pending': sum(self._status[i] == PENDING for _, i in book.pending),
+                })
+            return pd.DataFrame(rows, columns=['currency', 'last_price', 'last_time', 'open_buy', 'open_sell',
+                                               'next_buy_target', 'next_sell_target', 'pending'])
+
+    def hits_frame(self):
+        """최근 도달 거래 (최근 것이 위)"""
+        with self._lock:
+            hits = list(self.hits)
+        return pd.DataFrame(hits[::-1], columns=['trade', 'currency', 'order_type', 'original_price', 'target_price',
+                                                 'hit_price', 'amount', 'executedAt', 'hit_at', 'time_to_fill'])
+
+    def open_frame(self, limit=1000):
+        """열린 거래 중 만료가 가까운 순 limit 개"""
+        with self._lock:
+            entries = heapq.nsmallest(limit, (entry for book in self.books.values() for entry in book.expiry
+                                              if self._status[entry[1]] == OPEN))
+            rows = [{**self._record(i), 'expires_at': pd.Timestamp(expire_at)} for expire_at, i in entries]
+        return pd.DataFrame(rows).drop(columns=['hit_price', 'hit_at', 'time_to_fill'], errors='ignore')
+
+
+# ---------------------------------------------------------------------------
+# 틱 소스: (통화, 가격, createdAt KST ns) 를 내보내는 async iterator
+# ---------------------------------------------------------------------------
+class _LineParser:
+    # final.csv 형식 (,currencyCode,basePrice,createdAt) 한 줄 -> 틱 (헤더로 컬럼 위치를 잡음)
+    def __init__(self, header):
+        names = [name.strip().strip('"') for name in header.rstrip('\r\n').split(',')]
+        self.currency = names.index('currencyCode')
+        self.price = names.index('basePrice')
+        self.created_at = names.index('createdAt')
+
+    def __call__(self, line):
+        fields = line.rstrip('\r\n').split(',')
+        try:
+            created_at = np.datetime64(fields[self.created_at].strip('"').replace(' ', 'T'), 'ns').astype('int64')
+            return fields[self.currency].strip('"'), float(fields[self.price]), int(created_at) + KST_OFFSET
+        except (IndexError, ValueError):
+            logger.warning(f'읽을 수 없는 틱 줄 건너뜀: {line.strip()[:80]}')
+            return None
+
+
+async def tail_csv(path, follow=True, from_start=True, poll_interval=0.5):
+    """final.csv 형식 파일을 읽고 follow=True 면 tail -f 처럼 새로 붙는 줄을 계속 내보냄
+
+    from_start=False 면 지금 파일 끝부터 (새로 들어오는 틱만) 읽는다. 쓰다 만 마지막 줄은 줄바꿈이 올 때까지 기다린다.
+    """
+    with open(path, encoding='utf-8') as f:
+        parse = _LineParser(f.readline())
+        if not from_start:
+            f.seek(0, 2)
+        partial = ''
+        while True:
+            lines = f.readlines(1 << 16)
+            if not lines:
+                if not follow:
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            lines[0] = partial + lines[0]
+            partial = '' if lines[-1].endswith('\n') else lines.pop()
+            for line in lines:
+                tick = parse(line)
+                if tick is not None:
+                    yield tick
+            await asyncio.sleep(0)  # 한 묶음마다 이벤트 루프에 양보
+
+
+async def tcp_source(host, port):
+    """TCP 로 final.csv 형식 줄 (첫 줄은 헤더) 을 받는 소스 (replay_server 또는 실제 피드의 대용)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        parse = _LineParser((await reader.readline()).decode())
+        while line := await reader.readline():
+            tick = parse(line.decode())
+            if tick is not None:
+                yield tick
+    finally:
+        writer.close()
+
+
+async def frame_source(final_df, speed=None):
+    """final_df (KST createdAt) 를 시간순으로 내보내는 소스, speed 는 초당 틱 수 (없으면 최대한 빠르게)"""
+    final_df = final_df.sort_values('createdAt', kind='stable')
+    created_at = final_df['createdAt'].to_numpy(dtype='datetime64[ns]').view('int64')
+    currencies = final_df['currencyCode'].to_numpy(dtype=object)
+    prices = final_df['basePrice'].to_numpy(dtype='float64')
+    for k in range(len(final_df)):
+        yield currencies[k], prices[k], int(created_at[k])
+        if speed:
+            await asyncio.sleep(1 / speed)
+        elif k % 1000 == 0:
+            await asyncio.sleep(0)
+
+
+async def replay_server(path, host='127.0.0.1', port=9100, speed=None):
+    """접속한 클라이언트마다 final.csv 를 헤더부터 한 줄씩 보내는 TCP 서버 (speed: 초당 줄 수)"""
+    async def handle(reader, writer):
+        try:
+            with open(path, encoding='utf-8') as f:
+                for n, line in enumerate(f):
+                    writer.write(line.encode())
+                    if speed:
+                        await writer.drain()
+                        await asyncio.sleep(1 / speed)
+                    elif n % 1000 == 0:
+                        await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f'{path} 재생 서버: {host}:{port}')
+    async with server:
+        await server.serve_forever()
+
+
+class LiveRunner:
+    """모니터를 별도 스레드의 asyncio 이벤트 루프에서 돌리는 객체 (Streamlit 화면은 스레드 밖에서 상태만 읽음)"""
+
+    def __init__(self, monitor, source_factory):
+        self.monitor = monitor
+        self.source_factory = source_factory  # 이벤트 루프 안에서 호출해 소스를 만드는 함수
+        self.status = 'stopped'  # running -> finished / stopped / failed
+        self.error = None
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self.status = 'running'
+        self._thread = threading.Thread(target=self._run, name='live-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        if self._loop is not None and self._task is not None and self.running:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join(timeout)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self.monitor.run(self.source_factory()))
+            self._loop.run_until_complete(self._task)
+            self.status = 'finished'
+        except asyncio.CancelledError:
+            self.status = 'stopped'
+        except Exception as e:
+            logger.exception('실시간 모니터 실패')
+            self.error = repr(e)
+            self.status = 'failed'
+        finally:
+            self._loop.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='실시간 목표가 모니터')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    watch = subparsers.add_parser('watch', help='환율 피드를 받아 목표가 도달을 출력')
+    watch.add_argument('--rates', default='./final.csv', help='따라갈 환율 CSV (final.csv 형식)')
+    watch.add_argument('--connect', help='CSV 대신 TCP 피드 (host:port)')
+    watch.add_argument('--trades', default='./trade.csv', help='거래 데이터 CSV')
+    watch.add_argument('--buy-adj', type=float, default=1.0, help='매수 목표가 조정값')
+    watch.add_argument('--sell-adj', type=float, default=1.0, help='매도 목표가 조정값')
+    watch.add_argument('--window', type=int, default=1, help='환율 분석 기간(일)')
+    watch.add_argument('--new-only', action='store_true', help='파일 끝부터 새로 붙는 틱만 처리')
+    watch.add_argument('--no-follow', action='store_true', help='파일 끝에 도달하면 종료')
+    replay = subparsers.add_parser('replay', help='CSV 를 TCP 로 한 줄씩 보내는 재생 서버 (소켓 피드 대용)')
+    replay.add_argument('--rates', default='./final.csv')
+    replay.add_argument('--host', default='127.0.0.1')
+    replay.add_argument('--port', type=int, default=9100)
+    replay.add_argument('--speed', type=float, help='초당 줄 수 (없으면 최대한 빠르게)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'replay':
+        asyncio.run(replay_server(args.rates, args.host, args.port, args.speed))
+        return 0
+
+    def report(hit):
+        logger.info(f"도달: {hit['currency']} {hit['order_type']} 목표가 {hit['target_price']} <- {hit['hit_price']} "
+                    f"({hit['hit_at']}, 체결 후 {hit['time_to_fill']})")
+
+    trade_df = read_cached(args.trades, read_trade_csv)
+    monitor = LiveMonitor(trade_df, args.buy_adj, args.sell_adj, args.window, on_hit=report)
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        source = tcp_source(host, int(port))
+    else:
+        source = tail_csv(args.rates, follow=not args.no_follow, from_start=not args.new_only)
+    try:
+        asyncio.run(monitor.run(source))
+    except KeyboardInterrupt:
+        pass
+    logger.info(f'처리 결과: {monitor.stats()}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+import streamlit as st
+from data import filter_trade_data, load_final_data, load_trade_data
+from live import LiveMonitor, LiveRunner, frame_source, tail_csv, tcp_source
+
+
+# 실시간 목표가 모니터 페이지 (streamlit run live_app.py)
+# 모니터는 세션마다 백그라운드 스레드의 asyncio 루프에서 돌고, 화면은 1초마다 상태만 다시 그림
+def main():
+    st.title('📡 실시간 목표가 모니터')
+
+    st.sidebar.header('설정')
+    source_name = st.sidebar.radio('환율 피드', ['final.csv 재생', 'final.csv 따라가기 (tail)', 'TCP 피드'])
+    speed = st.sidebar.number_input('재생 속도 (초당 틱, 0 = 최대)', min_value=0, max_value=100_000, value=200, step=100)
+    address = st.sidebar.text_input('TCP 주소 (python live.py replay 로 띄운 서버)', '127.0.0.1:9100')
+    buy_price_adjustment = st.sidebar.slider('매수 목표가 조정값', 0.0, 10.0, 1.0, 0.5)
+    sell_price_adjustment = st.sidebar.slider('매도 목표가 조정값', 0.0, 10.0, 1.0, 0.5)
+    date_window = st.sidebar.slider('환율 분석 기간(일)', 1, 30, 1)
+    available_currencies = ['USD', 'JPY', 'CAD']
+    selected_currencies = st.sidebar.multiselect('통화 선택', available_currencies, default=available_currencies)
+
+    runner = st.session_state.get('live_runner')
+    col1, col2 = st.sidebar.columns(2)
+    if col1.button('시작', disabled=runner is not None and runner.running):
+        trade_df = filter_trade_data(load_trade_data(), selected_currencies)
+        monitor = LiveMonitor(trade_df, buy_price_adjustment, sell_price_adjustment, date_window)
+        if source_name == 'final.csv 재생':
+            final_df = load_final_data()
+            final_df = final_df[final_df['currencyCode'].isin(selected_currencies)]
+            source_factory = lambda: frame_source(final_df, speed=speed or None)
+        elif source_name == 'TCP 피드':
+            host, port = address.rsplit(':', 1)
+            source_factory = lambda: tcp_source(host, int(port))
+        else:
+            source_factory = lambda: tail_csv('./final.csv', follow=True, from_start=False)
+        runner = st.session_state['live_runner'] = LiveRunner(monitor, source_factory).start()
+    if col2.button('정지', disabled=runner is None or not runner.running):
+        runner.stop()
+
+    if runner is None:
+        st.info('왼쪽에서 피드와 조건을 고르고 시작을 누르세요.')
+        return
+    show_live_state(runner)
+
+
+@st.fragment(run_every=1.0)
+def show_live_state(runner):
+    monitor = runner.monitor
+    stats = monitor.stats()
+    st.caption(f"상태: {runner.status}" + (f" ({runner.error})" if runner.error else ''))
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric('처리한 틱', f"{stats['ticks']:,}")
+    col2.metric('초당 틱', f"{stats['ticks_per_sec']:,.0f}")
+    col3.metric('대기 중 거래', f"{stats['대기 중']:,}")
+    col4.metric('목표가 도달', f"{stats['도달']:,}")
+    col5.metric('만료', f"{stats['만료']:,}")
+
+    st.subheader('통화별 현황')
+    st.dataframe(monitor.currency_frame(), hide_index=True)
+
+    st.subheader('최근 목표가 도달')
+    hits_df = monitor.hits_frame()
+    if hits_df.empty:
+        st.warning('아직 목표가에 도달한 거래가 없습니다.')
+    else:
+        st.dataframe(hits_df.head(200), hide_index=True)
+
+    with st.expander('만료가 가까운 대기 중 거래'):
+        st.dataframe(monitor.open_frame(limit=200), hide_index=True)
+
+
+if __name__ == '__main__':
+    main()
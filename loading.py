@@ -0,0 +1,401 @@
+"""환율/거래 데이터 로드와 정규화 (Streamlit 없이 배치 작업에서도 사용)"""
+import contextlib
+import hashlib
+import importlib.util
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from match_kernel import resolve_kernel
+from matching import filter_currencies, normalize_trades
+from rate_store import RateStore
+
+try:
+    import orjson  # 설치되어 있으면 더 빠른 JSON 디코더 사용
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Feather 캐시는 pyarrow 가 있을 때만 사용
+_HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+# 정규화 컬럼이 바뀌면 올려서 기존 캐시를 무효화
+_CACHE_VERSION = 3
+
+
+class _ColumnBuffer:
+    """미리 할당해 두고 가득 차면 두 배로 늘리는 타입 있는 컬럼 버퍼"""
+
+    def __init__(self, capacity=1024):
+        self.values = None
+        self.size = 0
+        self.capacity = capacity
+
+    def append(self, values, offset):
+        """offset 행부터 values 를 기록 (앞선 청크에 없던 키라 비어 있던 행은 결측값)"""
+        dtype = values.dtype if self.values is None else _common_dtype(self.values.dtype, values.dtype)
+        if offset > self.size:
+            dtype = _common_dtype(dtype, np.dtype('float64'))
+        needed = offset + len(values)
+        if self.values is None or needed > len(self.values) or dtype != self.values.dtype:
+            grown = np.empty(max(needed, 2 * self.size, self.capacity), dtype=dtype)
+            if self.size:
+                grown[:self.size] = self.values[:self.size]
+            self.values = grown
+        if offset > self.size:
+            self.values[self.size:offset] = np.nan
+        self.values[offset:needed] = values
+        self.size = needed
+
+    def to_array(self, size):
+        if self.size < size:
+            self.append(np.empty(0, dtype=self.values.dtype), size)
+        return self.values[:size]
+
+
+def _common_dtype(left, right):
+    # pd.concat 과 같은 규칙: 숫자끼리는 상위 타입, 그 외 섞이면 object
+    if left == right:
+        return left
+    if left.kind in 'iuf' and right.kind in 'iuf':
+        return np.result_type(left, right)
+    return np.dtype(object)
+
+
+def _split_snapshot_line(line):
+    """'createdAt,"{"result": [...]}"' 한 줄을 (createdAt, JSON 문자열) 로 분리"""
+    created_at, _, json_str = line.rstrip('\r\n').partition(',')
+    # 앞/뒤 따옴표 제거
+    json_str = json_str.replace('"{"result":', '{"result":')
+    if json_str.endswith('}]}"'):
+        json_str = json_str[:-1]
+    return created_at, json_str
+
+
+def _decode_snapshots(json_strs):
+    """청크의 JSON 을 한 번에 디코딩하고, 실패하면 줄 단위로 다시 시도 (실패한 줄은 None)"""
+    try:
+        return list(_json_loads('[' + ','.join(json_strs) + ']'))
+    except ValueError:
+        pass
+    decoded = []
+    for json_str in json_strs:
+        try:
+            decoded.append(json.loads(json_str))
+        except ValueError:
+            decoded.append(None)
+    return decoded
+
+
+def _open_text(path_or_buffer):
+    # 경로면 파일을 열고, 이미 열린 버퍼면 그대로 사용
+    if isinstance(path_or_buffer, (str, os.PathLike)):
+        return open(path_or_buffer, encoding='utf-8')
+    return contextlib.nullcontext(path_or_buffer)
+
+
+def load_snapshot_data(path, chunk_size=10000):
+    """매매기준율 스냅샷 파일(createdAt, {"result": [...]})을 청크 단위로 읽어 final_df 를 만드는 함수
+
+    청크마다 JSON 을 일괄 디코딩하고 createdAt 을 한 번에 변환해 타입 있는 컬럼 버퍼에 이어 붙이므로
+    중간 메모리는 청크 크기에 비례한다. 컬럼 순서는 스냅샷별 DataFrame 을 pd.concat 하던 기존 방식과 같다.
+    """
+    columns = {}  # 키 -> 컬럼 버퍼
+    order = {}    # 최종 컬럼 순서 (dict 로 삽입 순서 유지)
+    size = 0
+    with _open_text(path) as f:
+        next(f, None)  # 헤더
+        while True:
+            lines = [line for line in itertools.islice(f, chunk_size) if line.strip()]
+            if not lines:
+                break
+            created, json_strs = zip(*map(_split_snapshot_line, lines))
+
+            records, record_created, results = [], [], []
+            for created_str, data in zip(created, _decode_snapshots(json_strs)):
+                result = data.get('result') if isinstance(data, dict) else None
+                if not isinstance(result, list) or not all(isinstance(r, dict) for r in result):
+                    continue
+                results.append(result)
+                records.extend(result)
+                record_created.extend([created_str] * len(result))
+            if not records:
+                continue
+
+            # 청크 단위로 컬럼 타입 추론, createdAt 은 청크당 한 번만 변환
+            chunk_df = pd.DataFrame.from_records(records)
+            if 'createdAt' not in order or any(key not in order for key in chunk_df.columns):
+                _extend_column_order(order, results)
+            chunk_df['createdAt'] = pd.to_datetime(pd.Series(record_created), format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
+            for key in chunk_df.columns:
+                columns.setdefault(key, _ColumnBuffer()).append(chunk_df[key].to_numpy(), size)
+            size += len(records)
+
+    final_df = pd.DataFrame({key: columns[key].to_array(size) for key in order if key in columns})
+    return final_df
+
+
+def _extend_column_order(order, results):
+    """스냅샷마다 (처음 등장한 키..., createdAt) 를 처음 등장한 순서로 합친 pd.concat 의 컬럼 순서를 order 에 반영
+
+    새 키가 나온 청크에서만 호출하므로 대부분의 청크는 키를 다시 훑지 않는다.
+    """
+    for result in results:
+        for record in result:
+            for key in record:
+                order.setdefault(key, None)
+        order.setdefault('createdAt', None)
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_cached(path, loader):
+    """CSV 옆에 정규화된 컬럼형 캐시(Feather)를 두고 원본이 바뀌었을 때만 다시 만드는 함수
+
+    크기와 수정 시각이 같으면 캐시를 바로 읽고, 다르면 해시를 비교해 내용이 같을 때는 캐시를 재사용한다.
+    append_cache 로 덧붙인 segment 파일이 있으면 기본 파일 뒤에 이어 붙여 반환한다.
+    pyarrow 가 없거나 캐시를 쓸 수 없으면 loader(path) 결과를 그대로 반환한다.
+    """
+    if not _HAS_PYARROW:
+        return loader(path)
+    cache_path = path + '.feather'
+    meta_path = cache_path + '.json'
+    fingerprint = file_fingerprint(path)
+    meta = _read_meta(meta_path)
+
+    # 캐시 형식(정규화 컬럼)이 바뀌었으면 원본이 같아도 다시 만듦
+    if os.path.exists(cache_path) and meta.get('version') == _CACHE_VERSION:
+        if all(meta.get(key) == value for key, value in fingerprint.items()):
+            return _read_cache_files(cache_path, meta)
+        fingerprint['sha256'] = _file_hash(path)
+        if meta.get('sha256') == fingerprint['sha256']:
+            # 내용은 같고 수정 시각만 바뀐 경우
+            _write_meta(meta_path, dict(meta, **fingerprint))
+            return _read_cache_files(cache_path, meta)
+
+    df = loader(path)
+    fingerprint.setdefault('sha256', _file_hash(path))
+    write_cache(path, df, fingerprint)
+    return df
+
+
+def write_cache(path, df, fingerprint):
+    """정규화된 프레임을 path 의 컬럼형 캐시로 저장 (실패해도 무시)
+
+    fingerprint 에 sha256 이 없으면 크기/수정 시각이 같을 때만 캐시가 재사용된다.
+    이전에 덧붙인 segment 파일은 지운다.
+    """
+    if not _HAS_PYARROW:
+        return
+    cache_path = path + '.feather'
+    meta_path = cache_path + '.json'
+    old_segments = _read_meta(meta_path).get('segments', [])
+    try:
+        _write_feather(df, cache_path)
+        _write_meta(meta_path, dict(fingerprint, rows=len(df), segments=[]))
+    except (OSError, ValueError):
+        return
+    _remove_segments(cache_path, old_segments)
+
+
+def append_cache(path, new_rows, previous, fingerprint):
+    """원본 끝에 추가된 행만 컬럼형 캐시에 segment 파일로 덧붙이는 함수 (기존 캐시를 다시 쓰지 않음)
+
+    previous 는 캐시에 기록된 원본의 크기/수정 시각, fingerprint 는 new_rows 까지 읽은 원본의 크기/수정 시각.
+    캐시가 previous 상태가 아니면 False 를 반환하고, 호출한 쪽이 write_cache 로 전체를 저장한다.
+    새 segment 보다 작거나 같은 뒤쪽 segment 는 합치고 (segment 수는 O(log n)), segment 행 수가
+    기본 파일보다 많아지면 기본 파일로 합치므로 행마다 다시 쓰는 횟수는 상각 O(log n) 이다.
+    """
+    if not _HAS_PYARROW:
+        return False
+    cache_path = path + '.feather'
+    meta_path = cache_path + '.json'
+    meta = _read_meta(meta_path)
+    if (meta.get('version') != _CACHE_VERSION or 'rows' not in meta or not os.path.exists(cache_path)
+            or any(meta.get(key) != value for key, value in previous.items())):
+        return False
+    if not len(new_rows):
+        return True
+
+    segments = [tuple(segment) for segment in meta['segments']]
+    merged, rows = [], len(new_rows)
+    while segments and segments[-1][1] <= rows:
+        merged.insert(0, segments.pop())
+        rows += merged[0][1]
+    try:
+        if rows + sum(segment_rows for _, segment_rows in segments) > meta['rows']:
+            # segment 가 기본 파일보다 커지면 전체를 기본 파일 하나로 합침
+            write_cache(path, concat_frames([_read_cache_files(cache_path, meta), new_rows]), fingerprint)
+            return True
+        suffix = f".{meta.get('next_segment', 1)}"
+        frames = [pd.read_feather(cache_path + merged_suffix) for merged_suffix, _ in merged] + [new_rows]
+        _write_feather(concat_frames(frames), cache_path + suffix)
+        _write_meta(meta_path, dict(fingerprint, rows=meta['rows'], segments=segments + [(suffix, rows)],
+                                    next_segment=meta.get('next_segment', 1) + 1))
+    except (OSError, ValueError):
+        return False
+    _remove_segments(cache_path, merged)
+    return True
+
+
+def concat_frames(frames):
+    """프레임들을 이어 붙이고, 첫 프레임에서 category 였던 컬럼은 새 값까지 포함한 category 로 유지"""
+    combined = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype) and not isinstance(combined[column].dtype, pd.CategoricalDtype):
+            combined[column] = combined[column].astype('category')
+    return combined
+
+
+def _read_cache_files(cache_path, meta):
+    # 기본 파일 + segment 파일을 순서대로 이어 붙임
+    frames = [pd.read_feather(path) for path in _cache_files(cache_path, meta)]
+    return frames[0] if len(frames) == 1 else concat_frames(frames)
+
+
+def _cache_files(cache_path, meta):
+    return [cache_path] + [cache_path + suffix for suffix, _ in meta.get('segments', [])]
+
+
+def _write_feather(df, cache_path):
+    tmp_path = cache_path + '.tmp'
+    df.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+def _remove_segments(cache_path, segments):
+    for suffix, _ in segments:
+        with contextlib.suppress(OSError):
+            os.remove(cache_path + suffix)
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta_path, fingerprint):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(fingerprint, version=_CACHE_VERSION), f)
+    os.replace(tmp_path, meta_path)
+
+
+def read_trade_csv(path):
+    # 거래 데이터 로드 및 정규화 (통화 코드는 category, 가격/수량은 float)
+    return _normalize_trade(pd.read_csv(path))
+
+
+def _normalize_trade(trade_df):
+    trade_df['executedAt'] = pd.to_datetime(trade_df['executedAt'], format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
+    trade_df['currencyCode'] = trade_df['currencyCode'].astype('category')
+    trade_df['currencyCode0'] = trade_df['currencyCode0'].astype('category')
+    trade_df[['amount', 'price']] = trade_df[['amount', 'price']].astype('float64')
+    # 실제 환전 통화, 매수/매도, JPY 수량 환산을 로드 시 한 번만 계산
+    return normalize_trades(trade_df)
+
+
+def read_final_csv(path):
+    # 환율 데이터 로드 및 정규화 (통화 코드는 category, 기준율은 float)
+    return _normalize_final(pd.read_csv(path))
+
+
+def _normalize_final(final_df):
+    final_df['createdAt'] = pd.to_datetime(final_df['createdAt'], format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9) # UTC -> KST
+    final_df['currencyCode'] = final_df['currencyCode'].astype('category')
+    final_df['basePrice'] = final_df['basePrice'].astype('float64')
+    return final_df
+
+
+def fresh_cache_paths(path):
+    """원본과 크기/수정 시각이 같은 컬럼형 캐시가 있으면 (기본 파일, segment 파일...) 경로 목록, 없으면 None"""
+    if not _HAS_PYARROW:
+        return None
+    cache_path = path + '.feather'
+    meta = _read_meta(cache_path + '.json')
+    fingerprint = file_fingerprint(path)
+    if (meta.get('version') == _CACHE_VERSION and os.path.exists(cache_path)
+            and all(meta.get(key) == value for key, value in fingerprint.items())):
+        return _cache_files(cache_path, meta)
+    return None
+
+
+def iter_final_chunks(path, chunk_rows=500_000, cache=True):
+    """final.csv 형식 환율 데이터를 chunk_rows 행 단위 DataFrame 으로 차례로 읽는 함수
+
+    최신 컬럼형 캐시가 있으면 Feather(Arrow IPC) 의 레코드 배치를 이어 붙여 읽고, 없으면 CSV 를 청크로 읽는다.
+    segment 파일마다 category 사전이 다르므로 파일 경계에서는 청크를 먼저 내보낸다.
+    전체 파일을 메모리에 올리지 않는다.
+    """
+    cache_paths = fresh_cache_paths(path) if cache else None
+    if cache_paths is None:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield _normalize_final(chunk)
+        return
+
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    for cache_path in cache_paths:
+        with pa.memory_map(cache_path) as source:
+            reader = pa.ipc.open_file(source)
+            batches, rows = [], 0
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows >= chunk_rows:
+                    yield pa.Table.from_batches(batches).to_pandas()
+                    batches, rows = [], 0
+            if batches:
+                yield pa.Table.from_batches(batches).to_pandas()
+
+
+def read_rate_store(path, cache=True):
+    """환율 CSV 를 통화별 정렬 배열 저장소로 로드 (원본 DataFrame 은 버림)"""
+    final_df = read_cached(path, read_final_csv) if cache else read_final_csv(path)
+    store = RateStore.from_frame(final_df)
+    store.frame_nbytes = int(final_df.memory_usage(deep=True).sum())
+    prepare_bars(store)
+    return store
+
+
+def prepare_bars(store):
+    """numba 매칭 커널을 쓸 때만 1일/1시간 봉을 로드 시점에 미리 만들어 둠 (NumPy 커널은 봉을 쓰지 않음)"""
+    if resolve_kernel() == 'numba':
+        store.bar_index()
+    return store
+
+
+def read_yh_csv(path):
+    # 야후 OHLC 데이터 로드
+    final_df = pd.read_csv(path)
+    final_df['Date'] = pd.to_datetime(final_df['Date'], format='%Y-%m-%d') + pd.Timedelta(hours=9) # UTC -> KST
+    return final_df
+
+
+def set_yh_close_time(final_df):
+    """야후 일봉 Date 의 시간 부분을 15:59:59 로 맞춤 (분석 페이지와 차트 시계열이 같이 사용)"""
+    final_df['Date'] = pd.to_datetime(final_df['Date']).dt.floor('D') + pd.Timedelta(hours=15, minutes=59, seconds=59)
+    return final_df
+
+
+def filter_trade_data(trade_df, selected_currencies):
+    """주어진 통화에 따라 거래 데이터를 필터링하는 함수"""
+    return filter_currencies(trade_df, selected_currencies)
@@ -0,0 +1,213 @@
+"""통화 하나의 시간순 틱과 거래로 거래별 구간 [lo, hi), 구간 최유리가, 매칭 횟수, 첫 도달 틱을 구하는 매칭 커널
+
+Numba 가 설치돼 있으면 거래를 시간순으로 놓고 구간 시작/끝 포인터를 앞으로만 옮기며 한 번에 훑는 컴파일 커널을,
+없으면 searchsorted + 구간 최저/최고가 인덱스로 도달 여부와 첫 도달 틱을 찾고, 도달한 거래만 첫 도달 틱부터
+구간 끝까지 매칭 횟수를 세는 NumPy 구현을 쓴다.
+두 구현의 결과는 같고, 환경 변수 FX_MATCH_KERNEL=numpy|numba 로 고를 수 있다.
+
+두 포인터 커널은 다중 해상도 봉 (bars.CurrencyBars) 을 받으면 구간 안에 통째로 들어가는 봉을 최저/최고가로
+판정해 (봉 전체 도달 / 전체 미도달) 한 번에 건너뛰고, 목표가가 봉 안에 걸친 곳만 원본 틱을 비교한다.
+NumPy 커널은 도달한 거래의 구간을 연속 메모리로 한 번에 비교하는 편이 봉 단위로 펼치는 것보다 빨라 봉을 쓰지 않는다.
+
+    kernel = resolve_kernel()   # 'numba' 또는 'numpy'
+    lo, hi, best, match_count, first_hit = sweep_matches(ticks, trade_dates, targets, is_buy, date_window, kernel,
+                                                         index, bars)
+"""
+import functools
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from bars import CurrencyBars
+
+logger = logging.getLogger(__name__)
+
+KERNELS = ('numba', 'numpy')
+_NO_BARS = CurrencyBars(np.empty(0, dtype='datetime64[ns]'), np.empty(0), resolutions=())  # 봉 없이 틱만 비교
+
+
+def two_pointer_sweep(created_at, prices, trade_dates, order, window, targets, is_buy,
+                      lo, hi, best, match_count, first_hit,
+                      bar_starts, bar_ends, bar_low, bar_high, bar_valid, bar_first, level_offsets, touched):
+    # Numba 로 컴파일되는 본문 (시각은 int64 ns, order 는 거래를 시간순으로 놓은 위치)
+    # bar_* 는 CurrencyBars.kernel_arrays() (봉이 없으면 빈 배열, level_offsets = [0]),
+    # touched 에는 [판정한 봉 수, 비교한 틱 수] 를 더한다.
+    n_ticks = len(created_at)
+    n_levels = len(level_offsets) - 1
+    base = level_offsets[:-1].copy()   # 해상도별로 구간 시작 이후 첫 봉 (거래 시각순이라 앞으로만 움직임)
+    cursor = level_offsets[:-1].copy()
+    bars_touched = 0
+    ticks_touched = 0
+    start = 0
+    end = 0
+    for r in range(len(order)):
+        k = order[r]
+        t = trade_dates[k]
+        # [t, t + window] 의 시작/끝은 거래 시각이 늘어날수록 뒤로만 움직임
+        while start < n_ticks and created_at[start] < t:
+            start += 1
+        if end < start:
+            end = start
+        while end < n_ticks and created_at[end] <= t + window:
+            end += 1
+        lo[k] = start
+        hi[k] = end
+        for level in range(n_levels):
+            while base[level] < level_offsets[level + 1] and bar_starts[base[level]] < start:
+                base[level] += 1
+            cursor[level] = base[level]
+
+        target = targets[k]
+        buy = is_buy[k]
+        extreme = np.nan
+        count = 0
+        first = -1
+        i = start
+        next_check = start if n_levels > 0 else end  # 다음으로 봉이 시작할 수 있는 틱 (가장 작은 봉의 경계)
+        while i < end:
+            if i >= next_check:
+                # i 에서 시작해 구간 안에 통째로 들어가는 가장 큰 봉이 전체 도달/전체 미도달이면 건너뜀
+                skipped = False
+                for level in range(n_levels):
+                    stop = level_offsets[level + 1]
+                    b = cursor[level]
+                    if b < stop and bar_starts[b] < i:
+                        # 큰 봉을 건너뛰었으면 작은 봉 커서는 이분 탐색으로 따라감
+                        b += 1
+                        if b < stop and bar_starts[b] < i:
+                            b += np.searchsorted(bar_starts[b:stop], i)
+                        cursor[level] = b
+                    if b == stop or bar_starts[b] != i or bar_ends[b] > end:
+                        continue
+                    bars_touched += 1
+                    if buy:
+                        bar_best = bar_low[b]
+                        all_hit = bar_high[b] <= target
+                        no_hit = not bar_low[b] <= target
+                    else:
+                        bar_best = bar_high[b]
+                        all_hit = bar_low[b] >= target
+                        no_hit = not bar_high[b] >= target
+                    if not (all_hit or no_hit):
+                        continue  # 목표가가 봉 최저/최고가 사이 -> 더 작은 봉으로
+                    if bar_best == bar_best and (extreme != extreme or (bar_best < extreme if buy else bar_best > extreme)):
+                        extreme = bar_best
+                    if all_hit:
+                        if first < 0:
+                            first = bar_first[b]
+                        count += bar_valid[b]
+                    i = bar_ends[b]
+                    skipped = True
+                    break
+                if skipped:
+                    continue
+                # 건너뛰지 못했으면 가장 작은 봉의 다음 경계까지는 틱을 비교
+                b = cursor[n_levels - 1]
+                if b == level_offsets[n_levels]:
+                    next_check = end
+                elif bar_starts[b] == i:
+                    next_check = bar_ends[b]
+                else:
+                    next_check = bar_starts[b]
+
+            ticks_touched += 1
+            price = prices[i]
+            i += 1
+            if price != price:  # NaN 은 건너뜀 (sparse table 의 fmin/fmax 와 같음)
+                continue
+            if buy:
+                if extreme != extreme or price < extreme:
+                    extreme = price
+                hit = price <= target
+            else:
+                if extreme != extreme or price > extreme:
+                    extreme = price
+                hit = price >= target
+            if hit:
+                if first < 0:
+                    first = i - 1
+                count += 1
+        best[k] = extreme
+        match_count[k] = count
+        first_hit[k] = first
+    touched[0] += bars_touched
+    touched[1] += ticks_touched
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_sweep():
+    """Numba 로 컴파일한 커널 (설치돼 있지 않으면 None, 첫 호출 때 한 번만 import)"""
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(cache=True, nogil=True)(two_pointer_sweep)
+
+
+def numba_available():
+    return _numba_sweep() is not None
+
+
+def resolve_kernel(kernel=None):
+    """사용할 커널 이름: 인자 -> FX_MATCH_KERNEL -> Numba 설치 여부 순으로 결정
+
+    numba 를 골랐는데 설치돼 있지 않으면 numpy 로 대신 실행한다.
+    """
+    kernel = kernel or os.environ.get('FX_MATCH_KERNEL') or ('numba' if numba_available() else 'numpy')
+    if kernel not in KERNELS:
+        raise ValueError(f'알 수 없는 매칭 커널: {kernel} (가능한 값: {", ".join(KERNELS)})')
+    if kernel == 'numba' and not numba_available():
+        logger.warning('numba 가 설치되어 있지 않아 numpy 매칭 커널을 사용합니다')
+        return 'numpy'
+    return kernel
+
+
+def sweep_matches(ticks, trade_dates, targets, is_buy, date_window, kernel='numpy', index=None, bars=None, sweep=None):
+    """한 통화의 거래별 (lo, hi, best, match_count, first_hit)
+
+    ticks 는 CurrencyTicks, trade_dates 는 datetime64[ns], index 는 numpy 커널이 쓰는 CurrencyWindowIndex,
+    bars 는 두 포인터 커널이 봉 단위로 건너뛸 때 쓰는 CurrencyBars (없으면 구간 틱을 모두 비교).
+    best 는 구간 안 가장 유리한 가격 (매수 최저 / 매도 최고, 틱이 없으면 NaN),
+    first_hit 은 처음 목표가에 도달한 틱의 ticks 내 인덱스 (미도달은 -1).
+    sweep 에 two_pointer_sweep 같은 함수를 주면 kernel 대신 그 함수로 두 포인터 스윕을 실행한다 (검증용).
+    """
+    n = len(trade_dates)
+    lo = np.zeros(n, dtype=np.intp)
+    hi = np.zeros(n, dtype=np.intp)
+    best = np.full(n, np.nan)
+    match_count = np.zeros(n, dtype='int64')
+    first_hit = np.full(n, -1, dtype=np.intp)
+    if n == 0:
+        return lo, hi, best, match_count, first_hit
+
+    if sweep is None and kernel == 'numba':
+        sweep = _numba_sweep()
+    if sweep is not None:
+        order = np.argsort(trade_dates, kind='stable')
+        window = pd.Timedelta(days=date_window).value
+        touched = np.zeros(2, dtype='int64')
+        sweep(ticks.created_at.view('int64'), ticks.prices.astype('float64', copy=False), trade_dates.view('int64'),
+              order, window, np.asarray(targets, dtype='float64'), np.asarray(is_buy, dtype=bool),
+              lo, hi, best, match_count, first_hit, *(bars if bars is not None else _NO_BARS).kernel_arrays(), touched)
+        if bars is not None:
+            bars.bars_touched += int(touched[0])
+            bars.ticks_touched += int(touched[1])
+        return lo, hi, best, match_count, first_hit
+
+    window = pd.Timedelta(days=date_window).to_timedelta64()
+    lo[:] = np.searchsorted(ticks.created_at, trade_dates, side='left')
+    hi[:] = np.searchsorted(ticks.created_at, trade_dates + window, side='right')
+
+    # 구간 최솟값(매수) / 최댓값(매도)으로 도달 여부를 먼저 판정
+    best[:] = index.best(lo, hi, is_buy)
+    found = np.flatnonzero(np.where(is_buy, best <= targets, best >= targets))
+
+    # 첫 도달 틱은 sparse table 로 O(log n) 에 찾고, 매칭 횟수는 첫 도달 틱부터 구간 끝까지만 셈
+    first_hit[found] = index.first_hit(lo[found], hi[found], targets[found], is_buy[found])
+    for k in found:
+        window_prices = ticks.prices[first_hit[k]:hi[k]]
+        hits = window_prices <= targets[k] if is_buy[k] else window_prices >= targets[k]
+        match_count[k] = np.count_nonzero(hits)
+    return lo, hi, best, match_count, first_hit
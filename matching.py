@@ -0,0 +1,593 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from match_kernel import resolve_kernel, sweep_matches
+from rate_store import RateStore, as_rate_store
+from window_index import WindowIndex
+
+
+def _to_datetime64(values):
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+
+
+def effective_currency(trade_df):
+    """원화 거래는 상대 통화(currencyCode0)를, 외화 거래는 currencyCode 를 반환"""
+    code = trade_df['currencyCode'].to_numpy(dtype=object)
+    code0 = trade_df['currencyCode0'].to_numpy(dtype=object)
+    return np.where(code == 'KRW', code0, code)
+
+
+def normalize_trades(trade_df):
+    """거래 데이터 로드 시 한 번만 계산해 두는 컬럼을 추가하는 함수
+
+    effectiveCurrency: 실제 환전 통화 (category), orderType: 매수/매도 (category),
+    normalizedAmount: JPY 는 100엔 단위로 환산한 수량
+    """
+    currency = effective_currency(trade_df)
+    is_buy = trade_df['isBuyOrder'].to_numpy() == 1
+    amount = trade_df['amount'].to_numpy(dtype='float64')
+    trade_df['effectiveCurrency'] = pd.Categorical(currency)
+    trade_df['orderType'] = pd.Categorical(np.where(is_buy, '매수', '매도'), categories=['매수', '매도'])
+    trade_df['normalizedAmount'] = np.where(currency == 'JPY', amount // 100, amount)
+    return trade_df
+
+
+def trade_columns(trade_df):
+    """매칭에 쓰는 거래 컬럼 (통화, 매수 여부, 가격, 수량, 주문 구분)
+
+    normalize_trades 로 미리 계산된 컬럼이 있으면 그대로 쓰고, 없으면 여기서 계산한다.
+    """
+    if 'effectiveCurrency' not in trade_df:
+        trade_df = normalize_trades(trade_df.copy())
+    currency = trade_df['effectiveCurrency'].to_numpy(dtype=object)
+    is_buy = trade_df['orderType'].to_numpy(dtype=object) == '매수'
+    price = trade_df['price'].to_numpy(dtype='float64')
+    amount = trade_df['normalizedAmount'].to_numpy(dtype='float64')
+    order_type = trade_df['orderType'].to_numpy(dtype=object)
+    return currency, is_buy, price, amount, order_type
+
+
+def filter_currencies(trade_df, selected_currencies):
+    """실제 환전 통화로 거래를 거르는 함수 (행 단위 apply 없이 한 번에)"""
+    if 'effectiveCurrency' in trade_df:
+        return trade_df[trade_df['effectiveCurrency'].isin(selected_currencies)]
+    return trade_df[np.isin(effective_currency(trade_df), list(selected_currencies))]
+
+
+def window_bounds(created_at, trade_dates, date_window):
+    """[executedAt, executedAt + date_window] 구간의 틱 인덱스 범위 [lo, hi)"""
+    window = pd.Timedelta(days=date_window).to_timedelta64()
+    lo = np.searchsorted(created_at, trade_dates, side='left')
+    hi = np.searchsorted(created_at, trade_dates + window, side='right')
+    return lo, hi
+
+
+class _PagedRows:
+    # page(start, stop) 와 __len__ 만 있으면 되는 공통 펼치기/쓰기 (전체를 한 번에 펼치지 않음)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def iter_pages(self, page_size=100_000):
+        for start in range(0, len(self), page_size):
+            yield self.page(start, start + page_size)
+
+    def to_frame(self):
+        return self.page(0, len(self))
+
+    def to_csv(self, path, page_size=100_000, **kwargs):
+        """페이지 단위로 CSV 에 이어 쓰는 함수 (전체를 메모리에 펼치지 않음)"""
+        header = True
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for page in self.iter_pages(page_size):
+                page.to_csv(f, header=header, index=False, **kwargs)
+                header = False
+
+
+class MatchedRates(_PagedRows):
+    """매칭된 환율 데이터를 거래별 (틱 구간 [lo, hi), 목표가) 로만 들고 있다가 필요할 때 행으로 펼치는 객체
+
+    행 순서는 기존 matched_rates DataFrame 과 같다 (거래 순서 -> 틱 순서).
+    page() 로 필요한 부분만, to_frame() 으로 전체를 만든다.
+    """
+
+    # 거래별 배열 (take / concat / 디스크 저장 시 함께 다룸)
+    FIELDS = ('currency', 'lo', 'hi', 'target_price', 'is_buy', 'executed_at', 'price', 'amount', 'order_type')
+
+    def __init__(self, store, currency, lo, hi, target_price, is_buy, executed_at, price, amount, order_type, match_count):
+        # 모든 배열은 목표가에 도달한 거래만, 거래 순서
+        self.store = store
+        self.currency = currency
+        self.lo = lo
+        self.hi = hi
+        self.target_price = target_price
+        self.is_buy = is_buy
+        self.executed_at = executed_at
+        self.price = price
+        self.amount = amount
+        self.order_type = order_type
+        self.offsets = np.concatenate([[0], np.cumsum(match_count)])  # 거래별 첫 행 위치
+        self._time_order = None  # (통화, createdAt) 순 전체 행의 (거래 번호, 틱 인덱스), 처음 요청할 때 만듦
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def match_count(self):
+        return np.diff(self.offsets)
+
+    def arrays(self):
+        """저장소를 뺀 거래별 배열 (match_count 포함)"""
+        arrays = {field: getattr(self, field) for field in self.FIELDS}
+        arrays['match_count'] = self.match_count
+        return arrays
+
+    def take(self, indices):
+        """indices 순서의 거래만 남긴 MatchedRates"""
+        return MatchedRates(self.store, **{field: array[indices] for field, array in self.arrays().items()})
+
+    @classmethod
+    def concat(cls, store, parts):
+        """같은 저장소를 쓰는 MatchedRates 들을 거래 순서대로 이어 붙임"""
+        arrays = [part.arrays() for part in parts]
+        return cls(store, **{field: np.concatenate([a[field] for a in arrays]) for field in arrays[0]})
+
+    def _ticks(self, k):
+        # k 번째 거래의 매칭 틱 (정렬 배열 내 인덱스, 원본 행 순서)
+        currency_ticks = self.store[self.currency[k]]
+        window_prices = currency_ticks.prices[self.lo[k]:self.hi[k]]
+        if self.is_buy[k]:
+            hits = np.flatnonzero(window_prices <= self.target_price[k])
+        else:
+            hits = np.flatnonzero(window_prices >= self.target_price[k])
+        tick_idx = self.lo[k] + hits
+        if currency_ticks.positions is not None:
+            tick_idx = tick_idx[np.argsort(currency_ticks.positions[tick_idx], kind='stable')]
+        return currency_ticks, tick_idx
+
+    def _sorted_rows(self):
+        # 전체 행을 (통화, createdAt) 순으로 정렬한 (거래 번호, 틱 인덱스) (같은 값은 원래 행 순서, 행당 16바이트)
+        if self._time_order is None:
+            trades, ticks, times = [], [], []
+            for k in np.flatnonzero(self.match_count):
+                currency_ticks, tick_idx = self._ticks(k)
+                trades.append(np.full(len(tick_idx), k))
+                ticks.append(tick_idx)
+                times.append(currency_ticks.created_at[tick_idx].view('int64'))
+            if not trades:
+                return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+            trade_pos, tick_idx = np.concatenate(trades), np.concatenate(ticks)
+            _, currency_codes = np.unique(self.currency[trade_pos], return_inverse=True)
+            order = np.lexsort((np.concatenate(times), currency_codes))
+            self._time_order = trade_pos[order], tick_idx[order]
+        return self._time_order
+
+    def page(self, start, stop, sort_by_time=False):
+        """[start, stop) 행만 펼친 DataFrame
+
+        sort_by_time=True 면 전체 행을 (currency, createdAt) 순으로 정렬했을 때의 [start, stop) 행
+        (페이지 안에서만 정렬하지 않음, 정렬 순서는 처음 한 번만 만들어 둠).
+        """
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return pd.DataFrame([])
+        if sort_by_time:
+            trade_pos, tick_idx = (array[start:stop] for array in self._sorted_rows())
+            currency = self.currency[trade_pos]
+            codes = pd.unique(currency)
+            prices = np.empty(len(tick_idx), dtype=np.result_type(*(self.store[code].prices for code in codes)))
+            times = np.empty(len(tick_idx), dtype='datetime64[ns]')
+            for code in codes:
+                rows = currency == code
+                prices[rows] = self.store[code].prices[tick_idx[rows]]
+                times[rows] = self.store[code].created_at[tick_idx[rows]]
+            return self._frame(trade_pos, prices, times)
+        first = np.searchsorted(self.offsets, start, side='right') - 1
+        last = np.searchsorted(self.offsets, stop, side='left')
+
+        trades, prices, times = [], [], []
+        for k in range(first, last):
+            currency_ticks, tick_idx = self._ticks(k)
+            trades.append(np.full(len(tick_idx), k))
+            prices.append(currency_ticks.prices[tick_idx])
+            times.append(currency_ticks.created_at[tick_idx])
+        trade_pos = np.concatenate(trades)
+        rows = slice(start - self.offsets[first], stop - self.offsets[first])
+        return self._frame(trade_pos[rows], np.concatenate(prices)[rows], np.concatenate(times)[rows])
+
+    def _frame(self, trade_pos, prices, times):
+        # 행마다 (거래 번호, 매칭 틱의 가격/시각) 으로 matched_rates 형식 DataFrame 을 만듦
+        return pd.DataFrame({
+            'currency': self.currency[trade_pos],
+            'basePrice': prices,
+            'createdAt': times.astype(self.store.time_dtype),
+            'trade_executedAt': self.executed_at[trade_pos],
+            'trade_price': self.price[trade_pos],
+            'amount': self.amount[trade_pos],
+            'order_type': self.order_type[trade_pos],
+        })
+
+
+class MatchedBars(_PagedRows):
+    """야후 일봉 매칭 결과를 (거래 위치, 봉 위치) 쌍으로만 들고 있다가 page() 로 필요한 행만 펼치는 객체
+
+    행과 컬럼은 match_ohlc_target_prices(lazy=False) 의 matched_rates 와 같다 (MatchedRates 와 같은 사용법).
+    """
+
+    def __init__(self, ohlc_df, currency, order_type, price, executed_at, matched_trade, matched_bar):
+        self.ohlc_df = ohlc_df
+        self.currency = currency
+        self.order_type = order_type
+        self.price = price
+        self.executed_at = executed_at
+        self.matched_trade = matched_trade
+        self.matched_bar = matched_bar
+
+    def __len__(self):
+        return len(self.matched_trade)
+
+    def page(self, start, stop):
+        """[start, stop) 행만 펼친 DataFrame"""
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return pd.DataFrame([])
+        trade, bar = self.matched_trade[start:stop], self.matched_bar[start:stop]
+        return pd.DataFrame({
+            'currency': self.currency[trade],
+            'order_type': self.order_type[trade],
+            'trade_price': self.price[trade],
+            'highPrice': self.ohlc_df['high'].to_numpy(dtype='float64')[bar],
+            'LowPrice': self.ohlc_df['low'].to_numpy(dtype='float64')[bar],
+            'basePrice': self.ohlc_df['close'].to_numpy()[bar],
+            'trade_executedAt': self.executed_at[trade],
+            'createdAt': self.ohlc_df['Date'].to_numpy()[bar],
+        })
+
+
+def match_target_prices(rates, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, lazy=False, kernel=None,
+                        use_bars=True):
+    """거래별 목표가 도달 여부를 통화 단위로 일괄 계산하는 함수
+
+    rates 는 환율 DataFrame 또는 RateStore.
+    profit.analyze_target_prices 의 iterrows 루프와 같은 results, matched_rates 를 반환한다.
+    lazy=True 면 matched_rates 를 행으로 펼치지 않은 MatchedRates 로 반환한다.
+    kernel 은 'numba' / 'numpy' (없으면 match_kernel.resolve_kernel 로 결정, 결과는 같음).
+    use_bars=True 면 numba 커널이 저장소의 1일/1시간 봉 (RateStore.bar_index()) 으로 판정이 끝나는 봉을 건너뛴다.
+    거래가 없을 때 lazy=False 는 기존처럼 빈 DataFrame 두 개를, lazy=True 는 컬럼이 있는 빈 results 와
+    빈 MatchedRates 를 반환한다 (to_csv / iter_pages 를 그대로 쓸 수 있음).
+    """
+    if len(trade_df) == 0 and not lazy:
+        return pd.DataFrame([]), pd.DataFrame([])
+
+    currency, is_buy, price, amount, order_type = trade_columns(trade_df)
+    executed_at = trade_df['executedAt'].to_numpy()
+    trade_dates = _to_datetime64(trade_df['executedAt'])
+
+    # 매수/매도에 따라 target_price 계산 (price_adjustment 적용)
+    target_price = np.where(is_buy, price - buy_price_adjustment, price + sell_price_adjustment)
+
+    match_count = np.zeros(len(trade_df), dtype='int64')
+    lo_all = np.zeros(len(trade_df), dtype=np.intp)
+    hi_all = np.zeros(len(trade_df), dtype=np.intp)
+    best_price = np.full(len(trade_df), np.nan)                          # 구간 안 가장 유리한 가격 (틱이 없으면 NaN)
+    first_hit_at = np.full(len(trade_df), np.datetime64('NaT', 'ns'))   # 처음 목표가에 도달한 틱 시각
+
+    store = as_rate_store(rates)
+    kernel = resolve_kernel(kernel)
+    # numpy 커널은 구간 최저/최고가 인덱스를, numba 커널은 다중 해상도 봉을 사용
+    index = store.window_index() if kernel == 'numpy' else None
+    bars = store.bar_index() if kernel == 'numba' and use_bars else None
+    for code, currency_ticks in store.items():
+        trade_idx = np.flatnonzero(currency == code)
+        if len(trade_idx) == 0:
+            continue
+        lo, hi, best, counts, first_hit = sweep_matches(currency_ticks, trade_dates[trade_idx], target_price[trade_idx],
+                                                        is_buy[trade_idx], date_window, kernel,
+                                                        index[code] if index is not None else None,
+                                                        bars[code] if bars is not None else None)
+        lo_all[trade_idx], hi_all[trade_idx] = lo, hi
+        best_price[trade_idx] = best
+        match_count[trade_idx] = counts
+        hit = first_hit >= 0
+        first_hit_at[trade_idx[hit]] = currency_ticks.created_at[first_hit[hit]]
+
+    results = pd.DataFrame({
+        'currency': currency,
+        'order_type': order_type,
+        'original_price': price,
+        'target_price': target_price,
+        'found': match_count > 0,
+        'match_count': match_count,
+        'amount': amount,
+        'executedAt': executed_at,
+        'best_price': best_price,
+        'first_hit_at': first_hit_at.astype(store.time_dtype),
+    })
+    if len(trade_df) == 0:
+        # 빈 object 배열은 문자열 dtype 으로 추론되지 않으므로 거래가 있을 때와 같은 dtype 으로 맞춤
+        results = results.astype({'currency': 'str', 'order_type': 'str'})
+
+    found = match_count > 0
+    matched_rates = MatchedRates(store, currency[found], lo_all[found], hi_all[found], target_price[found], is_buy[found],
+                                 executed_at[found], price[found], amount[found], order_type[found], match_count[found])
+    if lazy:
+        return results, matched_rates
+    return results, matched_rates.to_frame()
+
+
+def match_ohlc_target_prices(ohlc_df, trade_df, buy_price_adjustment, sell_price_adjustment, date_window, chunk_size=100_000,
+                             index=None, lazy=False):
+    """야후 일봉(OHLC) 에서 목표가가 저가~고가 안에 들어온 봉을 거래 전체에 대해 한 번에 찾는 함수
+
+    통화별로 Date 정렬 후 searchsorted 로 거래마다 [executedAt, executedAt + date_window] 의 봉 범위를 잡고,
+    (거래, 범위 내 봉) 2차원 배열에서 low <= target <= high 를 브로드캐스팅으로 판정한다.
+    구간 최저 저가/최고 고가는 index (WindowIndex.from_ohlc(ohlc_df), 없으면 새로 만듦) 로 구한다.
+    lazy=True 면 matched_rates 를 행으로 펼치지 않은 MatchedBars 로 반환한다.
+    analysis.analyze_ohlc_target_prices 의 기존 iterrows 루프와 같은 results, matched_rates 를 반환한다.
+    """
+    if len(trade_df) == 0:
+        return pd.DataFrame([]), pd.DataFrame([])
+
+    currency, is_buy, price, _, order_type = trade_columns(trade_df)
+    executed_at = trade_df['executedAt'].to_numpy()
+    trade_dates = _to_datetime64(trade_df['executedAt'])
+    target_price = np.where(is_buy, price - buy_price_adjustment, price + sell_price_adjustment)
+    match_count = np.zeros(len(trade_df), dtype='int64')
+    best_price = np.full(len(trade_df), np.nan)                          # 구간 봉의 최저 저가(매수) / 최고 고가(매도)
+    first_hit_at = np.full(len(trade_df), np.datetime64('NaT', 'ns'))   # 처음 목표가가 저가~고가 안에 들어온 봉의 Date
+
+    codes = ohlc_df['currencyCode'].to_numpy(dtype=object)
+    dates = _to_datetime64(ohlc_df['Date'])
+    date_dtype = ohlc_df['Date'].dtype if ohlc_df['Date'].dtype.kind == 'M' else dates.dtype
+    low = ohlc_df['low'].to_numpy(dtype='float64')
+    high = ohlc_df['high'].to_numpy(dtype='float64')
+    matched_trade, matched_bar = [], []  # 매칭된 (거래 위치, 원본 봉 위치)
+    if index is None:
+        index = WindowIndex.from_ohlc(ohlc_df)
+
+    for code in pd.unique(currency):
+        trade_idx = np.flatnonzero(currency == code)
+        bars = np.flatnonzero(codes == code)
+        if len(bars) == 0:
+            continue
+        # from_ohlc 와 같은 안정 정렬이므로 bars 위치와 인덱스의 봉 위치가 같음
+        bars = bars[np.argsort(dates[bars], kind='stable')]
+        lo, hi = window_bounds(dates[bars], trade_dates[trade_idx], date_window)
+        best_price[trade_idx] = index[code].best(lo, hi, is_buy[trade_idx])
+        width = int((hi - lo).max(initial=0))
+        if width == 0:
+            continue
+        # 거래가 많아도 (거래 x 봉) 배열이 커지지 않도록 나눠서 처리
+        for start in range(0, len(trade_idx), max(chunk_size // width, 1)):
+            part = slice(start, start + max(chunk_size // width, 1))
+            offsets = lo[part, None] + np.arange(width)
+            inside = offsets < hi[part, None]
+            bar_pos = bars[np.minimum(offsets, len(bars) - 1)]
+            targets = target_price[trade_idx[part], None]
+            hit = inside & (low[bar_pos] <= targets) & (high[bar_pos] >= targets)
+            match_count[trade_idx[part]] = hit.sum(axis=1)
+            # 봉은 Date 순이므로 행마다 첫 True 가 첫 도달 봉
+            any_hit = hit.any(axis=1)
+            first_bar = bar_pos[np.arange(len(hit)), np.argmax(hit, axis=1)]
+            first_hit_at[trade_idx[part][any_hit]] = dates[first_bar[any_hit]]
+            rows, cols = np.nonzero(hit)
+            matched_trade.append(trade_idx[part][rows])
+            matched_bar.append(bar_pos[rows, cols])
+
+    results = pd.DataFrame({
+        'currency': currency,
+        'order_type': order_type,
+        'original_price': price,
+        'target_price': target_price,
+        'found': match_count > 0,
+        'match_count': match_count,
+        'executedAt': executed_at,
+        'best_price': best_price,
+        'first_hit_at': first_hit_at.astype(date_dtype),
+    })
+    # 거래 순서 -> 원본 봉 순서 (기존 루프의 행 순서)
+    matched_trade = np.concatenate(matched_trade) if matched_trade else np.empty(0, dtype=np.intp)
+    matched_bar = np.concatenate(matched_bar) if matched_bar else np.empty(0, dtype=np.intp)
+    order = np.lexsort((matched_bar, matched_trade))
+    matched_rates = MatchedBars(ohlc_df, currency, order_type, price, executed_at, matched_trade[order], matched_bar[order])
+    if lazy:
+        return results, matched_rates
+    return results, matched_rates.to_frame()
+
+
+def best_prices(rates, trade_df, date_windows):
+    """거래별로 각 date_window 구간 안에서 도달한 가장 유리한 가격 (매수는 최저가, 매도는 최고가)
+
+    반환값은 (거래 수, len(date_windows)) 배열이며 구간에 틱이 없으면 NaN.
+    """
+    date_windows = np.asarray(date_windows)
+    windows = np.unique(date_windows)
+    best = np.full((len(trade_df), len(windows)), np.nan)
+    if len(trade_df) == 0 or len(windows) == 0:
+        return best[:, np.searchsorted(windows, date_windows)]
+
+    currency, is_buy, _, _, _ = trade_columns(trade_df)
+    trade_dates = _to_datetime64(trade_df['executedAt'])
+
+    store = as_rate_store(rates)
+    index = store.window_index()
+    for code, currency_ticks in store.items():
+        trade_idx = np.flatnonzero(currency == code)
+        if len(trade_idx) == 0:
+            continue
+        dates = trade_dates[trade_idx]
+        buy = is_buy[trade_idx]
+        for w, date_window in enumerate(windows):
+            # 구간마다 sparse table 로 O(1) 질의
+            lo, hi = window_bounds(currency_ticks.created_at, dates, date_window)
+            best[trade_idx, w] = index[code].best(lo, hi, buy)
+    return best[:, np.searchsorted(windows, date_windows)]
+
+
+def sweep_frames(rates, trade_df, start_date, end_date, max_window):
+    """시뮬레이션 대상 환율/거래 데이터 (날짜 필터링 + 거래 중복 제거)
+
+    중복 제거 키(통화, 시간, 금액)는 조합과 무관하므로 한 번만 적용한다.
+    RateStore 는 거래별 구간 탐색이 이미 [start_date, end_date + max_window] 안으로 한정되므로 그대로 둔다.
+    """
+    if not isinstance(rates, RateStore):
+        rates = rates[(rates['createdAt'] >= start_date) &
+                      (rates['createdAt'] <= end_date + timedelta(days=max_window))]
+    trade_df = trade_df[(trade_df['executedAt'] >= start_date) &
+                        (trade_df['executedAt'] <= end_date)]
+    currency, _, _, amount, _ = trade_columns(trade_df)
+    _, first = trade_keys(currency, trade_df['executedAt'].to_numpy(), amount)
+    return rates, trade_df.iloc[first]
+
+
+def trade_keys(currency, executed_at, amount):
+    """(통화, 시간, 금액) 중복 제거 키: 처음 나온 순서대로 매긴 거래별 키 번호와 키마다 첫 거래의 위치 (오름차순)"""
+    keys = pd.DataFrame({'currency': currency, 'executedAt': executed_at, 'amount': amount})
+    codes = keys.groupby(['currency', 'executedAt', 'amount'], sort=False, dropna=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+    return codes, first
+
+
+class SweepCancelled(Exception):
+    """진행 중인 조합 시뮬레이션이 취소됨 (cancel 이벤트가 설정됨)"""
+
+
+def hit_matrix(best_price, is_buy, price, adjustments):
+    """구간 최저가/최고가로 만든 (거래 수, 조정값 수) 도달 행렬 (매수는 price - j 이하, 매도는 price + j 이상)"""
+    j = np.asarray(adjustments, dtype='float64')
+    best_price, price = best_price[:, None], price[:, None]
+    return np.where(is_buy[:, None], best_price <= price - j, best_price >= price + j)
+
+
+def profit_totals(hit, is_buy, amount, adjustments):
+    """(거래 수, 열 수) 도달 행렬을 열마다 (도달 수, 매수/매도 거래량과 수익) 으로 줄이는 함수
+
+    열은 조정값이든 date_window 든 상관없고 adjustments 는 열마다의 조정값 (스칼라면 모든 열에 같은 값).
+    반환값은 (열 수, 5) 배열: found, buy_amo, buy_pro, sell_amo, sell_pro
+    """
+    hit = np.asarray(hit, dtype=bool)
+    amount = np.where(np.isnan(amount), 0.0, amount)  # pandas sum 처럼 NaN 수량은 0
+    buy_amount = np.where(is_buy, amount, 0.0)
+    found = np.count_nonzero(hit, axis=0)
+    buy_amo, sell_amo = buy_amount @ hit, (amount - buy_amount) @ hit
+    j = np.broadcast_to(np.asarray(adjustments, dtype='float64'), found.shape)
+    return np.column_stack([found, buy_amo, buy_amo * j, sell_amo, sell_amo * j])
+
+
+def cell_totals(best_price, is_buy, price, amount, adjustments, block_size=4096):
+    """한 date_window 의 구간 최저가/최고가로 조정값별 집계 (도달 수, 매수/매도 거래량과 수익)
+
+    조정값마다 도는 대신 매수/매도로 나눈 거래를 block_size 개씩 (조정값 수, 블록) 도달 행렬로 만들어 바로 합산한다.
+    블록이 작아 중간 배열이 캐시 안에 머물고, 결과는 profit_totals(hit_matrix(...)) 와 같다.
+    반환값은 (len(adjustments), 5) 배열: found, buy_amo, buy_pro, sell_amo, sell_pro
+    """
+    j = np.asarray(adjustments, dtype='float64')
+    amount = np.where(np.isnan(amount), 0.0, amount)
+    totals = np.zeros((len(j), 5))
+    for side, column in ((is_buy, 1), (~is_buy, 3)):
+        best, target, side_amount = best_price[side], price[side], amount[side]
+        for start in range(0, len(best), block_size):
+            part = slice(start, start + block_size)
+            # 매수는 price - j 이하, 매도는 price + j 이상이면 도달 (구간에 틱이 없으면 NaN 이라 미도달)
+            if column == 1:
+                hit = best[part] <= target[part] - j[:, None]
+            else:
+                hit = best[part] >= target[part] + j[:, None]
+            totals[:, 0] += np.count_nonzero(hit, axis=1)
+            totals[:, column] += hit @ side_amount[part]
+    totals[:, 2] = totals[:, 1] * j
+    totals[:, 4] = totals[:, 3] * j
+    return totals
+
+
+class TradeProfit:
+    """거래의 중복 제거 키를 한 번만 만들어 두고 도달 행렬에서 조정값별 수익을 바로 구하는 객체
+
+    같은 (통화, 시간, 금액) 거래가 여러 개면 열마다 도달한 것 중 첫 거래만 센다
+    (calculate_profit 의 도달 거래 필터링 -> drop_duplicates 와 같음).
+
+        kernel = TradeProfit.from_results(results_df)
+        totals = kernel.totals(hit, adjustments)   # (조정값 수, 5)
+        deduped_df = kernel.unique(results_df)     # results_df.drop_duplicates(subset=['currency', 'executedAt', 'amount'])
+    """
+
+    def __init__(self, currency, executed_at, amount, is_buy):
+        self.currency = np.asarray(currency, dtype=object)
+        self.executed_at = np.asarray(executed_at)
+        self.amount = np.asarray(amount, dtype='float64')
+        self.is_buy = np.asarray(is_buy, dtype=bool)
+        codes, self.unique_positions = trade_keys(currency, executed_at, self.amount)
+        self.has_duplicates = len(self.unique_positions) < len(codes)
+        if self.has_duplicates:
+            # 키 순으로 정렬했을 때 키마다의 시작 위치와 크기 (열마다 키 안의 누적 도달 수를 구하는 데 사용)
+            self._order = np.argsort(codes, kind='stable')
+            self._sizes = np.bincount(codes)
+            self._starts = np.r_[0, np.cumsum(self._sizes)[:-1]]
+
+    @classmethod
+    def from_results(cls, results_df):
+        """match_target_prices 의 results (currency, executedAt, amount, order_type 컬럼)"""
+        return cls(results_df['currency'].to_numpy(dtype=object), results_df['executedAt'].to_numpy(),
+                   results_df['amount'].to_numpy(dtype='float64'), results_df['order_type'].to_numpy(dtype=object) == '매수')
+
+    @classmethod
+    def from_trades(cls, trade_df):
+        currency, is_buy, _, amount, _ = trade_columns(trade_df)
+        return cls(currency, trade_df['executedAt'].to_numpy(), amount, is_buy)
+
+    def __len__(self):
+        return len(self.amount)
+
+    def aligned_with(self, results_df):
+        """results_df 가 이 키를 만든 거래와 같은 거래, 같은 행 순서인지 (통화, 시간, 금액, 매수/매도 비교)"""
+        if len(results_df) != len(self):
+            return False
+        return (np.array_equal(self.currency, results_df['currency'].to_numpy(dtype=object))
+                and np.array_equal(self.executed_at, results_df['executedAt'].to_numpy(), equal_nan=True)
+                and np.array_equal(self.amount, results_df['amount'].to_numpy(dtype='float64'), equal_nan=True)
+                and np.array_equal(self.is_buy, results_df['order_type'].to_numpy(dtype=object) == '매수'))
+
+    def unique(self, df):
+        """키별 첫 행만 남긴 df (drop_duplicates 와 같은 행과 순서)"""
+        return df.iloc[self.unique_positions] if self.has_duplicates else df
+
+    def first_hits(self, hit):
+        """(거래 수, 열 수) 도달 행렬에서 열마다 키별 첫 도달 거래만 True 로 남긴 행렬"""
+        hit = np.asarray(hit, dtype=bool)
+        if not self.has_duplicates:
+            return hit
+        sorted_hit = hit[self._order]
+        count = np.cumsum(sorted_hit, axis=0)
+        before = np.repeat((count - sorted_hit)[self._starts], self._sizes, axis=0)
+        first = np.empty_like(hit)
+        first[self._order] = sorted_hit & (count - before == 1)
+        return first
+
+    def totals(self, hit, adjustments):
+        """열마다 (도달 수, 매수/매도 거래량과 수익) 을 한 번의 행렬 곱으로 구한 (열 수, 5) 배열"""
+        return profit_totals(self.first_hits(hit), self.is_buy, self.amount, adjustments)
+
+
+def profit_rows(date_windows, adjustments, totals, trade_count):
+    """(date_window, adjustment) 순서대로 profit_df 를 만드는 함수
+
+    totals 는 (len(date_windows), len(adjustments), 5) 배열 (cell_totals 참고)
+    """
+    profit_results = []
+    for i, date_window in enumerate(date_windows):
+        for a, j in enumerate(adjustments):
+            total_found, buy_amo, buy_pro, sell_amo, sell_pro = totals[i, a]
+            total_success_rate = (total_found / trade_count) * 100 if trade_count > 0 else 0
+            profit_results.append({
+                'date_window': date_window,
+                'adjustment': j,
+                'total_buy_amo': buy_amo,
+                'total_buy_pro': buy_pro,
+                'total_sell_amo': sell_amo,
+                'total_sell_pro': sell_pro,
+                'total_success_rate': np.round(total_success_rate, 2),
+            })
+    return pd.DataFrame(profit_results)
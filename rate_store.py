@@ -0,0 +1,228 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from bars import BarIndex
+from window_index import WindowIndex
+
+
+# 통화별로 정렬된 환율 틱 배열
+class CurrencyTicks:
+    def __init__(self, created_at, prices, positions=None):
+        self.created_at = created_at  # datetime64[ns] (int64), 시간순 정렬
+        self.prices = prices          # float64 / float32
+        self.positions = positions    # 원본 DataFrame 내 행 위치 (없으면 정렬 순서가 원본 순서)
+        self._buffer = None           # appended 로 만든 경우 이어 쓰는 버퍼
+
+    @property
+    def nbytes(self):
+        return self.created_at.nbytes + self.prices.nbytes + (self.positions.nbytes if self.positions is not None else 0)
+
+    def appended(self, created_at, prices):
+        """끝에 틱을 이어 붙인 새 CurrencyTicks
+
+        여유 공간을 두고 할당한 버퍼의 끝을 이 객체가 쓰고 있으면 복사 없이 이어 쓰고, 아니면 두 배로 늘린
+        버퍼로 옮긴다. 이 객체의 배열 view 는 바뀌지 않는다.
+        """
+        size = len(self.created_at)
+        needed = size + len(created_at)
+        buffer = self._buffer
+        if buffer is None or buffer.size != size or needed > len(buffer.created_at):
+            buffer = _TickBuffer(max(needed, 2 * size, 1024), self.prices.dtype)
+            buffer.created_at[:size] = self.created_at
+            buffer.prices[:size] = self.prices
+        buffer.created_at[size:needed] = created_at
+        buffer.prices[size:needed] = prices
+        buffer.size = needed
+        ticks = CurrencyTicks(buffer.created_at[:needed], buffer.prices[:needed])
+        ticks._buffer = buffer
+        return ticks
+
+
+class _TickBuffer:
+    # CurrencyTicks.appended 가 이어 쓰는 버퍼 (size: 마지막으로 이어 쓴 CurrencyTicks 의 길이)
+    def __init__(self, capacity, price_dtype):
+        self.created_at = np.empty(capacity, dtype='datetime64[ns]')
+        self.prices = np.empty(capacity, dtype=price_dtype)
+        self.size = 0
+
+
+class RateStore:
+    """통화별로 시간순 정렬된 연속 배열(int64 타임스탬프 + 가격)로 환율 틱을 보관하는 저장소
+
+    통화 코드를 행마다 문자열로 들고 있는 final_df 대신 통화당 배열 두 개만 유지하고,
+    slice() 는 복사 없이 배열 view 를 반환한다.
+    """
+
+    def __init__(self, ticks, time_dtype=np.dtype('datetime64[ns]'), frame_nbytes=None):
+        self.ticks = ticks            # {통화: CurrencyTicks}
+        self.time_dtype = time_dtype  # 원본 createdAt dtype (출력 시 복원)
+        self.frame_nbytes = frame_nbytes  # 비교용: 같은 데이터를 DataFrame 으로 들고 있을 때의 메모리
+        self._window_index = None
+        self._bar_index = None
+
+    @classmethod
+    def from_frame(cls, rate_df, price_dtype='float64', keep_positions=False):
+        """final_df (currencyCode, basePrice, createdAt) 로 저장소를 만드는 함수
+
+        float32 는 메모리를 절반으로 줄이지만 목표가와 정확히 같은 기준율의 비교 결과가 달라질 수 있다.
+        """
+        codes = rate_df['currencyCode'].to_numpy(dtype=object)
+        created_at = rate_df['createdAt'].to_numpy()
+        time_dtype = created_at.dtype if created_at.dtype.kind == 'M' else np.dtype('datetime64[ns]')
+        created_at = pd.to_datetime(created_at).to_numpy(dtype='datetime64[ns]')
+        prices = rate_df['basePrice'].to_numpy(dtype=price_dtype)
+
+        ticks = {}
+        for currency in pd.unique(codes):
+            positions = np.flatnonzero(codes == currency)
+            # 같은 시각의 틱은 원래 순서를 유지 (stable)
+            positions = positions[np.argsort(created_at[positions], kind='stable')]
+            ticks[currency] = CurrencyTicks(
+                np.ascontiguousarray(created_at[positions]),
+                np.ascontiguousarray(prices[positions]),
+                positions if keep_positions else None,
+            )
+        return cls(ticks, time_dtype)
+
+    def extended(self, rate_df):
+        """rate_df 의 틱을 통화별 배열 끝에 이어 붙인 새 저장소 (저장소의 마지막 틱보다 이른 틱이 있으면 None)
+
+        배열을 두 배씩 늘려 가며 이어 쓰므로 추가 비용은 상각 O(새 틱 수) 이고, 이 저장소의 배열과 행 위치는
+        그대로라 이 저장소로 만든 MatchedRates 를 새 저장소에서도 쓸 수 있다. 구간 인덱스와 봉은 새로 만든다.
+        """
+        if not len(rate_df):
+            return self
+        if any(ticks.positions is not None for ticks in self.ticks.values()):
+            return None
+        added = RateStore.from_frame(rate_df, price_dtype=self._price_dtype())
+        last_time = self.max_time()
+        if not pd.isna(last_time) and any(ticks.created_at[0] < last_time.to_datetime64() for ticks in added.ticks.values()):
+            return None
+        ticks = dict(self.ticks)
+        for currency, new_ticks in added.items():
+            ticks[currency] = ticks[currency].appended(new_ticks.created_at, new_ticks.prices) if currency in ticks else new_ticks
+        return RateStore(ticks, self.time_dtype, self.frame_nbytes)
+
+    def _price_dtype(self):
+        dtypes = [ticks.prices.dtype for ticks in self.ticks.values()]
+        return dtypes[0] if dtypes else np.dtype('float64')
+
+    @property
+    def currencies(self):
+        return list(self.ticks)
+
+    def items(self):
+        return self.ticks.items()
+
+    def __iter__(self):
+        return iter(self.ticks)
+
+    def __contains__(self, currency):
+        return currency in self.ticks
+
+    def __getitem__(self, currency):
+        return self.ticks[currency]
+
+    def bounds(self, currency, t0=None, t1=None):
+        """[t0, t1] 구간 (양 끝 포함) 의 인덱스 범위 [lo, hi)"""
+        created_at = self.ticks[currency].created_at
+        lo = 0 if t0 is None else np.searchsorted(created_at, np.datetime64(pd.Timestamp(t0), 'ns'), side='left')
+        hi = len(created_at) if t1 is None else np.searchsorted(created_at, np.datetime64(pd.Timestamp(t1), 'ns'), side='right')
+        return lo, hi
+
+    def slice(self, currency, t0=None, t1=None):
+        """[t0, t1] 구간의 (createdAt, basePrice) 배열 view (복사 없음)"""
+        if currency not in self.ticks:
+            return np.empty(0, dtype='datetime64[ns]'), np.empty(0)
+        lo, hi = self.bounds(currency, t0, t1)
+        ticks = self.ticks[currency]
+        return ticks.created_at[lo:hi], ticks.prices[lo:hi]
+
+    def to_frame(self, currencies=None, t0=None, t1=None):
+        """차트/표 출력용으로 선택한 통화와 구간만 final_df 형식으로 만드는 함수"""
+        frames = []
+        for currency in currencies if currencies is not None else self.currencies:
+            created_at, prices = self.slice(currency, t0, t1)
+            frames.append(pd.DataFrame({
+                'currencyCode': currency,
+                'basePrice': prices,
+                'createdAt': created_at.astype(self.time_dtype),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['currencyCode', 'basePrice', 'createdAt'])
+        return pd.concat(frames, ignore_index=True)
+
+    def window_index(self):
+        """구간 최저/최고가 인덱스 (처음 요청할 때 한 번만 생성)"""
+        if self._window_index is None:
+            self._window_index = WindowIndex.from_rate_store(self)
+        return self._window_index
+
+    def bar_index(self):
+        """다중 해상도 (1일, 1시간) 최저/최고가 봉 (처음 요청할 때 한 번만 생성)"""
+        if self._bar_index is None:
+            self._bar_index = BarIndex.from_rate_store(self)
+        return self._bar_index
+
+    def min_time(self):
+        times = [ticks.created_at[0] for ticks in self.ticks.values() if len(ticks.created_at)]
+        return pd.Timestamp(min(times)) if times else pd.NaT
+
+    def max_time(self):
+        times = [ticks.created_at[-1] for ticks in self.ticks.values() if len(ticks.created_at)]
+        return pd.Timestamp(max(times)) if times else pd.NaT
+
+    def tick_count(self):
+        """전체 틱 수 (모든 통화 합)"""
+        return sum(len(ticks.created_at) for ticks in self.ticks.values())
+
+    def memory_usage(self):
+        """통화별 메모리 (bytes): 틱 배열, 구간 인덱스와 봉 (지금까지 만든 것만)"""
+        index, bars = self._window_index, self._bar_index
+        return pd.DataFrame({
+            'ticks': {currency: ticks.nbytes for currency, ticks in self.ticks.items()},
+            'window_index': {currency: index[currency].nbytes if index is not None else 0 for currency in self.ticks},
+            'bars': {currency: bars[currency].nbytes if bars is not None else 0 for currency in self.ticks},
+        }, index=list(self.ticks), dtype='int64')
+
+    @property
+    def nbytes(self):
+        """틱 배열 + 구간 인덱스 + 봉 메모리 합 (bytes)"""
+        return int(self.memory_usage().to_numpy().sum())
+
+
+# as_rate_store 가 DataFrame 으로 만든 최근 저장소: id(DataFrame) -> (약한 참조, 열 배열 위치, 저장소)
+_frame_stores = OrderedDict()
+_frame_stores_lock = threading.Lock()
+_MAX_FRAME_STORES = 4
+
+
+def as_rate_store(rates):
+    # DataFrame 이면 원본 행 순서를 기억하는 임시 저장소로 변환
+    # 같은 DataFrame 으로 다시 부르면 만들어 둔 저장소 (와 구간 인덱스) 를 재사용 (제자리에서 값을 고치지 않는다고 가정)
+    if isinstance(rates, RateStore):
+        return rates
+    key, columns = id(rates), _column_pointers(rates)
+    with _frame_stores_lock:
+        cached = _frame_stores.get(key)
+        if cached is not None and cached[0]() is rates and cached[1] == columns:
+            _frame_stores.move_to_end(key)
+            return cached[2]
+    store = RateStore.from_frame(rates, keep_positions=True)
+    with _frame_stores_lock:
+        # DataFrame 이 사라지면 저장소도 놓아 줌
+        _frame_stores[key] = (weakref.ref(rates, lambda _: _frame_stores.pop(key, None)), columns, store)
+        _frame_stores.move_to_end(key)
+        while len(_frame_stores) > _MAX_FRAME_STORES:
+            _frame_stores.popitem(last=False)
+    return store
+
+
+def _column_pointers(rates):
+    # 열을 새 배열로 바꾸면 달라지는 (행 수, 기준율/시각 배열 주소)
+    return (len(rates),) + tuple(np.asarray(rates[column].array).__array_interface__['data'][0]
+                                 for column in ('basePrice', 'createdAt'))
@@ -0,0 +1,290 @@
+import contextlib
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from loading import file_fingerprint
+from matching import MatchedRates, match_target_prices
+
+
+def dataset_version(*paths):
+    """데이터 파일들의 (크기, 수정 시각) 으로 만든 가벼운 버전 문자열 (파일이 바뀌면 달라짐)"""
+    parts = []
+    for path in paths:
+        fingerprint = file_fingerprint(path)
+        parts.append(f"{os.path.abspath(path)}:{fingerprint['size']}:{fingerprint['mtime_ns']}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+class _Entry:
+    # 한 구간 [start, end] 의 분석 결과: results 행마다 원본 거래 index (trade_ids)
+    def __init__(self, start, end, results, trade_ids, matched_rates, complete=True):
+        self.start = start
+        self.end = end
+        self.results = results
+        self.trade_ids = trade_ids
+        self.matched_rates = matched_rates  # 목표가에 도달한 거래만 (results 의 found 순서)
+        self.complete = complete            # False 면 구간의 일부 거래만 있음 (carry_over 로 옮긴 항목)
+
+    @property
+    def nbytes(self):
+        matched = sum(array.nbytes for array in self.matched_rates.arrays().values()) if self.matched_rates is not None else 0
+        return int(self.results.memory_usage(deep=True).sum()) + self.trade_ids.nbytes + matched
+
+    def select(self, mask):
+        # results 행 mask 에 해당하는 부분 (matched_rates 는 found 행만 골라냄)
+        found = self.results['found'].to_numpy()
+        return self.results[mask], self.trade_ids[mask], self.matched_rates.take(np.flatnonzero(mask[found]))
+
+
+class ResultCache:
+    """analyze_target_prices 결과를 (데이터 버전, 분석 조건) 으로 저장하는 크기 제한 LRU 캐시
+
+    Streamlit 세션 간에 하나를 공유하고 (st.cache_resource), 넘치는 항목은 spill_dir 이 있으면
+    디스크로 내려 두었다가 다시 요청될 때 읽는다. 디스크 항목도 max_spill_entries / max_spill_bytes 를 넘으면
+    오래된 것부터 지우고, 데이터 버전이 바뀌면 이전 버전의 디스크 항목은 모두 지운다.
+    거래별 결과는 거래 자신의 체결 시각과 date_window 에만 의존하므로 같은 조건의 다른 기간 결과가 있으면
+    겹치는 거래는 재사용하고 새로 포함된 거래만 계산한다 (종료일을 하루 늘리면 그 하루의 거래만 계산).
+    데이터 끝에 행만 추가됐으면 carry_over 로 창이 닫힌 거래의 결과를 새 버전으로 옮겨 계속 재사용한다.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 2**20, spill_dir=None, max_spill_entries=256,
+                 max_spill_bytes=2**30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_entries = max_spill_entries
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()  # key -> _Entry (마지막이 가장 최근 사용)
+        self._spilled = OrderedDict()  # key -> (디스크 경로, 파일 크기) (마지막이 가장 최근에 내린 항목)
+        self._bytes = 0
+        self._spill_bytes = 0
+        self._version = None           # 가장 최근 요청의 데이터 버전
+        self._lock = threading.RLock()
+        self.hits = self.partial_hits = self.misses = self.disk_hits = 0
+        self.evictions = self.spills = self.spill_evictions = 0
+        self.reused_trades = self.computed_trades = 0
+        if spill_dir:
+            # 이전 프로세스가 남긴 파일은 색인이 없어 다시 읽을 수 없으므로 지움
+            self._clear_spill_dir()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses, 'disk_hits': self.disk_hits,
+                'evictions': self.evictions, 'spills': self.spills, 'spill_evictions': self.spill_evictions,
+                'entries': len(self._entries), 'spilled_entries': len(self._spilled), 'bytes': self._bytes,
+                'spill_bytes': self._spill_bytes,
+                'reused_trades': self.reused_trades, 'computed_trades': self.computed_trades,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._spilled):
+                self._drop_spilled(key)
+            self._entries.clear()
+            self._bytes = 0
+
+    def analyze(self, store, trade_df, start_date, end_date, buy_price_adjustment, sell_price_adjustment, date_window,
+                version, tag=()):
+        """analyze_target_prices(store, ..., lazy=True) 와 같은 (results, matched_rates) 를 캐시를 거쳐 반환
+
+        store 는 RateStore, version 은 데이터 버전 (dataset_version), tag 는 거래 필터 조건 (선택 통화 등).
+        """
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        base = (version, tuple(tag), float(buy_price_adjustment), float(sell_price_adjustment), int(date_window))
+        key = base + (start_date, end_date)
+
+        with self._lock:
+            if version != self._version:
+                # 데이터가 바뀌면 이전 버전 결과는 다시 요청될 일이 없으므로 디스크에서 지움
+                self._version = version
+                for old_key in [k for k in self._spilled if k[0] != version]:
+                    self._drop_spilled(old_key)
+            entry = self._get(key, store)
+            if entry is not None and entry.complete:
+                self.hits += 1
+                self.reused_trades += len(entry.trade_ids)
+                return self._output(entry)
+            # 거래 index 로 순서를 맞추므로 index 가 유일할 때만 부분 재사용
+            overlap = self._best_overlap(base, start_date, end_date) if trade_df.index.is_unique else None
+
+        executed_at = trade_df['executedAt']
+        in_range = ((executed_at >= start_date) & (executed_at <= end_date)).to_numpy()
+        if overlap is not None:
+            # 겹치는 기간의 거래는 재사용하고 나머지 거래만 계산
+            cached_at = overlap.results['executedAt']
+            reuse_mask = ((cached_at >= start_date) & (cached_at <= end_date)).to_numpy()
+            todo = in_range & ~trade_df.index.isin(overlap.trade_ids[reuse_mask])
+        else:
+            todo = in_range
+
+        computed = None
+        if todo.any():
+            results, matched_rates = match_target_prices(store, trade_df[todo], buy_price_adjustment, sell_price_adjustment,
+                                                         date_window, lazy=True)
+            computed = _Entry(start_date, end_date, results, trade_df.index.to_numpy()[todo], matched_rates)
+
+        if overlap is None:
+            entry = computed if computed is not None else _Entry(start_date, end_date, pd.DataFrame([]), np.empty(0, dtype='int64'), None)
+        else:
+            entry = self._merge(store, trade_df, start_date, end_date, overlap.select(reuse_mask), computed)
+
+        with self._lock:
+            if overlap is None:
+                self.misses += 1
+            else:
+                self.partial_hits += 1
+                self.reused_trades += int(reuse_mask.sum())
+            self.computed_trades += int(todo.sum())
+            self._put(key, entry)
+        return self._output(entry)
+
+    def carry_over(self, previous, version, last_time=None):
+        """previous 데이터 끝에 행만 추가된 version 으로 메모리 항목을 옮기는 함수
+
+        last_time 은 previous 의 마지막 틱 시각 (틱이 추가되지 않았으면 None). executedAt + date_window 가
+        그보다 이전인 거래는 창이 닫혀 결과가 바뀌지 않으므로 유지하고, 창이 열려 있던 (dirty) 거래는 빼 두어
+        다음 analyze 때 새로 추가된 거래와 함께 다시 계산되게 한다. 저장소는 끝에 틱만 이어 붙인 것이어야 한다.
+        """
+        with self._lock:
+            self._version = version
+            for old_key in [k for k in self._spilled if k[0] != version]:
+                self._drop_spilled(old_key)
+            for key in [k for k in self._entries if k[0] == previous]:
+                entry = self._entries.pop(key)
+                self._bytes -= entry.nbytes
+                if entry.matched_rates is None:
+                    continue
+                closed = np.ones(len(entry.results), dtype=bool)
+                if last_time is not None:
+                    window_end = entry.results['executedAt'] + pd.Timedelta(days=key[4])
+                    closed = (window_end < last_time).to_numpy()
+                results, trade_ids, matched_rates = entry.select(closed)
+                self._put((version,) + key[1:], _Entry(entry.start, entry.end, results.reset_index(drop=True), trade_ids,
+                                                       matched_rates, complete=False))
+
+    def _merge(self, store, trade_df, start_date, end_date, reused, computed):
+        # 재사용한 행과 새로 계산한 행을 원본 거래 순서로 합침
+        results, trade_ids, matched_rates = reused
+        if computed is None:
+            if len(results) == 0:
+                return _Entry(start_date, end_date, pd.DataFrame([]), trade_ids, None)
+            return _Entry(start_date, end_date, results.reset_index(drop=True), trade_ids, matched_rates)
+        if len(results) == 0:
+            return _Entry(start_date, end_date, computed.results, computed.trade_ids, computed.matched_rates)
+
+        all_results = pd.concat([results, computed.results], ignore_index=True)
+        all_ids = np.concatenate([trade_ids, computed.trade_ids])
+        order = np.argsort(trade_df.index.get_indexer(all_ids), kind='stable')
+        all_matched = MatchedRates.concat(store, [matched_rates, computed.matched_rates])
+        found = all_results['found'].to_numpy()
+        # found 행들의 새 순서 = order 중 found 인 것들의 (found 내) 순번
+        found_rank = np.cumsum(found) - 1
+        return _Entry(start_date, end_date, all_results.iloc[order].reset_index(drop=True), all_ids[order],
+                      all_matched.take(found_rank[order][found[order]]))
+
+    def _output(self, entry):
+        # 호출하는 쪽에서 열을 추가해도 캐시가 바뀌지 않도록 results 는 복사본
+        if entry.matched_rates is None:
+            return pd.DataFrame([]), pd.DataFrame([])
+        return entry.results.copy(), entry.matched_rates
+
+    def _best_overlap(self, base, start_date, end_date):
+        # 같은 조건에서 요청 구간과 가장 많이 겹치는 메모리 항목 (결과가 비어 있는 항목은 제외)
+        best_key, best_overlap = None, pd.Timedelta(0)
+        for key, entry in self._entries.items():
+            if key[:len(base)] != base or entry.matched_rates is None:
+                continue
+            overlap = min(end_date, entry.end) - max(start_date, entry.start)
+            if overlap > best_overlap:
+                best_key, best_overlap = key, overlap
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def _get(self, key, store):
+        # 디스크 항목은 저장소 없이 저장되므로 같은 데이터 버전 (key[0]) 의 store 에 다시 연결
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if key in self._spilled:
+            path = self._spilled[key][0]
+            try:
+                with open(path, 'rb') as f:
+                    spilled = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError):
+                return None
+            finally:
+                self._drop_spilled(key)
+            self.disk_hits += 1
+            entry = _Entry(spilled['start'], spilled['end'], spilled['results'], spilled['trade_ids'], None,
+                           spilled['complete'])
+            if spilled['matched'] is not None:
+                entry.matched_rates = MatchedRates(store, **spilled['matched'])
+            self._put(key, entry)
+            return entry
+        return None
+
+    def _put(self, key, entry):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        # 가장 오래 쓰지 않은 항목부터 제거 (마지막에 넣은 항목은 유지)
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._bytes -= old_entry.nbytes
+            self.evictions += 1
+            # 이전 데이터 버전의 항목은 다시 요청될 일이 없으므로 디스크로 내리지 않음
+            if self.spill_dir and old_key[0] == self._version:
+                self._spill(old_key, old_entry)
+
+    def _spill(self, key, entry):
+        # 저장소(RateStore)는 빼고 거래별 배열만 저장, 읽을 때 같은 데이터 버전의 저장소에 다시 연결
+        if key in self._spilled:
+            self._drop_spilled(key)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{key[0]}-{hashlib.sha1(repr(key).encode()).hexdigest()}.pkl")
+        matched = entry.matched_rates
+        payload = {
+            'start': entry.start, 'end': entry.end, 'results': entry.results, 'trade_ids': entry.trade_ids,
+            'complete': entry.complete,
+            'matched': matched.arrays() if matched is not None else None,
+        }
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self._spilled[key] = (path, size)
+        self._spill_bytes += size
+        self.spills += 1
+        # 디스크 항목도 개수/크기 제한을 넘으면 가장 먼저 내린 항목부터 삭제 (방금 내린 항목은 유지)
+        while len(self._spilled) > 1 and (len(self._spilled) > self.max_spill_entries
+                                          or self._spill_bytes > self.max_spill_bytes):
+            self._drop_spilled(next(iter(self._spilled)))
+            self.spill_evictions += 1
+
+    def _drop_spilled(self, key):
+        path, size = self._spilled.pop(key)
+        self._spill_bytes -= size
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+    def _clear_spill_dir(self):
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.pkl'):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.spill_dir, name))
@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from matching import SweepCancelled, cell_totals, profit_rows, sweep_frames, trade_columns, window_bounds
+from rate_store import as_rate_store
+from window_index import SparseTable
+
+# 워커 프로세스에서 공유 메모리로 붙인 배열 (initializer 에서 한 번만 설정)
+_shared_blocks = []
+_shared_arrays = {}
+
+
+def _share(array, blocks):
+    """배열을 공유 메모리 블록으로 복사하고 (이름, 모양, dtype) 명세를 반환"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return block.name, array.shape, array.dtype.str
+
+
+def _attach(specs):
+    """워커 initializer: 공유 메모리를 복사 없이 numpy 배열로 연결"""
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared_blocks.append(block)
+        _shared_arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _table(currency, side, ufunc):
+    """공유 메모리에 올린 sparse table levels 를 복사 없이 SparseTable 로 연결"""
+    levels = []
+    while (currency, side, len(levels)) in _shared_arrays:
+        levels.append(_shared_arrays[(currency, side, len(levels))])
+    return SparseTable(None, ufunc, levels=levels)
+
+
+def _run_shard(currency, date_window, adjustments):
+    """(통화, date_window) 샤드의 조정값별 집계"""
+    arrays = {field: _shared_arrays[(currency, field)] for field in
+              ('created_at', 'dates', 'is_buy', 'price', 'amount')}
+    lo, hi = window_bounds(arrays['created_at'], arrays['dates'], date_window)
+    # 구간 최저가(매수) / 최고가(매도) 는 부모가 만든 sparse table 로 O(1) 질의
+    is_buy = arrays['is_buy']
+    best_price = np.full(len(lo), np.nan)
+    for side, ufunc, mask in (('low', np.fmin, is_buy), ('high', np.fmax, ~is_buy)):
+        if mask.any():
+            best_price[mask] = _table(currency, side, ufunc).query(lo[mask], hi[mask])
+    return cell_totals(best_price, is_buy, arrays['price'], arrays['amount'], adjustments)
+
+
+def simulate_profit_parallel(filtered_df, trade_df, start_date, end_date, date_windows, adjustments, max_workers=None,
+                             on_window=None, cancel=None, swept=False):
+    """simulate_profit 과 같은 profit_df 를 (date_window, 통화) 샤드로 나눠 프로세스 풀에서 계산하는 함수
+
+    환율/거래 배열과 구간 최저/최고가 sparse table (거래가 있는 쪽만) 은 공유 메모리에 한 번만 올려
+    작업마다 다시 pickle 하거나 워커마다 다시 만들지 않는다.
+    결과는 (date_window, adjustment, 통화) 고정 순서로 합쳐 실행마다 같은 값이 나온다.
+    on_window / cancel / swept 는 simulate_profit 과 같음 (on_window 는 date_window 의 모든 통화 샤드가 끝난 순서로 호출).
+    """
+    date_windows = list(date_windows)
+    adjustments = list(adjustments)
+    max_workers = max_workers or os.cpu_count()
+    if not swept:
+        filtered_df, trade_df = sweep_frames(filtered_df, trade_df, start_date, end_date, max(date_windows, default=0))
+
+    currency, is_buy, price, amount, _ = trade_columns(trade_df)
+    trade_dates = trade_df['executedAt'].to_numpy(dtype='datetime64[ns]')
+    ticks = as_rate_store(filtered_df)
+    index = ticks.window_index()
+    currencies = sorted(code for code in ticks if (currency == code).any())
+
+    blocks = []
+    try:
+        specs = {}
+        for code in currencies:
+            mask = currency == code
+            for field, array in (('created_at', ticks[code].created_at), ('dates', trade_dates[mask]),
+                                 ('is_buy', is_buy[mask]), ('price', price[mask]), ('amount', amount[mask])):
+                specs[(code, field)] = _share(np.ascontiguousarray(array), blocks)
+            for side, needed in (('low', is_buy[mask].any()), ('high', (~is_buy[mask]).any())):
+                if needed:
+                    for k, level in enumerate(getattr(index[code], side).levels):
+                        specs[(code, side, k)] = _share(np.ascontiguousarray(level), blocks)
+
+        totals = np.zeros((len(date_windows), len(adjustments), 5))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach, initargs=(specs,)) as executor:
+            futures = {(i, code): executor.submit(_run_shard, code, date_window, adjustments)
+                       for i, date_window in enumerate(date_windows) for code in currencies}
+            remaining = {i: len(currencies) for i in range(len(date_windows))}
+            pending = set(futures.values())
+            keys = {future: key for key, future in futures.items()}
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise SweepCancelled(f'{len(date_windows) - len(remaining)}/{len(date_windows)} date_window 에서 취소됨')
+                for future in done:
+                    i, _ = keys[future]
+                    remaining[i] -= 1
+                    if remaining[i] == 0:
+                        # 완료 순서와 무관하게 고정된 통화 순서로 합산
+                        del remaining[i]
+                        for code in currencies:
+                            totals[i] += futures[(i, code)].result()
+                        if on_window is not None:
+                            on_window(i, totals[i])
+            for i in remaining:  # 거래가 있는 통화가 없으면 집계는 0
+                if on_window is not None:
+                    on_window(i, totals[i])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return profit_rows(date_windows, adjustments, totals, len(trade_df))
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# 모듈이 저장소 최상위에 평평하게 있으므로 테스트에서 바로 import 할 수 있게 경로 추가
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def sqlite_source(tmp_path):
+    """합성 환율/거래 CSV (final.csv / trade.csv 형식) 와 그 CSV 를 옮긴 SQLite SqlSource"""
+    from benchmark import generate_ticks, generate_trades, write_final_csv, write_trade_csv
+    from db import SqlSource, import_csv
+
+    final_df = generate_ticks(600)
+    rates_path, trades_path = str(tmp_path / 'final.csv'), str(tmp_path / 'trade.csv')
+    write_final_csv(final_df, rates_path)
+    write_trade_csv(generate_trades(80, final_df), trades_path)
+    source = SqlSource.sqlite(str(tmp_path / 'fx.sqlite3'), batch_size=64)
+    import_csv(source, rates_path, trades_path)
+    return source, rates_path, trades_path
+
+
+@pytest.fixture(scope='session')
+def _synthetic_frames():
+    from benchmark import generate_ticks, generate_trades
+
+    final_df = generate_ticks(3000)
+    return final_df, generate_trades(100, final_df)
+
+
+@pytest.fixture
+def final_df(_synthetic_frames):
+    """합성 환율 틱 (final.csv 형식, 3000행)"""
+    return _synthetic_frames[0].copy()
+
+
+@pytest.fixture
+def store_trades(_synthetic_frames):
+    """합성 틱으로 만든 새 RateStore 와 그 구간의 합성 거래 100건 (store, trade_df)"""
+    from rate_store import RateStore
+
+    final_df, trade_df = _synthetic_frames
+    return RateStore.from_frame(final_df.copy()), trade_df.copy()
@@ -0,0 +1,22 @@
+import pytest
+
+from analysis import calculate_profit
+from matching import TradeProfit, match_target_prices
+
+
+def test_calculate_profit_reuses_kernel_only_for_aligned_results(store_trades):
+    store, trade_df = store_trades
+    start, end = trade_df['executedAt'].min(), trade_df['executedAt'].max()
+    results_1, _ = match_target_prices(store, trade_df, 1.0, 1.0, 1, lazy=True)
+    results_2, _ = match_target_prices(store, trade_df, 2.0, 2.0, 1, lazy=True)
+
+    kernel = TradeProfit.from_results(results_1)
+    reused = calculate_profit(results_2, 2.0, start, end, 1, kernel)
+    fresh = calculate_profit(results_2, 2.0, start, end, 1)
+    assert [part[1:] for part in reused] == [part[1:] for part in fresh]
+    assert reused[0][0].equals(fresh[0][0]) and reused[1][0].equals(fresh[1][0])
+
+    with pytest.raises(ValueError):
+        calculate_profit(results_2.iloc[::-1], 2.0, start, end, 1, kernel)
+    with pytest.raises(ValueError):
+        calculate_profit(results_2.iloc[1:], 2.0, start, end, 1, kernel)
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from db import RATE_COLUMNS, TRADE_COLUMNS, load_rates, load_trades
+
+
+def _same_rows(actual, expected, columns):
+    # CSV 에만 있는 컬럼 (인덱스 등) 은 빼고 DB 테이블 컬럼 + 정규화로 추가된 컬럼을 비교, 카테고리는 값으로 비교
+    assert set(columns) <= set(actual.columns)
+    columns = [column for column in expected.columns if column in actual.columns]
+    actual = actual[columns].reset_index(drop=True)
+    expected = expected[columns].reset_index(drop=True)
+    for frame in (actual, expected):
+        for column in frame.select_dtypes('category'):
+            frame[column] = frame[column].astype(object)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('window', [{}, {'currencies': ['USD']}, {'start': '2025-02-01 10:00:00', 'end': '2025-02-01 14:00:00'}])
+def test_sql_source_round_trips_csv_loaders(sqlite_source, window):
+    source, rates_path, trades_path = sqlite_source
+    window = {key: pd.Timestamp(value) if key in ('start', 'end') else value for key, value in window.items()}
+
+    expected = load_rates(None, rates_path, cache=False, **window)
+    actual = load_rates(source, **window)
+    assert len(actual) > 0
+    _same_rows(actual, expected, [name for name, _ in RATE_COLUMNS])
+
+    expected = load_trades(None, trades_path, cache=False, **window)
+    actual = load_trades(source, **window)
+    assert len(actual) > 0
+    _same_rows(actual, expected, [name for name, _ in TRADE_COLUMNS])
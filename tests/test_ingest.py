@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+
+from benchmark import generate_ticks, generate_trades, write_final_csv, write_trade_csv
+from ingest import IncrementalAnalysis, IncrementalSource
+from loading import read_cached, read_final_csv, read_trade_csv
+from matching import match_target_prices
+from rate_store import RateStore
+from result_cache import ResultCache
+
+
+def _split_csv(full_path, path, head_rows):
+    # 헤더 + 앞 head_rows 줄만 path 에 쓰고 나머지 줄을 반환
+    with open(full_path, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:head_rows + 1])
+    return lines[head_rows + 1:]
+
+
+def _append(path, lines):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.writelines(lines)
+
+
+def test_appended_rows_recompute_only_dirty_trades(tmp_path):
+    final_df = generate_ticks(6000)
+    trade_df = generate_trades(300, final_df)
+    write_final_csv(final_df, tmp_path / 'full_final.csv')
+    write_trade_csv(trade_df, tmp_path / 'full_trade.csv')
+    rates_path, trades_path = str(tmp_path / 'final.csv'), str(tmp_path / 'trade.csv')
+    rate_tail = _split_csv(tmp_path / 'full_final.csv', rates_path, 4200)
+    trade_tail = _split_csv(tmp_path / 'full_trade.csv', trades_path, 200)
+
+    cache = ResultCache()
+    analysis = IncrementalAnalysis(IncrementalSource(rates_path, read_final_csv, 'createdAt'),
+                                   IncrementalSource(trades_path, read_trade_csv, 'executedAt'), cache)
+    start, end = trade_df['executedAt'].min(), trade_df['executedAt'].max()
+    store, trades, version = analysis.update()
+    cache.analyze(store, trades, start, end, 1.0, 1.0, 1, version)
+    base_mtime = os.stat(rates_path + '.feather').st_mtime_ns
+
+    last_time = store.max_time()
+    _append(rates_path, rate_tail)
+    _append(trades_path, trade_tail)
+    store, trades, new_version = analysis.update()
+    assert new_version != version and len(trades) == 300 and store.tick_count() == 6000
+
+    # 창이 이전 마지막 틱 시각 이후까지 열려 있던 거래 + 새 거래만 다시 계산
+    dirty = int((trades['executedAt'][:200] + pd.Timedelta(days=1) >= last_time).sum())
+    assert 0 < dirty < 200
+    computed = cache.computed_trades
+    results, matched_rates = cache.analyze(store, trades, start, end, 1.0, 1.0, 1, new_version)
+    assert cache.computed_trades - computed == dirty + 100
+
+    expected, expected_rates = match_target_prices(RateStore.from_frame(read_final_csv(tmp_path / 'full_final.csv')),
+                                                   read_trade_csv(tmp_path / 'full_trade.csv'), 1.0, 1.0, 1, lazy=True)
+    pd.testing.assert_frame_equal(results, expected)
+    pd.testing.assert_frame_equal(matched_rates.to_frame(), expected_rates.to_frame())
+
+    # 캐시는 기존 파일을 다시 쓰지 않고 segment 만 덧붙임
+    assert os.stat(rates_path + '.feather').st_mtime_ns == base_mtime
+    pd.testing.assert_frame_equal(read_cached(rates_path, read_final_csv), read_final_csv(rates_path))
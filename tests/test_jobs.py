@@ -0,0 +1,26 @@
+import os
+
+from analysis import simulate_profit
+from jobs import JobManager
+
+
+def test_finished_jobs_are_pruned_from_memory_and_disk(tmp_path, store_trades):
+    store, trade_df = store_trades
+    start, end = trade_df['executedAt'].min(), trade_df['executedAt'].max()
+    store_dir = str(tmp_path / 'jobs')
+
+    manager = JobManager(max_jobs=1, store_dir=store_dir, max_finished=2)
+    jobs = [manager.submit(store, trade_df, start, end, [1, 2], [adjustment]) for adjustment in (0.5, 1.0, 1.5)]
+    manager._executor.shutdown(wait=True)
+
+    assert all(job.status == 'done' for job in jobs)
+    expected = simulate_profit(store, trade_df, start, end, [1, 2], [1.5])
+    assert jobs[-1].profit_df().equals(expected)
+    kept = {job.job_id for job in manager.jobs()}
+    assert kept == {jobs[1].job_id, jobs[2].job_id}
+    assert sorted(os.listdir(store_dir)) == sorted(f'{job_id}.pkl' for job_id in kept)
+
+    # 다시 시작해도 남은 작업만 읽고, 제한이 줄면 오래된 작업 파일을 지움
+    restarted = JobManager(max_jobs=1, store_dir=store_dir, max_finished=1)
+    assert [job.job_id for job in restarted.jobs()] == [jobs[2].job_id]
+    assert os.listdir(store_dir) == [f'{jobs[2].job_id}.pkl']
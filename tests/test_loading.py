@@ -0,0 +1,46 @@
+import json
+
+import pandas as pd
+
+from benchmark import generate_ticks
+from loading import load_snapshot_data, read_rate_store
+
+
+def _baseline_snapshot_frame(lines):
+    # 기존 load_data 처럼 스냅샷마다 DataFrame 을 만들고 createdAt 을 붙여 pd.concat
+    frames = []
+    for created_at, result in lines:
+        frame = pd.DataFrame(result)
+        frame['createdAt'] = pd.to_datetime(created_at, format='%Y-%m-%d %H:%M:%S') + pd.Timedelta(hours=9)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_snapshot_columns_follow_baseline_order_when_keys_appear_later(tmp_path):
+    lines = [
+        ('2025-02-01 00:00:00', [{'currencyCode': 'USD', 'basePrice': 1450.0}]),
+        ('2025-02-01 00:02:00', [{'currencyCode': 'USD', 'basePrice': 1451.0},
+                                 {'currencyCode': 'JPY', 'cashBuyingPrice': 9.6, 'basePrice': 9.4}]),
+        ('2025-02-01 00:04:00', [{'currencyCode': 'USD', 'basePrice': 1452.0}]),
+        ('2025-02-01 00:06:00', [{'provider': 'bank', 'currencyCode': 'USD', 'basePrice': 1453.0}]),
+    ]
+    path = tmp_path / 'mama.csv'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('createdAt,data\n')
+        for created_at, result in lines:
+            f.write(f'{created_at},"{json.dumps({"result": result}, separators=(",", ":"))}"\n')
+
+    expected = _baseline_snapshot_frame(lines)
+    for chunk_size in (1, 2, 10):
+        actual = load_snapshot_data(str(path), chunk_size=chunk_size)
+        assert actual.columns.tolist() == ['currencyCode', 'basePrice', 'createdAt', 'cashBuyingPrice', 'provider']
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_read_rate_store_skips_bars_for_numpy_kernel(tmp_path, monkeypatch):
+    path = tmp_path / 'final.csv'
+    generate_ticks(500).to_csv(path, index=False)
+    monkeypatch.setenv('FX_MATCH_KERNEL', 'numpy')
+
+    store = read_rate_store(str(path), cache=False)
+    assert store._bar_index is None
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from batch import write_matched_rates
+from benchmark import generate_ohlc
+from matching import MatchedRates, match_ohlc_target_prices, match_target_prices
+
+
+def test_lazy_match_without_trades_returns_typed_results_and_empty_matches(tmp_path, store_trades):
+    store, trade_df = store_trades
+    expected, _ = match_target_prices(store, trade_df, 1.0, 1.0, 1, lazy=True)
+
+    results, matched_rates = match_target_prices(store, trade_df.iloc[:0], 1.0, 1.0, 1, lazy=True)
+
+    assert isinstance(matched_rates, MatchedRates) and matched_rates.empty
+    assert list(results.columns) == list(expected.columns)
+    assert (results.dtypes == expected.dtypes).all()
+    # batch.py analyze --matched-output 경로 (CSV / parquet) 가 빈 구간에서도 동작
+    write_matched_rates(matched_rates, str(tmp_path / 'm.csv'))
+    write_matched_rates(matched_rates, str(tmp_path / 'm.parquet'))
+    assert len(pd.read_parquet(tmp_path / 'm.parquet')) == 0
+
+
+def test_eager_match_without_trades_keeps_baseline_empty_frames(final_df, store_trades):
+    _, trade_df = store_trades
+    results, matched_rates = match_target_prices(final_df, trade_df.iloc[:0], 1.0, 1.0, 1)
+    assert results.empty and matched_rates.empty
+
+
+def test_time_sorted_pages_follow_global_order(store_trades):
+    store, trade_df = store_trades
+    _, matched_rates = match_target_prices(store, trade_df, 1.0, 1.0, 2, lazy=True)
+
+    expected = matched_rates.to_frame().sort_values(['currency', 'createdAt'], kind='stable').reset_index(drop=True)
+    pages = [matched_rates.page(start, start + 1000, sort_by_time=True) for start in range(0, len(matched_rates), 1000)]
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), expected)
+
+
+def test_lazy_ohlc_matches_page_like_eager_frame(final_df, store_trades):
+    _, trade_df = store_trades
+    ohlc_df = generate_ohlc(final_df)
+
+    results, expected = match_ohlc_target_prices(ohlc_df, trade_df, 1.0, 1.0, 2)
+    lazy_results, matched_bars = match_ohlc_target_prices(ohlc_df, trade_df, 1.0, 1.0, 2, lazy=True)
+    pd.testing.assert_frame_equal(lazy_results, results)
+    assert len(matched_bars) == len(expected) > 0
+    pages = [matched_bars.page(start, start + 7) for start in range(0, len(matched_bars), 7)]
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), expected)
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+
+from result_cache import ResultCache
+
+
+def _analyze(cache, store, trade_df, adjustment, version='v1'):
+    start, end = trade_df['executedAt'].min(), trade_df['executedAt'].max()
+    return cache.analyze(store, trade_df, start, end, adjustment, adjustment, 1, version)
+
+
+def test_spill_tier_is_bounded_and_keyed_by_version(tmp_path, store_trades):
+    store, trade_df = store_trades
+    spill_dir = str(tmp_path / 'spill')
+    os.makedirs(spill_dir)
+    (tmp_path / 'spill' / 'stale.pkl').write_bytes(b'old')
+
+    cache = ResultCache(max_entries=1, spill_dir=spill_dir, max_spill_entries=2)
+    assert os.listdir(spill_dir) == []
+
+    expected = _analyze(cache, store, trade_df, 0.5)
+    for adjustment in (1.0, 1.5, 2.0):
+        _analyze(cache, store, trade_df, adjustment)
+    stats = cache.stats()
+    assert stats['spilled_entries'] == 2 and stats['spill_evictions'] == 1
+    assert len(os.listdir(spill_dir)) == 2
+    assert stats['spill_bytes'] == sum(os.path.getsize(os.path.join(spill_dir, name)) for name in os.listdir(spill_dir))
+
+    # 가장 먼저 내린 항목은 지워졌으므로 다시 계산, 디스크에 남은 항목은 같은 저장소에 다시 연결해 읽음
+    results, matched_rates = _analyze(cache, store, trade_df, 0.5)
+    pd.testing.assert_frame_equal(results, expected[0])
+    assert cache.stats()['disk_hits'] == 0
+    results, matched_rates = _analyze(cache, store, trade_df, 1.5)
+    assert cache.stats()['disk_hits'] == 1
+    assert matched_rates.store is store
+
+    # 데이터 버전이 바뀌면 이전 버전의 디스크 항목은 모두 지움
+    _analyze(cache, store, trade_df, 1.0, version='v2')
+    assert cache.stats()['spilled_entries'] == 0
+    assert os.listdir(spill_dir) == []
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from analysis import simulate_profit
+from match_kernel import sweep_matches, two_pointer_sweep
+from matching import trade_columns
+from sweep import simulate_profit_parallel
+from window_index import WindowIndex
+
+
+def test_tick_index_builds_only_the_sides_in_use(store_trades):
+    store, _ = store_trades
+    index = WindowIndex.from_rate_store(store)['USD']
+    lo, hi = np.array([0, 10]), np.array([50, 60])
+
+    index.best(lo, hi, np.array([True, True]))
+    assert index._low is not None and index._high is None
+    index.first_hit(lo, hi, np.array([np.inf, -np.inf]), np.array([True, False]))
+    assert index._high is not None
+
+
+def test_numpy_kernel_matches_two_pointer_sweep(store_trades):
+    store, trade_df = store_trades
+    index = store.window_index()
+    currency, is_buy, price, _, _ = trade_columns(trade_df)
+    trade_dates = trade_df['executedAt'].to_numpy(dtype='datetime64[ns]')
+    targets = np.where(is_buy, price - 1.0, price + 1.0)
+    for code, ticks in store.items():
+        mask = currency == code
+        args = (ticks, trade_dates[mask], targets[mask], is_buy[mask], 2)
+        expected = sweep_matches(*args, 'numba', sweep=two_pointer_sweep)
+        actual = sweep_matches(*args, 'numpy', index[code])
+        for e, a in zip(expected, actual):
+            np.testing.assert_array_equal(e, a)
+
+
+def test_parallel_sweep_uses_shared_tables(store_trades):
+    store, trade_df = store_trades
+    start, end = trade_df['executedAt'].min(), trade_df['executedAt'].max()
+    args = (trade_df, start, end, [1, 3], [0.5, 1.0])
+    pd.testing.assert_frame_equal(simulate_profit_parallel(store, *args, max_workers=2), simulate_profit(store, *args))
+
+
+def test_store_memory_counts_linear_size_index(store_trades):
+    store, _ = store_trades
+    ticks_nbytes = store.nbytes
+    index = store.window_index()
+    for code in store:
+        index[code].low, index[code].high
+    usage = store.memory_usage()
+    assert usage['ticks'].sum() == ticks_nbytes
+    assert store.nbytes == ticks_nbytes + usage['window_index'].sum()
+    # low/high 표 각각 prefix/suffix (원본 크기) + 블록 표
+    assert usage['window_index'].sum() <= 2.5 * ticks_nbytes
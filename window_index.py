@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+
+
+class SparseTable:
+    """정적 배열의 구간 최솟값/최댓값을 O(1) 로 답하는 블록 sparse table
+
+    값을 BLOCK 개씩 블록으로 나눠 블록 안 누적 극값 (앞에서부터 prefix, 뒤에서부터 suffix) 과
+    블록 극값 위의 sparse table 만 두므로 추가 메모리는 원본의 약 2배 (O(n)) 이다
+    (틱마다 log n 단계를 두는 sparse table 은 원본의 log n 배).
+    두 블록 이상에 걸친 구간은 suffix[lo], 가운데 블록들의 극값, prefix[hi - 1] 로 답하고,
+    한 블록 안의 짧은 구간만 원본 값을 BLOCK 번 이하의 벡터 연산으로 훑는다.
+    ufunc 는 np.fmin (최솟값) 또는 np.fmax (최댓값). NaN 은 무시한다.
+    levels = [원본 값, prefix, suffix, 블록 표 0단계, 1단계, ...], 블록 표 k단계[j] = ufunc(블록 j ... j + 2**k - 1)
+    """
+
+    BLOCK = 32
+
+    def __init__(self, values, ufunc, levels=None):
+        self.ufunc = ufunc
+        if levels is not None:
+            # 이미 만든 표 (예: 공유 메모리에 올린 levels) 를 복사 없이 사용
+            self.levels = list(levels)
+            self._owns_values = True
+            return
+        values = np.asarray(values)
+        self.levels = [np.asarray(values, dtype='float64')]
+        self._owns_values = self.levels[0] is not values  # float64 가 아니어서 복사했으면 표 메모리에 포함
+        n = len(values)
+        n_blocks = -(-n // self.BLOCK)
+        # 마지막 블록을 NaN 으로 채운 (블록 수, BLOCK) 행렬에서 블록 안 누적 극값을 구함
+        padded = np.full(n_blocks * self.BLOCK, np.nan)
+        padded[:n] = self.levels[0]
+        padded = padded.reshape(n_blocks, self.BLOCK)
+        self.levels.append(ufunc.accumulate(padded, axis=1).ravel()[:n])
+        self.levels.append(ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()[:n])
+        self.levels.append(ufunc.reduce(padded, axis=1) if n_blocks else np.empty(0))
+        step = 1
+        while 2 * step <= n_blocks:
+            previous = self.levels[-1]
+            self.levels.append(ufunc(previous[:-step], previous[step:]))
+            step *= 2
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def nbytes(self):
+        """표가 따로 잡은 메모리 (prefix/suffix, 블록 표, 복사한 원본 값)"""
+        return sum(level.nbytes for level in self.levels[1:]) + (self.levels[0].nbytes if self._owns_values else 0)
+
+    def query(self, lo, hi):
+        """각 [lo, hi) 구간의 최솟값/최댓값 (빈 구간은 NaN)"""
+        lo = np.asarray(lo, dtype=np.intp)
+        hi = np.asarray(hi, dtype=np.intp)
+        out = np.full(lo.shape, np.nan)
+        first_block, last_block = lo // self.BLOCK, (hi - 1) // self.BLOCK
+        nonempty = hi > lo
+        short = np.flatnonzero(nonempty & (first_block == last_block))
+        out[short] = self._scan(lo[short], hi[short])
+        wide = np.flatnonzero(nonempty & (first_block < last_block))
+        out[wide] = self.ufunc(self.levels[2][lo[wide]], self.levels[1][hi[wide] - 1])
+        inner = wide[last_block[wide] - first_block[wide] >= 2]
+        if len(inner):
+            out[inner] = self.ufunc(out[inner], self._block_query(first_block[inner] + 1, last_block[inner]))
+        return out
+
+    def first_crossing(self, lo, hi, target):
+        """각 [lo, hi) 에서 처음으로 target 이하(fmin 표) / 이상(fmax 표)인 위치, 없으면 -1
+
+        앞쪽 블록의 suffix, 가운데 블록들 (binary lifting 으로 O(log n)), 뒤쪽 블록의 prefix 순으로
+        처음 교차하는 블록을 찾고 그 블록만 원본 값을 훑는다.
+        """
+        lo = np.asarray(lo, dtype=np.intp)
+        hi = np.asarray(hi, dtype=np.intp)
+        target = np.broadcast_to(np.asarray(target, dtype='float64'), lo.shape)
+        pos = np.full(lo.shape, -1, dtype=np.intp)
+        first_block, last_block = lo // self.BLOCK, (hi - 1) // self.BLOCK
+        nonempty = hi > lo
+
+        # 한 블록 안의 구간은 바로 훑음
+        short = np.flatnonzero(nonempty & (first_block == last_block))
+        pos[short] = self._scan_first(lo[short], hi[short], target[short])
+
+        wide = np.flatnonzero(nonempty & (first_block < last_block))
+        head = self._crosses(self.levels[2][lo[wide]], target[wide])
+        starts, ends = lo[wide], (first_block[wide] + 1) * self.BLOCK
+        rest = np.flatnonzero(~head)
+        if len(rest):
+            block = self._first_block(first_block[wide[rest]] + 1, last_block[wide[rest]], target[wide[rest]])
+            inner = block >= 0
+            # 가운데 블록에 없으면 뒤쪽 블록의 prefix 로 확인
+            tail = ~inner & self._crosses(self.levels[1][hi[wide[rest]] - 1], target[wide[rest]])
+            starts[rest] = np.where(inner, block * self.BLOCK, last_block[wide[rest]] * self.BLOCK)
+            ends[rest] = np.where(inner, starts[rest] + self.BLOCK, hi[wide[rest]])
+            found = np.ones(len(wide), dtype=bool)
+            found[rest] = inner | tail
+            wide, starts, ends = wide[found], starts[found], ends[found]
+        pos[wide] = self._scan_first(starts, ends, target[wide])
+        return pos
+
+    def _scan(self, lo, hi):
+        # 길이 BLOCK 이하의 [lo, hi) 구간들을 한 칸씩 벡터로 훑은 극값
+        out = np.full(lo.shape, np.nan)
+        length = hi - lo
+        values = self.levels[0]
+        for offset in range(int(length.max(initial=0))):
+            inside = offset < length
+            out[inside] = self.ufunc(out[inside], values[lo[inside] + offset])
+        return out
+
+    def _scan_first(self, lo, hi, target):
+        # 길이 BLOCK 이하의 [lo, hi) 구간들에서 처음 교차하는 위치 (없으면 -1)
+        pos = np.full(lo.shape, -1, dtype=np.intp)
+        length = hi - lo
+        values = self.levels[0]
+        for offset in range(int(length.max(initial=0))):
+            sel = np.flatnonzero((offset < length) & (pos < 0))
+            if not len(sel):
+                break
+            hit = sel[self._crosses(values[lo[sel] + offset], target[sel])]
+            pos[hit] = lo[hit] + offset
+        return pos
+
+    def _block_query(self, lo, hi):
+        # 블록 [lo, hi) (비어 있지 않음) 의 극값: 길이보다 작거나 같은 가장 큰 2의 거듭제곱 두 개로 덮음
+        out = np.empty(lo.shape)
+        level = np.frexp(hi - lo)[1] - 1
+        for k in np.unique(level):
+            sel = level == k
+            table = self.levels[k + 3]
+            out[sel] = self.ufunc(table[lo[sel]], table[hi[sel] - (1 << k)])
+        return out
+
+    def _first_block(self, lo, hi, target):
+        # 블록 [lo, hi) 중 처음 교차하는 블록: 큰 단계부터 '교차가 없는 블록 묶음' 을 건너뜀 (없으면 -1)
+        pos = lo.copy()
+        for k in range(len(self.levels) - 4, -1, -1):
+            step = 1 << k
+            can = pos + step <= hi
+            if not can.any():
+                continue
+            block = np.full(pos.shape, np.nan)
+            block[can] = self.levels[k + 3][pos[can]]
+            pos = np.where(can & ~self._crosses(block, target), pos + step, pos)
+        inside = pos < hi
+        found = np.zeros(pos.shape, dtype=bool)
+        found[inside] = self._crosses(self.levels[3][pos[inside]], target[inside])
+        return np.where(found, pos, -1)
+
+    def _crosses(self, values, target):
+        if self.ufunc is np.fmin:
+            return values <= target
+        return values >= target
+
+
+class CurrencyWindowIndex:
+    """한 통화의 정렬된 시각 배열과 low/high sparse table
+
+    표는 처음 쓰일 때 만든다. 틱 데이터는 low/high 가 같은 기준율이라 매수 거래만 있으면 low 표만,
+    매도 거래만 있으면 high 표만 만들어진다.
+    """
+
+    def __init__(self, times, low, high=None):
+        self.times = times  # datetime64[ns], 시간순 정렬
+        self._values = (low, low if high is None else high)
+        self._low = self._high = None
+
+    @property
+    def low(self):
+        if self._low is None:
+            self._low = SparseTable(self._values[0], np.fmin)
+        return self._low
+
+    @property
+    def high(self):
+        if self._high is None:
+            self._high = SparseTable(self._values[1], np.fmax)
+        return self._high
+
+    @property
+    def nbytes(self):
+        """지금까지 만든 표가 따로 잡은 메모리 (시각/가격 배열은 저장소와 공유하므로 제외)"""
+        return sum(table.nbytes for table in (self._low, self._high) if table is not None)
+
+    def best(self, lo, hi, is_buy):
+        """각 [lo, hi) 의 최유리가: 매수는 최저가, 매도는 최고가 (빈 구간은 NaN, 필요한 쪽 표만 만듦)"""
+        is_buy = np.asarray(is_buy, dtype=bool)
+        out = np.full(len(lo), np.nan)
+        for name, side in (('low', is_buy), ('high', ~is_buy)):
+            if side.any():
+                out[side] = getattr(self, name).query(lo[side], hi[side])
+        return out
+
+    def first_hit(self, lo, hi, targets, is_buy):
+        """각 [lo, hi) 에서 처음 목표가 이하(매수) / 이상(매도)인 위치 (없으면 -1)"""
+        is_buy = np.asarray(is_buy, dtype=bool)
+        targets = np.broadcast_to(np.asarray(targets, dtype='float64'), is_buy.shape)
+        out = np.full(len(lo), -1, dtype=np.intp)
+        for name, side in (('low', is_buy), ('high', ~is_buy)):
+            if side.any():
+                out[side] = getattr(self, name).first_crossing(lo[side], hi[side], targets[side])
+        return out
+
+    def bounds(self, t0, t1):
+        """[t0, t1] (양 끝 포함) 구간의 인덱스 범위 [lo, hi)"""
+        lo = np.searchsorted(self.times, np.asarray(t0, dtype='datetime64[ns]'), side='left')
+        hi = np.searchsorted(self.times, np.asarray(t1, dtype='datetime64[ns]'), side='right')
+        return lo, hi
+
+    def range_min(self, t0, t1):
+        return self.low.query(*self.bounds(t0, t1))
+
+    def range_max(self, t0, t1):
+        return self.high.query(*self.bounds(t0, t1))
+
+    def first_crossing(self, t0, t1, target, below=True):
+        """[t0, t1] 안에서 처음으로 target 이하(below, low 기준) / 이상(high 기준)이 된 시각 (없으면 NaT)"""
+        lo, hi = self.bounds(t0, t1)
+        table = self.low if below else self.high
+        pos = table.first_crossing(lo, hi, target)
+        out = np.full(pos.shape, np.datetime64('NaT'), dtype='datetime64[ns]')
+        out[pos >= 0] = self.times[pos[pos >= 0]]
+        return out
+
+
+class WindowIndex:
+    """데이터셋마다 한 번 만드는 통화별 구간 최저/최고가 인덱스
+
+    "통화 C 의 t ~ t + window 사이 최저가(매수)/최고가(매도)" 와 "목표가를 처음 넘은 시각" 을
+    DataFrame 마스킹 없이 O(1) / O(log n) (양 끝 블록은 SparseTable.BLOCK 번 이하의 벡터 연산) 으로 답한다.
+    분석기와 전략 코드가 공통으로 사용.
+    """
+
+    def __init__(self, currencies):
+        self.currencies = currencies  # {통화: CurrencyWindowIndex}
+
+    @classmethod
+    def from_rate_store(cls, store):
+        """틱 데이터 (basePrice) 인덱스 (표는 통화별로 처음 쓰일 때 만듦)"""
+        return cls({currency: CurrencyWindowIndex(ticks.created_at, ticks.prices) for currency, ticks in store.items()})
+
+    @classmethod
+    def from_ohlc(cls, ohlc_df, time_column='Date', low_column='low', high_column='high'):
+        """야후 OHLC 데이터 (low/high) 인덱스"""
+        currencies = {}
+        for currency, group in ohlc_df.groupby('currencyCode', sort=False, observed=True):
+            group = group.sort_values(time_column, kind='stable')
+            currencies[currency] = CurrencyWindowIndex(
+                pd.to_datetime(group[time_column]).to_numpy(dtype='datetime64[ns]'),
+                group[low_column].to_numpy(dtype='float64'),
+                group[high_column].to_numpy(dtype='float64'),
+            )
+        return cls(currencies)
+
+    def __contains__(self, currency):
+        return currency in self.currencies
+
+    def __getitem__(self, currency):
+        return self.currencies[currency]
+
+    @property
+    def nbytes(self):
+        return sum(index.nbytes for index in self.currencies.values())
+
+    def range_min(self, currency, t0, t1):
+        """[t0, t1] 구간 최저가 (틱이 없으면 NaN)"""
+        if currency not in self.currencies:
+            return np.full(np.shape(t0), np.nan)
+        return self.currencies[currency].range_min(t0, t1)
+
+    def range_max(self, currency, t0, t1):
+        """[t0, t1] 구간 최고가 (틱이 없으면 NaN)"""
+        if currency not in self.currencies:
+            return np.full(np.shape(t0), np.nan)
+        return self.currencies[currency].range_max(t0, t1)
+
+    def first_crossing(self, currency, t0, t1, target, below=True):
+        if currency not in self.currencies:
+            return np.full(np.shape(t0), np.datetime64('NaT'), dtype='datetime64[ns]')
+        return self.currencies[currency].first_crossing(t0, t1, target, below)